@@ -1,6 +1,6 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import RevokedToken, User
 
 
 @admin.register(User)
@@ -25,3 +25,7 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
+@admin.register(RevokedToken)
+class RevokedTokenAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'revoked_at', 'expires_at')
+    ordering = ('-revoked_at',)
@@ -5,4 +5,5 @@ class AuthenticationConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'authentication'
 
-
+    def ready(self):
+        from . import checks, signals  # noqa: F401
@@ -0,0 +1,228 @@
+"""
+JWT authentication that verifies each access token once per process.
+
+simplejwt's JWTAuthentication decodes and HMAC-verifies the token and loads
+the User row on every request. CachedJWTAuthentication keeps the verified
+token and a snapshot of its user's fields in a bounded LRU until the token
+expires; later requests with the same token skip the signature check and
+the SELECT and get a User built from the snapshot (Model.from_db, so it is
+a real instance: FK assignment and permission checks work, and the fields
+left out of the snapshot - password, last_login - load lazily if touched).
+
+Revocation is still honored:
+- any save or delete of a user bumps a per-user version in the Django
+  cache; a cached entry whose version no longer matches is verified again
+  against the database (so a deactivated user, or a changed password with
+  CHECK_REVOKE_TOKEN, is rejected as by the stock class)
+- the entries of that user in this process are dropped right away
+- token classes that can be blacklisted run their blacklist check on every
+  request, cached or not
+- an entry never outlives its token's exp claim
+
+The versions must live in a cache every worker process shares
+(AUTH_TOKEN_CACHE_ALIAS, the 'auth' cache: Redis or a database table), or a
+revocation in one worker is never seen by the others; the
+authentication.W001 check warns about a process-local alias. Each process
+keeps the versions it read for AUTH_USER_VERSION_TTL seconds, so a request
+with a cached token costs no round-trip to that cache: a revocation in
+another worker is seen within the TTL, one in this worker at once.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+
+USER_VERSION_KEY = 'auth:user-version:{}'
+
+# Fields kept in an entry; the rest of the row is deferred
+SNAPSHOT_FIELDS = (
+    'id', 'email', 'username', 'first_name', 'last_name',
+    'is_active', 'is_staff', 'is_superuser', 'date_joined',
+)
+
+
+def get_cache_size():
+    return max(int(getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', 10_000)), 0)
+
+
+def get_version_ttl():
+    return max(float(getattr(settings, 'AUTH_USER_VERSION_TTL', 5)), 0)
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+class LocalVersions:
+    """
+    Thread-safe, bounded map of user id -> (version, monotonic deadline):
+    this process's copies of the shared versions
+    """
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, user_id):
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None or entry[1] <= time.monotonic():
+                return None
+            return entry[0]
+
+    def put(self, user_id, version):
+        ttl = get_version_ttl()
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[user_id] = (version, time.monotonic() + ttl)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > max(get_cache_size(), 1):
+                self.entries.popitem(last=False)
+
+    def discard(self, user_id):
+        with self.lock:
+            self.entries.pop(user_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+local_versions = LocalVersions()
+
+
+def get_user_version(user_id):
+    """
+    The user's current version, seeded from the clock when missing (never
+    bumped, or evicted): a seed never equals a version an entry was stored
+    with, so an evicted key makes entries be verified again rather than
+    match
+    """
+    version = local_versions.get(user_id)
+    if version is not None:
+        return version
+    cache = get_cache()
+    key = USER_VERSION_KEY.format(user_id)
+    version = cache.get(key)
+    if version is None:
+        seed = time.time_ns()
+        cache.add(key, seed, timeout=None)
+        version = cache.get(key, seed)
+    local_versions.put(user_id, version)
+    return version
+
+
+def bump_user_version(user_id):
+    """Make every cached token of the user be verified again"""
+    get_cache().set(USER_VERSION_KEY.format(user_id), time.time_ns(), timeout=None)
+    local_versions.discard(user_id)
+    verified_tokens.discard_user(user_id)
+
+
+class TokenLRU:
+    """
+    Thread-safe LRU of raw token -> (validated token, user snapshot,
+    user version, expiry); entries past their expiry are never returned
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, raw):
+        with self.lock:
+            entry = self.entries.get(raw)
+            if entry is None:
+                return None
+            if entry[3] <= time.time():
+                del self.entries[raw]
+                return None
+            self.entries.move_to_end(raw)
+            return entry
+
+    def put(self, raw, entry):
+        if self.size <= 0:
+            return
+        with self.lock:
+            self.entries[raw] = entry
+            self.entries.move_to_end(raw)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def discard(self, raw):
+        with self.lock:
+            self.entries.pop(raw, None)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            stale = [raw for raw, entry in self.entries.items() if entry[1]['id'] == user_id]
+            for raw in stale:
+                del self.entries[raw]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+verified_tokens = TokenLRU(get_cache_size())
+
+
+def snapshot(user):
+    # In the model's field order, which Model.from_db expects
+    return {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if field.attname in SNAPSHOT_FIELDS
+    }
+
+
+def materialize(values):
+    """A User built from a snapshot without touching the database"""
+    return get_user_model().from_db('default', list(values), list(values.values()))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw = self.get_raw_token(header)
+        if raw is None:
+            return None
+
+        entry = verified_tokens.get(raw)
+        if entry is not None:
+            token, values, version, _ = entry
+            if version is not None and version == get_user_version(values['id']):
+                self.check_blacklist(token)
+                return materialize(values), token
+            verified_tokens.discard(raw)
+
+        # Read the version before the row so a save racing with this check
+        # leaves an entry that is verified again next time
+        token = self.get_validated_token(raw)
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        version = get_user_version(user_id) if user_id is not None else None
+        user = self.get_user(token)
+        verified_tokens.put(raw, (token, snapshot(user), version, token['exp']))
+        return user, token
+
+    def check_blacklist(self, token):
+        # Only blacklistable token classes (refresh, sliding) have it; the
+        # check raises TokenError, reported like an invalid token
+        if hasattr(token, 'check_blacklist'):
+            try:
+                token.check_blacklist()
+            except TokenError as e:
+                raise InvalidToken(e.args[0])
@@ -0,0 +1,176 @@
+"""
+Refresh-token blacklist: revoked jtis in the revoked_tokens table, checked
+through an in-memory Bloom filter first.
+
+A jti is hashed once to a 64-bit key (8 bytes of BLAKE2b): the row's
+primary key and the input of the filter. Most checks are for tokens that
+were never revoked, and the filter answers those without a query; a hit
+(revoked, or a false positive at about AUTH_BLACKLIST_BLOOM_ERROR_RATE) is
+confirmed with a primary-key lookup.
+
+Each process builds its filter from the unexpired rows on first use and
+adds its own revocations to it. Other processes' revocations are picked up
+through a counter in the Django cache (AUTH_TOKEN_CACHE_ALIAS, shared by
+all workers): when another process moved it, the rows revoked since the
+last sync are added. The filter is rebuilt, larger, when it holds more
+keys than it was sized for.
+"""
+import hashlib
+import math
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .backends import get_cache
+from .models import RevokedToken
+
+BLACKLIST_VERSION_KEY = 'auth:blacklist-version'
+
+# A sync reads again the rows revoked this long before the previous one,
+# for transactions that committed after a later one was synced
+SYNC_OVERLAP = timedelta(seconds=30)
+
+UINT64 = (1 << 64) - 1
+
+
+def get_bloom_capacity():
+    return max(int(getattr(settings, 'AUTH_BLACKLIST_BLOOM_CAPACITY', 100_000)), 1)
+
+
+def get_bloom_error_rate():
+    return float(getattr(settings, 'AUTH_BLACKLIST_BLOOM_ERROR_RATE', 0.01))
+
+
+def jti_key(jti):
+    """A jti's row key: 8 bytes of its BLAKE2b hash as a signed 64-bit integer"""
+    return int.from_bytes(hashlib.blake2b(str(jti).encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+class BloomFilter:
+    """Bit array sized for capacity keys at error_rate; positions by double hashing"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(round(self.size / capacity * math.log(2)), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, key):
+        # The key is already a uniform hash: its halves seed the k positions
+        key &= UINT64
+        first, second = key & 0xFFFFFFFF, (key >> 32) | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, key):
+        for position in self.positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(key))
+
+
+class RevocationIndex:
+    """This process's Bloom filter over the revoked_tokens table"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.bloom = None
+            self.version = None
+            self.synced_at = None
+
+    def sync(self):
+        version = get_cache().get(BLACKLIST_VERSION_KEY)
+        with self.lock:
+            if self.bloom is not None and version == self.version:
+                return
+            now = timezone.now()
+            unexpired = RevokedToken.objects.filter(expires_at__gt=now).values_list('jti_hash', flat=True)
+            keys = None
+            if self.bloom is not None:
+                keys = list(unexpired.filter(revoked_at__gte=self.synced_at - SYNC_OVERLAP))
+                if self.bloom.count + len(keys) > self.bloom.capacity:
+                    keys = None
+            if keys is None:
+                # From scratch: every unexpired row, with room to grow
+                keys = list(unexpired)
+                self.bloom = BloomFilter(max(get_bloom_capacity(), len(keys) * 2), get_bloom_error_rate())
+            for key in keys:
+                self.bloom.add(key)
+            self.version, self.synced_at = version, now
+
+    def might_contain(self, key):
+        self.sync()
+        return key in self.bloom
+
+    def add(self, key):
+        with self.lock:
+            if self.bloom is not None:
+                self.bloom.add(key)
+
+    def bumped(self, version):
+        """Our own revocation moved the counter; no need to sync for it"""
+        with self.lock:
+            if self.bloom is not None and version == (self.version or 0) + 1:
+                self.version = version
+
+
+revocations = RevocationIndex()
+
+
+def is_revoked(jti):
+    key = jti_key(jti)
+    return revocations.might_contain(key) and RevokedToken.objects.filter(pk=key).exists()
+
+
+def revoke(jti, exp):
+    """
+    Blacklist a token until its exp (a timestamp); returns False when it
+    already was, so a refresh token can be rotated only once
+    """
+    key = jti_key(jti)
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(jti_hash=key, expires_at=datetime.fromtimestamp(exp, tz=dt_timezone.utc))
+    except IntegrityError:
+        return False
+    revocations.add(key)
+    transaction.on_commit(bump_blacklist_version)
+    return True
+
+
+def bump_blacklist_version():
+    # A missing counter (first revocation, or evicted) starts from the
+    # clock, so it never repeats a version a process has already synced at
+    cache = get_cache()
+    try:
+        version = cache.incr(BLACKLIST_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        if not cache.add(BLACKLIST_VERSION_KEY, version, timeout=None):
+            version = cache.incr(BLACKLIST_VERSION_KEY)
+    revocations.bumped(version)
+
+
+def prune(batch_size=5000):
+    """
+    Delete the rows of tokens past their exp, in batches so the write lock
+    is never held long; returns the number deleted. Filters keep the
+    pruned keys (a miss on the table) until they are next rebuilt.
+    """
+    deleted = 0
+    while True:
+        batch = list(
+            RevokedToken.objects.filter(expires_at__lte=timezone.now())
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not batch:
+            return deleted
+        deleted += RevokedToken.objects.filter(pk__in=batch).delete()[0]
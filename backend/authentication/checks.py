@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Warning, register
+
+
+@register()
+def check_token_cache_is_shared(app_configs, **kwargs):
+    """Revocations are only seen by every worker through a shared cache"""
+    alias = getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')
+    if not isinstance(caches[alias], LocMemCache):
+        return []
+    return [Warning(
+        f"AUTH_TOKEN_CACHE_ALIAS '{alias}' is a local-memory cache.",
+        hint=(
+            'Token revocations made in one worker process will not reach the '
+            'others, which keep accepting cached tokens until they expire. Use '
+            'a cache all workers share (Redis, database, ...).'
+        ),
+        id='authentication.W001',
+    )]
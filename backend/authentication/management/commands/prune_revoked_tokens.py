@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+from authentication import blacklist
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete revoked refresh tokens past their expiry; they fail their exp '
+        'check anyway. Run it from cron (daily is plenty) so the blacklist '
+        'only ever holds tokens that could still be presented.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows deleted per statement')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive.')
+        deleted = blacklist.prune(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ Pruned {deleted} expired revoked token(s)'))
@@ -18,3 +18,19 @@ class User(AbstractUser):
         db_table = 'users'
 
 
+class RevokedToken(models.Model):
+    """
+    A revoked refresh token, stored compactly: the first 8 bytes of a hash
+    of its jti (the primary key) and when the token would have expired.
+    Rows past expires_at are useless - the token fails its exp check
+    anyway - and are deleted by the prune_revoked_tokens command.
+    """
+    jti_hash = models.BigIntegerField(primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.jti_hash:016x}'
+
+    class Meta:
+        db_table = 'revoked_tokens'
@@ -1,6 +1,8 @@
 from rest_framework import serializers
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth import get_user_model
+from rest_framework_simplejwt import serializers as jwt_serializers
+from .tokens import RevocableRefreshToken
 
 User = get_user_model()
 
@@ -46,3 +48,6 @@ class LoginSerializer(serializers.Serializer):
     password = serializers.CharField(write_only=True, required=True)
 
 
+class TokenRefreshSerializer(jwt_serializers.TokenRefreshSerializer):
+    """Refresh that checks and blacklists through authentication.blacklist"""
+    token_class = RevocableRefreshToken
@@ -0,0 +1,17 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from .backends import bump_user_version
+
+
+@receiver(post_save, sender=get_user_model())
+@receiver(post_delete, sender=get_user_model())
+def invalidate_cached_tokens(sender, instance, **kwargs):
+    """
+    A changed or deleted user's cached tokens are verified against the
+    database again; bumped now and again on commit, so a request racing
+    with the transaction cannot cache the pre-commit row
+    """
+    bump_user_version(instance.pk)
+    transaction.on_commit(lambda: bump_user_version(instance.pk))
@@ -0,0 +1,284 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from io import StringIO
+import time
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+from unittest import mock
+from orders.models import Order
+from products.models import Product
+from .models import RevokedToken
+from . import blacklist
+from .backends import USER_VERSION_KEY, TokenLRU, get_cache, local_versions, verified_tokens
+from .checks import check_token_cache_is_shared
+from .throttling import login_buckets
+
+
+# The tests clear the token cache: keep them off the project's own
+TEST_CACHES = {
+    **settings.CACHES,
+    'auth': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'tatva-auth-tests'},
+}
+
+
+def make_user(index=0, **kwargs):
+    defaults = {
+        'email': f'user{index}@example.com',
+        'username': f'user{index}',
+        'password': 'pass12345',
+        'first_name': 'Test',
+        'last_name': str(index),
+    }
+    defaults.update(kwargs)
+    return get_user_model().objects.create_user(**defaults)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class AuthTestCase(TestCase):
+
+    def setUp(self):
+        verified_tokens.clear()
+        local_versions.clear()
+        get_cache().clear()
+        self.client = APIClient()
+        self.user = make_user()
+        self.access = str(RefreshToken.for_user(self.user).access_token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access}')
+
+
+class CachedJWTAuthenticationTests(AuthTestCase):
+    """Verified tokens are served from the LRU without a users query"""
+
+    def test_repeat_requests_skip_the_user_query(self):
+        with self.assertNumQueries(1):
+            first = self.client.get('/api/auth/profile/')
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/auth/profile/')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second.data['email'], 'user0@example.com')
+
+    def test_cached_user_works_for_writes(self):
+        product = Product.objects.create(
+            name='Lamp', category='Idols', price=Decimal('100.00'), image='https://example.com/image.webp',
+        )
+        self.client.get('/api/auth/profile/')
+        response = self.client.post('/api/orders/', {'items': [{'product': product.id, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().user_id, self.user.id)
+
+    def test_deactivated_user_is_rejected(self):
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_profile_changes_are_seen(self):
+        self.client.get('/api/auth/profile/')
+        self.user.first_name = 'Renamed'
+        self.user.save()
+        self.assertEqual(self.client.get('/api/auth/profile/').data['first_name'], 'Renamed')
+
+    def test_deleted_user_is_rejected(self):
+        self.client.get('/api/auth/profile/')
+        self.user.delete()
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def after_version_ttl(self):
+        return mock.patch('authentication.backends.time.monotonic', return_value=time.monotonic() + 60)
+
+    def test_revocation_in_another_process_is_seen(self):
+        # Another worker bumps the shared version; this process still holds the entry
+        self.client.get('/api/auth/profile/')
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        get_cache().set(USER_VERSION_KEY.format(self.user.pk), 'elsewhere', timeout=None)
+        # Seen once this process's copy of the version is past its TTL
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+        with self.after_version_ttl():
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_evicted_version_is_not_a_match(self):
+        # Deactivated elsewhere, then the version key is evicted: the entry
+        # must not match the missing key
+        self.client.get('/api/auth/profile/')
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        get_cache().delete(USER_VERSION_KEY.format(self.user.pk))
+        with self.after_version_ttl():
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+
+    def test_version_is_read_from_the_shared_cache_once_per_ttl(self):
+        self.client.get('/api/auth/profile/')
+        with mock.patch('authentication.backends.get_cache', side_effect=AssertionError('cache read')):
+            self.assertEqual(self.client.get('/api/auth/profile/').status_code, 200)
+
+    def test_warns_about_a_process_local_cache(self):
+        self.assertEqual([w.id for w in check_token_cache_is_shared(None)], ['authentication.W001'])
+        shared = {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'auth_cache'}
+        with override_settings(CACHES={**TEST_CACHES, 'auth': shared}):
+            self.assertEqual(check_token_cache_is_shared(None), [])
+
+    def test_expired_entry_is_verified_again(self):
+        self.client.get('/api/auth/profile/')
+        with mock.patch('authentication.backends.time.time', return_value=4_000_000_000):
+            self.assertIsNone(verified_tokens.get(self.access.encode()))
+
+    def test_bad_token_is_rejected(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {self.access[:-2]}xx')
+        self.assertEqual(self.client.get('/api/auth/profile/').status_code, 401)
+        self.assertEqual(len(verified_tokens), 0)
+
+
+class TokenLRUTests(TestCase):
+
+    def test_bounded_and_least_recently_used_first(self):
+        lru = TokenLRU(2)
+        entry = lambda user_id: (None, {'id': user_id}, None, 4_000_000_000)
+        lru.put(b'a', entry(1))
+        lru.put(b'b', entry(2))
+        lru.get(b'a')
+        lru.put(b'c', entry(3))
+        self.assertEqual(len(lru), 2)
+        self.assertIsNone(lru.get(b'b'))
+        self.assertIsNotNone(lru.get(b'a'))
+        lru.discard_user(1)
+        self.assertIsNone(lru.get(b'a'))
+
+    def test_zero_size_caches_nothing(self):
+        lru = TokenLRU(0)
+        lru.put(b'a', (None, {'id': 1}, None, 4_000_000_000))
+        self.assertEqual(len(lru), 0)
+
+
+@override_settings(LOGIN_THROTTLE_RATES={'ip': '5/min', 'account': '3/hour'})
+class LoginThrottleTests(TestCase):
+    """Login attempts are charged to IP and account buckets before hashing"""
+
+    def setUp(self):
+        login_buckets.clear()
+        self.client = APIClient()
+        self.user = make_user()
+
+    def login(self, email='user0@example.com', password='wrong', ip='198.51.100.1'):
+        return self.client.post(
+            '/api/auth/login/', {'email': email, 'password': password}, format='json', REMOTE_ADDR=ip,
+        )
+
+    def test_login_with_username_different_from_email(self):
+        make_user(1, username='someone-else')
+        response = self.login('user1@example.com', 'pass12345')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data['tokens'])
+
+    def test_account_bucket_refuses_without_hashing(self):
+        for ip in range(3):
+            self.assertEqual(self.login(ip=f'198.51.100.{ip}').status_code, 401)
+        with mock.patch('django.contrib.auth.hashers.PBKDF2PasswordHasher.encode') as encode:
+            response = self.login(password='pass12345', ip='198.51.100.9')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+        encode.assert_not_called()
+
+    def test_ip_bucket_covers_unknown_emails(self):
+        for index in range(5):
+            self.assertEqual(self.login(email=f'leaked{index}@example.com').status_code, 401)
+        self.assertEqual(self.login(email='leaked9@example.com').status_code, 429)
+        self.assertEqual(self.login(password='pass12345', ip='198.51.100.2').status_code, 200)
+
+    def test_spoofed_forwarded_for_shares_the_ip_bucket(self):
+        for index in range(5):
+            response = self.client.post(
+                '/api/auth/login/', {'email': f'leaked{index}@example.com', 'password': 'wrong'},
+                format='json', REMOTE_ADDR='198.51.100.1', HTTP_X_FORWARDED_FOR=f'203.0.113.{index}',
+            )
+            self.assertEqual(response.status_code, 401)
+        response = self.client.post(
+            '/api/auth/login/', {'email': 'leaked9@example.com', 'password': 'wrong'},
+            format='json', REMOTE_ADDR='198.51.100.1', HTTP_X_FORWARDED_FOR='203.0.113.99',
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_success_refills_the_account_bucket(self):
+        self.login()
+        self.login()
+        self.assertEqual(self.login(password='pass12345').status_code, 200)
+        self.assertEqual(self.login(ip='198.51.100.2').status_code, 401)
+        self.assertEqual(self.login(ip='198.51.100.2').status_code, 401)
+        self.assertEqual(self.login(ip='198.51.100.3').status_code, 401)
+        self.assertEqual(self.login(ip='198.51.100.3').status_code, 429)
+
+    def test_buckets_refill_over_time(self):
+        with mock.patch('authentication.throttling.time.monotonic', return_value=1000.0):
+            for _ in range(3):
+                self.login(ip='198.51.100.5')
+            self.assertEqual(self.login(ip='198.51.100.6').status_code, 429)
+        with mock.patch('authentication.throttling.time.monotonic', return_value=1000.0 + 1200):
+            self.assertEqual(self.login(password='pass12345', ip='198.51.100.6').status_code, 200)
+
+
+@override_settings(CACHES=TEST_CACHES)
+class RefreshBlacklistTests(TestCase):
+    """Rotated refresh tokens are revoked in a compact, Bloom-filtered table"""
+
+    def setUp(self):
+        blacklist.revocations.reset()
+        self.client = APIClient()
+        self.user = make_user()
+        self.refresh = str(RefreshToken.for_user(self.user))
+
+    def refresh_token(self, token):
+        return self.client.post('/api/auth/token/refresh/', {'refresh': token}, format='json')
+
+    def test_rotation_revokes_the_old_token(self):
+        response = self.refresh_token(self.refresh)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('access', response.data)
+        self.assertEqual(RevokedToken.objects.count(), 1)
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        self.assertEqual(self.refresh_token(response.data['refresh']).status_code, 200)
+
+    def test_unrevoked_tokens_are_not_looked_up(self):
+        self.refresh_token(str(RefreshToken.for_user(self.user)))
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.refresh_token(self.refresh).status_code, 200)
+        lookups = [q['sql'] for q in queries if q['sql'].startswith('SELECT') and 'revoked_tokens' in q['sql']]
+        self.assertEqual(lookups, [])
+
+    def test_revocation_by_another_process_is_seen(self):
+        self.refresh_token(str(RefreshToken.for_user(self.user)))
+        token = RefreshToken(self.refresh)
+        RevokedToken.objects.create(
+            jti_hash=blacklist.jti_key(token['jti']), expires_at=timezone.now() + timedelta(days=1),
+        )
+        # This process's filter hasn't seen the row yet, but rotating the
+        # token inserts its key, which the table refuses
+        self.assertFalse(blacklist.is_revoked(token['jti']))
+        self.assertEqual(self.refresh_token(self.refresh).status_code, 401)
+        blacklist.get_cache().set(blacklist.BLACKLIST_VERSION_KEY, 'elsewhere', timeout=None)
+        self.assertTrue(blacklist.is_revoked(token['jti']))
+
+    def test_prune_deletes_expired_rows_only(self):
+        now = timezone.now()
+        RevokedToken.objects.create(jti_hash=1, expires_at=now - timedelta(minutes=1))
+        RevokedToken.objects.create(jti_hash=2, expires_at=now - timedelta(days=3))
+        RevokedToken.objects.create(jti_hash=3, expires_at=now + timedelta(days=1))
+        out = StringIO()
+        call_command('prune_revoked_tokens', '--batch-size', '1', stdout=out)
+        self.assertIn('Pruned 2', out.getvalue())
+        self.assertEqual(list(RevokedToken.objects.values_list('pk', flat=True)), [3])
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = blacklist.BloomFilter(1000, 0.01)
+        keys = [blacklist.jti_key(f'jti-{index}') for index in range(1000)]
+        for key in keys:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys))
+        others = [blacklist.jti_key(f'other-{index}') for index in range(10_000)]
+        self.assertLess(sum(key in bloom for key in others), 300)
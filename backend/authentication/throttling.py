@@ -0,0 +1,115 @@
+"""
+Token-bucket throttling for the login endpoint.
+
+Every attempt takes one token from the bucket of its client IP and one from
+the bucket of the account (the normalized email) it names; an attempt
+either bucket can't pay for is refused before the user is looked up or any
+password is hashed, so a credential-stuffing run costs a dict lookup per
+refused attempt instead of a PBKDF2 hash. Buckets refill continuously at
+the configured rate, up to a burst of the same size:
+
+    LOGIN_THROTTLE_RATES = {'ip': '30/min', 'account': '10/hour'}
+
+A successful login refills its account's bucket, so a user who mistyped
+their password a few times is not locked out by it later.
+
+The client IP is DRF's get_ident() with REST_FRAMEWORK['NUM_PROXIES']
+set: REMOTE_ADDR, or the X-Forwarded-For address recorded by the trusted
+proxies - never a header value the client chose freely.
+
+Buckets live in process memory (bounded by LOGIN_THROTTLE_MAX_KEYS, least
+recently used first out), which needs no round-trip; with several worker
+processes each enforces its own limits.
+"""
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+from rest_framework.throttling import BaseThrottle
+
+DEFAULT_RATES = {'ip': '30/min', 'account': '10/hour'}
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """'10/hour' -> (capacity 10, 10 / 3600 tokens per second); None disables"""
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / PERIODS[period[0]]
+
+
+def get_rates():
+    return {**DEFAULT_RATES, **getattr(settings, 'LOGIN_THROTTLE_RATES', {})}
+
+
+def get_max_keys():
+    return max(int(getattr(settings, 'LOGIN_THROTTLE_MAX_KEYS', 100_000)), 1)
+
+
+class TokenBuckets:
+    """Thread-safe, bounded map of key -> (tokens, last refill time)"""
+
+    def __init__(self):
+        self.buckets = OrderedDict()
+        self.lock = threading.Lock()
+
+    def level(self, key, capacity, rate, now):
+        tokens, updated = self.buckets.get(key, (capacity, now))
+        return min(capacity, tokens + (now - updated) * rate)
+
+    def take(self, charges):
+        """
+        Take one token from each (key, capacity, rate) bucket, all or none.
+        Returns 0 when taken, else the seconds until every bucket could pay.
+        """
+        now = time.monotonic()
+        with self.lock:
+            levels = [self.level(key, capacity, rate, now) for key, capacity, rate in charges]
+            wait = max(
+                ((1 - tokens) / rate for tokens, (_, _, rate) in zip(levels, charges) if tokens < 1),
+                default=0,
+            )
+            if wait:
+                return wait
+            for tokens, (key, _, _) in zip(levels, charges):
+                self.buckets[key] = (tokens - 1, now)
+                self.buckets.move_to_end(key)
+            while len(self.buckets) > get_max_keys():
+                self.buckets.popitem(last=False)
+            return 0
+
+    def refill(self, key):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.buckets.clear()
+
+
+login_buckets = TokenBuckets()
+
+
+def account_key(email):
+    return f'account:{email.strip().lower()}'
+
+
+def take_login_attempt(request, email):
+    """
+    Charge a login attempt to its IP and account buckets; returns 0 when
+    it may go ahead, else the seconds to wait (for Retry-After)
+    """
+    rates = get_rates()
+    charges = []
+    for scope, key in (('ip', f'ip:{BaseThrottle().get_ident(request)}'), ('account', account_key(email))):
+        parsed = parse_rate(rates[scope])
+        if parsed is not None:
+            charges.append((key, *parsed))
+    return login_buckets.take(charges) if charges else 0
+
+
+def login_succeeded(email):
+    login_buckets.refill(account_key(email))
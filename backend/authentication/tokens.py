@@ -0,0 +1,28 @@
+"""
+Refresh tokens checked against authentication.blacklist.
+
+simplejwt's own blacklist (its token_blacklist app) stores every issued
+token in full; this one stores only revoked ones, as a 64-bit jti hash and
+an expiry, and answers most checks from memory.
+"""
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from .blacklist import is_revoked, revoke
+
+
+class RevocableRefreshToken(RefreshToken):
+
+    def verify(self, *args, **kwargs):
+        super().verify(*args, **kwargs)
+        self.check_blacklist()
+
+    def check_blacklist(self):
+        if is_revoked(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_('Token is blacklisted'))
+
+    def blacklist(self):
+        """Revoke the token; a token that already was can't be used again"""
+        if not revoke(self.payload[api_settings.JTI_CLAIM], self.payload['exp']):
+            raise TokenError(_('Token is blacklisted'))
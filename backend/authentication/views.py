@@ -1,3 +1,4 @@
+import math
 from rest_framework import status, generics
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -5,6 +6,7 @@ from rest_framework.response import Response
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
 from .serializers import SignupSerializer, LoginSerializer, UserSerializer
+from .throttling import login_succeeded, take_login_attempt
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -37,25 +39,33 @@ class SignupView(generics.CreateAPIView):
 @api_view(['POST'])
 @permission_classes([AllowAny])
 def login_view(request):
-    """User Login View"""
+    """
+    User Login View
+
+    Attempts are throttled per IP and per account before anything is
+    hashed (see throttling.py). authenticate() looks the user up by email
+    once and hashes a dummy password for unknown emails, so both cost
+    the same.
+    """
     serializer = LoginSerializer(data=request.data)
     
     if serializer.is_valid():
         email = serializer.validated_data['email']
         password = serializer.validated_data['password']
         
-        try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
+        wait = take_login_attempt(request, email)
+        if wait:
             return Response(
-                {'error': 'Invalid email or password'},
-                status=status.HTTP_401_UNAUTHORIZED
+                {'error': 'Too many login attempts. Please try again later.'},
+                status=status.HTTP_429_TOO_MANY_REQUESTS,
+                headers={'Retry-After': str(math.ceil(wait))},
             )
         
         # Authenticate user
-        user = authenticate(request, username=user.username, password=password)
+        user = authenticate(request, email=email, password=password)
         
         if user is not None:
+            login_succeeded(email)
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
             
@@ -0,0 +1,48 @@
+import uuid
+from django.conf import settings
+from django.db import models
+from products.models import Product
+
+
+class Cart(models.Model):
+    """
+    Server-side shopping cart. Anonymous carts are addressed by their
+    unguessable token; a cart created by a signed-in user is also linked
+    to that user.
+    """
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, related_name='carts', on_delete=models.CASCADE, null=True, blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'carts'
+        ordering = ['-updated_at']
+    
+    def __str__(self):
+        return f"Cart {self.token}"
+
+
+class CartItem(models.Model):
+    """
+    One product line in a cart. unit_price is the product's price when the
+    line was last set, so validation can report price changes since.
+    """
+    cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='cart_items', on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField(default=1)
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    added_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'cart_items'
+        ordering = ['added_at', 'id']
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'product'], name='cart_item_cart_product_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.product_id} in {self.cart_id}"
@@ -0,0 +1,93 @@
+from collections import Counter
+from decimal import Decimal
+from django.conf import settings
+from rest_framework import serializers
+from .models import Cart, CartItem
+
+
+def get_max_quantity():
+    return getattr(settings, 'CART_MAX_QUANTITY', 99)
+
+
+class CartItemInputSerializer(serializers.Serializer):
+    """One line of a bulk update; quantity 0 removes the line"""
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=0)
+
+    def validate_quantity(self, value):
+        if value > get_max_quantity():
+            raise serializers.ValidationError(f'At most {get_max_quantity()} per product.')
+        return value
+
+
+class CartItemsInputSerializer(serializers.Serializer):
+    """Bulk update payload: {"items": [{"product": 1, "quantity": 2}, ...]}"""
+    items = CartItemInputSerializer(many=True)
+
+    def validate_items(self, items):
+        counts = Counter(item['product'] for item in items)
+        duplicates = sorted(product_id for product_id, count in counts.items() if count > 1)
+        if duplicates:
+            raise serializers.ValidationError(f'Duplicate products: {duplicates}.')
+        return items
+
+
+class ValidateLineSerializer(CartItemInputSerializer):
+    """A client-side cart line to validate, with the price the client showed"""
+    quantity = serializers.IntegerField(min_value=1)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False, allow_null=True)
+
+
+class ValidateLinesSerializer(CartItemsInputSerializer):
+    items = ValidateLineSerializer(many=True)
+
+
+class ValidatedLineSerializer(serializers.Serializer):
+    """Output of cart.validation.validate_lines for one line"""
+    product = serializers.IntegerField()
+    name = serializers.CharField(allow_null=True)
+    quantity = serializers.IntegerField()
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    expectedPrice = serializers.DecimalField(max_digits=10, decimal_places=2, allow_null=True)
+    inStock = serializers.BooleanField()
+    stock = serializers.IntegerField(allow_null=True)
+    issues = serializers.ListField(child=serializers.CharField())
+
+
+class CartValidationSerializer(serializers.Serializer):
+    valid = serializers.BooleanField()
+    items = ValidatedLineSerializer(many=True)
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class CartItemSerializer(serializers.ModelSerializer):
+    """A cart line with the product fields the cart page renders"""
+    name = serializers.CharField(source='product.name', read_only=True)
+    image = serializers.CharField(source='product.image', read_only=True)
+    alt = serializers.CharField(source='product.alt', read_only=True)
+    unitPrice = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, read_only=True)
+    price = serializers.DecimalField(source='product.price', max_digits=10, decimal_places=2, read_only=True)
+    inStock = serializers.BooleanField(source='product.in_stock', read_only=True)
+
+    class Meta:
+        model = CartItem
+        fields = ['product', 'name', 'image', 'alt', 'quantity', 'unitPrice', 'price', 'inStock']
+
+
+class CartSerializer(serializers.ModelSerializer):
+    items = CartItemSerializer(many=True, read_only=True)
+    itemCount = serializers.SerializerMethodField()
+    subtotal = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Cart
+        fields = ['token', 'items', 'itemCount', 'subtotal', 'created_at', 'updated_at']
+        read_only_fields = fields
+
+    def get_itemCount(self, obj):
+        """Sum of quantities"""
+        return sum(item.quantity for item in obj.items.all())
+
+    def get_subtotal(self, obj):
+        """Subtotal at current prices, as a string like the product prices"""
+        return str(sum((item.product.price * item.quantity for item in obj.items.all()), Decimal('0.00')))
@@ -0,0 +1,127 @@
+from decimal import Decimal
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from products.models import Product
+from products.tests import make_product
+
+
+class CartTestCase(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.products = [make_product(name=f'P{index}', price=Decimal(100 + index)) for index in range(3)]
+
+    def create_cart(self, items=()):
+        response = self.client.post('/api/cart/', {'items': list(items)}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        return response.data
+
+    def lines(self, data):
+        return {item['product']: item['quantity'] for item in data['items']}
+
+
+class CartItemsTests(CartTestCase):
+    """Idempotent bulk add/update/remove of cart lines"""
+
+    def test_create_with_items(self):
+        first, second, _ = self.products
+        data = self.create_cart([{'product': first.id, 'quantity': 2}, {'product': second.id, 'quantity': 1}])
+        self.assertEqual(self.lines(data), {first.id: 2, second.id: 1})
+        self.assertEqual(data['itemCount'], 3)
+        self.assertEqual(data['subtotal'], '301.00')
+
+        fetched = self.client.get(f'/api/cart/{data["token"]}/').data
+        self.assertEqual(self.lines(fetched), {first.id: 2, second.id: 1})
+
+    def test_put_replaces_and_is_idempotent(self):
+        first, second, third = self.products
+        token = self.create_cart([{'product': first.id, 'quantity': 1}])['token']
+        payload = {'items': [{'product': second.id, 'quantity': 3}, {'product': third.id, 'quantity': 1}]}
+        once = self.client.put(f'/api/cart/{token}/items/', payload, format='json').data
+        twice = self.client.put(f'/api/cart/{token}/items/', payload, format='json').data
+        self.assertEqual(self.lines(once), {second.id: 3, third.id: 1})
+        self.assertEqual(self.lines(twice), self.lines(once))
+
+    def test_patch_sets_given_lines_only(self):
+        first, second, third = self.products
+        token = self.create_cart([{'product': first.id, 'quantity': 1}, {'product': second.id, 'quantity': 1}])['token']
+        payload = {'items': [{'product': first.id, 'quantity': 0}, {'product': third.id, 'quantity': 2}]}
+        data = self.client.patch(f'/api/cart/{token}/items/', payload, format='json').data
+        self.assertEqual(self.lines(data), {second.id: 1, third.id: 2})
+
+    def test_rejects_unknown_products_and_duplicates(self):
+        token = self.create_cart()['token']
+        response = self.client.put(f'/api/cart/{token}/items/', {'items': [{'product': 999, 'quantity': 1}]}, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['unknownProducts'], ['999'])
+        product_id = self.products[0].id
+        duplicated = {'items': [{'product': product_id, 'quantity': 1}, {'product': product_id, 'quantity': 2}]}
+        response = self.client.put(f'/api/cart/{token}/items/', duplicated, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_update_query_count_does_not_grow_with_lines(self):
+        token = self.create_cart()['token']
+        products = [make_product(name=f'Bulk {index}') for index in range(20)]
+
+        def put(count):
+            payload = {'items': [{'product': product.id, 'quantity': 1} for product in products[:count]]}
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.put(f'/api/cart/{token}/items/', payload, format='json')
+            self.assertEqual(len(response.data['items']), count)
+            return len(queries)
+
+        self.assertEqual(put(2), put(20))
+
+
+class CartValidationTests(CartTestCase):
+    """Whole-cart price/stock validation with one product query"""
+
+    def test_reports_price_and_stock_changes(self):
+        first, second, third = self.products
+        token = self.create_cart([
+            {'product': first.id, 'quantity': 1},
+            {'product': second.id, 'quantity': 2},
+            {'product': third.id, 'quantity': 1},
+        ])['token']
+        Product.objects.filter(pk=first.pk).update(price=Decimal('150.00'))
+        Product.objects.filter(pk=second.pk).update(in_stock=False)
+
+        # Cart + its lines, then one id__in query for every product
+        with self.assertNumQueries(3):
+            data = self.client.get(f'/api/cart/{token}/validate/').data
+        self.assertFalse(data['valid'])
+        issues = {item['product']: item['issues'] for item in data['items']}
+        self.assertEqual(issues, {first.id: ['price_changed'], second.id: ['out_of_stock'], third.id: []})
+
+        # POST accepts the current prices
+        self.client.post(f'/api/cart/{token}/validate/')
+        data = self.client.get(f'/api/cart/{token}/validate/').data
+        issues = {item['product']: item['issues'] for item in data['items']}
+        self.assertEqual(issues[first.id], [])
+
+    def test_validate_client_side_lines(self):
+        first, second, _ = self.products
+        payload = {'items': [
+            {'product': first.id, 'quantity': 2, 'price': '100.00'},
+            {'product': second.id, 'quantity': 1, 'price': '1.00'},
+            {'product': 999, 'quantity': 1},
+        ]}
+        with self.assertNumQueries(1):
+            data = self.client.post('/api/cart/validate/', payload, format='json').data
+        self.assertEqual([item['issues'] for item in data['items']], [[], ['price_changed'], ['unavailable']])
+        self.assertEqual(data['subtotal'], '301.00')
+
+    def test_reports_quantity_above_tracked_stock(self):
+        first, second, third = self.products
+        Product.objects.filter(pk=first.pk).update(stock=2, in_stock=True)
+        Product.objects.filter(pk=second.pk).update(stock=5, in_stock=True)
+        payload = {'items': [
+            {'product': first.id, 'quantity': 3},
+            {'product': second.id, 'quantity': 5},
+            {'product': third.id, 'quantity': 50},
+        ]}
+        data = self.client.post('/api/cart/validate/', payload, format='json').data
+        self.assertFalse(data['valid'])
+        self.assertEqual([item['issues'] for item in data['items']], [['insufficient_stock'], [], []])
+        self.assertEqual([item['stock'] for item in data['items']], [2, 5, None])
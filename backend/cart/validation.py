@@ -0,0 +1,61 @@
+"""
+Batched price/stock validation of cart lines.
+
+Every line of a cart is checked against the current Product.price,
+Product.in_stock and (when tracked) Product.stock with a single id__in
+query, so validating a cart costs the same whatever the number of lines.
+"""
+from decimal import Decimal
+from products.models import Product
+
+# Issues reported per line
+UNAVAILABLE = 'unavailable'
+OUT_OF_STOCK = 'out_of_stock'
+# Fewer units in stock than the line's quantity; placing the order would fail
+INSUFFICIENT_STOCK = 'insufficient_stock'
+PRICE_CHANGED = 'price_changed'
+
+
+def load_products(product_ids):
+    """{id: product} with just the columns validation and display need, in one query"""
+    return Product.objects.only('id', 'name', 'price', 'in_stock', 'stock', 'image', 'alt').in_bulk(list(product_ids))
+
+
+def validate_lines(lines):
+    """
+    Check lines ({'product': id, 'quantity': n, 'price': expected or None})
+    against the catalog. Returns {'valid', 'items', 'subtotal'}, where each
+    item carries the current price and its list of issues.
+    """
+    products = load_products({line['product'] for line in lines})
+    items = []
+    subtotal = Decimal('0.00')
+    for line in lines:
+        product = products.get(line['product'])
+        expected = line.get('price')
+        issues = []
+        if product is None:
+            issues.append(UNAVAILABLE)
+        else:
+            if not product.in_stock:
+                issues.append(OUT_OF_STOCK)
+            elif product.stock is not None and product.stock < line['quantity']:
+                issues.append(INSUFFICIENT_STOCK)
+            if expected is not None and expected != product.price:
+                issues.append(PRICE_CHANGED)
+            subtotal += product.price * line['quantity']
+        items.append({
+            'product': line['product'],
+            'name': product.name if product else None,
+            'quantity': line['quantity'],
+            'price': product.price if product else None,
+            'expectedPrice': expected,
+            'inStock': bool(product and product.in_stock),
+            'stock': product.stock if product else None,
+            'issues': issues,
+        })
+    return {
+        'valid': not any(item['issues'] for item in items),
+        'items': items,
+        'subtotal': subtotal,
+    }
@@ -0,0 +1,125 @@
+from django.db import transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import AllowAny
+from rest_framework.response import Response
+from .models import Cart, CartItem
+from .serializers import (
+    CartItemsInputSerializer, CartSerializer, CartValidationSerializer, ValidateLinesSerializer,
+)
+from .validation import load_products, validate_lines
+
+
+class CartViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin,
+                  mixins.DestroyModelMixin, viewsets.GenericViewSet):
+    """
+    Server-side carts, addressed by their token
+    - POST /api/cart/ - Create a cart, optionally with {"items": [...]}
+    - GET /api/cart/{token}/ - Cart with its lines at current prices
+    - DELETE /api/cart/{token}/ - Delete the cart
+    - PUT /api/cart/{token}/items/ - Replace all lines: {"items": [{"product": 1, "quantity": 2}]}
+    - PATCH /api/cart/{token}/items/ - Set the given lines only; quantity 0 removes a line
+    - GET /api/cart/{token}/validate/ - Check every line's price/stock in one query
+    - POST /api/cart/{token}/validate/ - Same, then accept the current prices
+    - POST /api/cart/validate/ - Validate client-side lines: {"items": [{"product", "quantity", "price"}]}
+    Quantities are absolute, so repeating a request leaves the cart unchanged.
+    """
+    queryset = Cart.objects.all()
+    serializer_class = CartSerializer
+    permission_classes = [AllowAny]  # The unguessable token is the credential
+    lookup_field = 'token'
+
+    def get_queryset(self):
+        """Cart lines with their products, in one extra query"""
+        return super().get_queryset().prefetch_related(
+            Prefetch('items', queryset=CartItem.objects.select_related('product').order_by('added_at', 'id'))
+        )
+
+    def create(self, request, *args, **kwargs):
+        """Create a cart (linked to the user when signed in), with optional initial lines"""
+        items = []
+        if 'items' in request.data:
+            payload = CartItemsInputSerializer(data=request.data)
+            payload.is_valid(raise_exception=True)
+            items = payload.validated_data['items']
+        with transaction.atomic():
+            cart = Cart.objects.create(user=request.user if request.user.is_authenticated else None)
+            self.set_items(cart, items, replace=True)
+        cart = self.get_queryset().get(pk=cart.pk)
+        return Response(self.get_serializer(cart).data, status=status.HTTP_201_CREATED)
+
+    @action(detail=True, methods=['put', 'patch'])
+    def items(self, request, token=None):
+        """Idempotent bulk add/update/remove of cart lines"""
+        payload = CartItemsInputSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        cart = self.get_object()
+        with transaction.atomic():
+            self.set_items(cart, payload.validated_data['items'], replace=request.method == 'PUT')
+        cart = self.get_queryset().get(pk=cart.pk)
+        return Response(self.get_serializer(cart).data)
+
+    def set_items(self, cart, items, replace):
+        """
+        Write the submitted lines with one upsert and one delete. Lines are
+        looked up with a single id__in query; unknown products are a 400.
+        A line's unit_price is the product price when the line was added.
+        """
+        quantities = {item['product']: item['quantity'] for item in items}
+        wanted = {product_id: quantity for product_id, quantity in quantities.items() if quantity > 0}
+        products = load_products(wanted)
+        unknown = sorted(set(wanted) - set(products))
+        if unknown:
+            raise ValidationError({'unknownProducts': unknown})
+
+        now = timezone.now()
+        if wanted:
+            CartItem.objects.bulk_create(
+                [
+                    CartItem(cart=cart, product_id=product_id, quantity=quantity,
+                             unit_price=products[product_id].price, added_at=now, updated_at=now)
+                    for product_id, quantity in wanted.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['cart', 'product'],
+                update_fields=['quantity', 'updated_at'],
+            )
+        stale = CartItem.objects.filter(cart=cart)
+        if replace:
+            stale = stale.exclude(product_id__in=list(wanted))
+        else:
+            stale = stale.filter(product_id__in=[pid for pid, quantity in quantities.items() if quantity == 0])
+        stale.delete()
+        Cart.objects.filter(pk=cart.pk).update(updated_at=now)
+
+    @action(detail=True, methods=['get', 'post'])
+    def validate(self, request, token=None):
+        """
+        Check the whole cart against current prices and stock. POST also
+        re-prices the lines to the current prices (the shopper accepted them).
+        """
+        cart = self.get_object()
+        lines = cart.items.all()
+        result = validate_lines([
+            {'product': item.product_id, 'quantity': item.quantity, 'price': item.unit_price}
+            for item in lines
+        ])
+        if request.method == 'POST':
+            repriced = []
+            for item, line in zip(lines, result['items']):
+                if line['price'] is not None and item.unit_price != line['price']:
+                    item.unit_price = line['price']
+                    repriced.append(item)
+            CartItem.objects.bulk_update(repriced, ['unit_price'])
+        return Response(CartValidationSerializer(result).data)
+
+    @action(detail=False, methods=['post'], url_path='validate')
+    def validate_items(self, request):
+        """Validate client-side cart lines (e.g. a localStorage cart) without storing them"""
+        payload = ValidateLinesSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        result = validate_lines(payload.validated_data['items'])
+        return Response(CartValidationSerializer(result).data)
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from .models import Order, OrderItem
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    extra = 0
+    raw_id_fields = ('product',)
+
+
+@admin.register(Order)
+class OrderAdmin(admin.ModelAdmin):
+    list_display = ('id', 'user', 'status', 'total', 'created_at')
+    list_filter = ('status', 'created_at')
+    search_fields = ('user__email', 'tracking_number')
+    raw_id_fields = ('user',)
+    inlines = [OrderItemInline]
@@ -0,0 +1,60 @@
+import uuid
+from decimal import Decimal
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Sum
+from orders.models import Order, OrderItem
+from orders.stress import run_buyers
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = (
+        'Stress-test order placement: concurrent buyers race for one product '
+        'until it sells out. Reports orders per second and checks nothing was '
+        'oversold. Creates a throwaway product and users and deletes them after.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buyers', type=int, default=50, help='Concurrent buyers (threads)')
+        parser.add_argument('--stock', type=int, default=1000, help='Units of the product on sale')
+        parser.add_argument('--quantity', type=int, default=1, help='Units per order')
+
+    def handle(self, *args, **options):
+        buyers, stock, quantity = options['buyers'], options['stock'], options['quantity']
+        if buyers < 1 or stock < 0 or quantity < 1:
+            raise CommandError('--buyers and --quantity must be positive, --stock non-negative.')
+
+        User = get_user_model()
+        run_id = uuid.uuid4().hex[:8]
+        users = [
+            User.objects.create_user(
+                email=f'stress-{run_id}-{index}@example.com', username=f'stress-{run_id}-{index}',
+                password=None, first_name='Stress', last_name=str(index),
+            )
+            for index in range(buyers)
+        ]
+        product = Product.objects.create(
+            name=f'Stress test {run_id}', category='Idols', price=Decimal('10.00'),
+            image='https://example.com/stress.webp', stock=stock,
+        )
+        try:
+            result = run_buyers(users, product.pk, quantity)
+            product.refresh_from_db()
+            sold = OrderItem.objects.filter(product=product).aggregate(total=Sum('quantity'))['total'] or 0
+        finally:
+            Order.objects.filter(user__in=users).delete()
+            product.delete()
+            User.objects.filter(pk__in=[user.pk for user in users]).delete()
+
+        if result['errors']:
+            raise CommandError(f'{len(result["errors"])} buyer(s) failed: {result["errors"][0]!r}')
+        self.stdout.write(
+            f'{result["orders"]} orders by {buyers} buyers in {result["elapsed"]:.2f}s '
+            f'({result["orders"] / max(result["elapsed"], 1e-6):.0f} orders/s), '
+            f'{result["busy"]} gave up on a locked database'
+        )
+        self.stdout.write(f'Sold {sold} of {stock} units, {product.stock} left')
+        if sold + product.stock != stock or sold != result['orders'] * quantity:
+            raise CommandError('Stock accounting is off: units were oversold or lost.')
+        self.stdout.write(self.style.SUCCESS('✓ No overselling'))
@@ -0,0 +1,60 @@
+from django.conf import settings
+from django.db import models
+from products.models import Product
+
+# Order numbers shown to shoppers start here ("CF-10001", ...)
+ORDER_NUMBER_BASE = 10000
+
+
+class Order(models.Model):
+    """A placed order; its lines keep what was bought at the price paid"""
+    
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Processing', 'Processing'),
+        ('Shipped', 'Shipped'),
+        ('Delivered', 'Delivered'),
+        ('Cancelled', 'Cancelled'),
+    ]
+    
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, related_name='orders', on_delete=models.CASCADE)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    tracking_number = models.CharField(max_length=64, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'orders'
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Order history reads one user's orders newest first
+            models.Index(fields=['user', '-created_at', '-id'], name='orders_user_created_idx'),
+        ]
+    
+    def __str__(self):
+        return self.number
+    
+    @property
+    def number(self):
+        return f"CF-{ORDER_NUMBER_BASE + self.pk}"
+
+
+class OrderItem(models.Model):
+    """
+    One line of an order. name, image and unit_price are copied from the
+    product when the order is placed, so later catalog edits (or deleting
+    the product) don't rewrite order history.
+    """
+    order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, related_name='order_items', on_delete=models.SET_NULL, null=True, blank=True)
+    name = models.CharField(max_length=255)
+    image = models.URLField(max_length=500)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    
+    class Meta:
+        db_table = 'order_items'
+        ordering = ['id']
+    
+    def __str__(self):
+        return f"{self.quantity} x {self.name} in {self.order_id}"
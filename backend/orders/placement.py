@@ -0,0 +1,122 @@
+"""
+Order placement under contention.
+
+Stock is taken with one conditional UPDATE per line
+(ProductQuerySet.reserve_stock: ... WHERE stock >= n), so two buyers racing
+for the last unit can't both get it - the loser's UPDATE matches no row and
+its whole order rolls back. No row is read and then written back, so there
+is nothing to lose to a concurrent writer.
+
+The transaction is kept short: the stock updates come first, then one read
+of the bought products and the order inserts, and nothing else runs while
+it is open. Writing first also matters on SQLite, which allows one writer at
+a time: a transaction that read before writing can't wait for the write lock
+and fails at once. When the lock is still busy after the connection's
+timeout, SQLite raises "database is locked"; the transaction has rolled back
+by then, so the whole placement is retried after a jittered backoff.
+"""
+import random
+import time
+from decimal import Decimal
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from products.models import Product
+from .models import Order, OrderItem
+
+
+class InsufficientStock(Exception):
+    """Some lines could not be reserved; `shortages` lists them"""
+
+    def __init__(self, shortages=()):
+        super().__init__('Insufficient stock.')
+        self.shortages = list(shortages)
+
+
+def get_lock_retries():
+    return getattr(settings, 'ORDERS_LOCK_RETRIES', 5)
+
+
+def get_retry_backoff():
+    return getattr(settings, 'ORDERS_RETRY_BACKOFF', 0.05)
+
+
+def is_lock_error(error):
+    """SQLite's busy errors (the second one is what shared-cache databases raise)"""
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def with_lock_retry(func, *args, **kwargs):
+    """
+    Call func, retrying when the database is locked. Only retries when func
+    owns its transaction; inside an outer atomic block the error propagates.
+    """
+    retries = get_lock_retries()
+    for attempt in range(retries + 1):
+        try:
+            return func(*args, **kwargs)
+        except OperationalError as e:
+            if attempt == retries or connection.in_atomic_block or not is_lock_error(e):
+                raise
+        time.sleep(get_retry_backoff() * 2 ** attempt * random.uniform(0.5, 1.5))
+
+
+def place_order(user, lines, cart=None):
+    """
+    Place an order for lines ({'product': id, 'quantity': n}, one per
+    product). Raises InsufficientStock when any line can't be fully
+    reserved; nothing is written in that case. A cart's lines are removed
+    in the same transaction.
+    """
+    try:
+        return with_lock_retry(create_order, user, lines, cart)
+    except InsufficientStock:
+        raise InsufficientStock(find_shortages(lines))
+
+
+@transaction.atomic
+def create_order(user, lines, cart=None):
+    # Lock rows in a consistent order so databases with row locks can't deadlock
+    lines = sorted(lines, key=lambda line: line['product'])
+    for line in lines:
+        if not Product.objects.filter(pk=line['product']).reserve_stock(line['quantity']):
+            raise InsufficientStock()
+
+    products = Product.objects.only('id', 'name', 'image', 'price').in_bulk([line['product'] for line in lines])
+    items = [
+        OrderItem(
+            product_id=line['product'],
+            name=products[line['product']].name,
+            image=products[line['product']].image,
+            quantity=line['quantity'],
+            unit_price=products[line['product']].price,
+        )
+        for line in lines
+    ]
+    order = Order.objects.create(
+        user=user,
+        total=sum((item.unit_price * item.quantity for item in items), Decimal('0.00')),
+    )
+    for item in items:
+        item.order = order
+    OrderItem.objects.bulk_create(items)
+    if cart is not None:
+        cart.items.filter(product_id__in=[line['product'] for line in lines]).delete()
+    return order
+
+
+def find_shortages(lines):
+    """Lines that can't be filled right now, with the quantity available"""
+    products = Product.objects.only('id', 'stock', 'in_stock').in_bulk([line['product'] for line in lines])
+    shortages = []
+    for line in lines:
+        product = products.get(line['product'])
+        if product is None or not product.in_stock:
+            available = 0
+        elif product.stock is None:
+            continue
+        else:
+            available = product.stock
+        if available < line['quantity']:
+            shortages.append({'product': line['product'], 'requested': line['quantity'], 'available': available})
+    return shortages
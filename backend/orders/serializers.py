@@ -0,0 +1,43 @@
+from rest_framework import serializers
+from cart.serializers import CartItemInputSerializer, CartItemsInputSerializer
+from .models import Order, OrderItem
+
+
+class OrderLineSerializer(CartItemInputSerializer):
+    quantity = serializers.IntegerField(min_value=1)
+
+
+class PlaceOrderSerializer(CartItemsInputSerializer):
+    """
+    Order payload: {"items": [{"product": 1, "quantity": 2}, ...]}, or
+    {"cart": "<token>"} to order a server-side cart's lines
+    """
+    items = OrderLineSerializer(many=True, required=False)
+    cart = serializers.UUIDField(required=False)
+
+    def validate(self, attrs):
+        if ('items' in attrs) == ('cart' in attrs):
+            raise serializers.ValidationError('Send either items or cart.')
+        if 'items' in attrs and not attrs['items']:
+            raise serializers.ValidationError({'items': 'An order needs at least one line.'})
+        return attrs
+
+
+class OrderItemSerializer(serializers.ModelSerializer):
+    """An order line as OrderHistory renders it; id is the product id"""
+    id = serializers.IntegerField(source='product_id', read_only=True)
+    price = serializers.DecimalField(source='unit_price', max_digits=10, decimal_places=2, read_only=True)
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'name', 'image', 'quantity', 'price']
+
+
+class OrderSerializer(serializers.ModelSerializer):
+    items = OrderItemSerializer(many=True, read_only=True)
+    trackingNumber = serializers.CharField(source='tracking_number', read_only=True)
+
+    class Meta:
+        model = Order
+        fields = ['id', 'number', 'status', 'total', 'trackingNumber', 'items', 'created_at']
+        read_only_fields = fields
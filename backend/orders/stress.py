@@ -0,0 +1,52 @@
+"""
+Concurrency harness for order placement: many buyers race for one product
+until it sells out. Used by the stress_orders command and the tests.
+"""
+import threading
+import time
+from django.db import OperationalError, connection
+from .placement import InsufficientStock, is_lock_error, place_order
+
+
+def run_buyers(users, product_id, quantity=1):
+    """
+    One thread per user; each keeps ordering `quantity` units of the product
+    until it is refused for lack of stock. Returns counts of placed orders,
+    lock failures (retries exhausted) and the elapsed wall time in seconds.
+    """
+    barrier = threading.Barrier(len(users))
+    lock = threading.Lock()
+    totals = {'orders': 0, 'busy': 0, 'errors': []}
+
+    def buy(user):
+        placed = busy = 0
+        try:
+            barrier.wait()
+            while True:
+                try:
+                    place_order(user, [{'product': product_id, 'quantity': quantity}])
+                except InsufficientStock:
+                    break
+                except OperationalError as e:
+                    if not is_lock_error(e):
+                        raise
+                    busy += 1
+                else:
+                    placed += 1
+        except Exception as e:
+            with lock:
+                totals['errors'].append(e)
+        finally:
+            connection.close()
+            with lock:
+                totals['orders'] += placed
+                totals['busy'] += busy
+
+    threads = [threading.Thread(target=buy, args=(user,)) for user in users]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    totals['elapsed'] = time.perf_counter() - start
+    return totals
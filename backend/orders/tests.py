@@ -0,0 +1,101 @@
+from decimal import Decimal
+from django.db import OperationalError
+from django.test import TestCase, TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+from unittest import mock
+from authentication.tests import make_user
+from cart.models import Cart, CartItem
+from products.tests import make_product
+from .models import Order
+from .placement import with_lock_retry
+from .stress import run_buyers
+
+
+class PlaceOrderTests(TestCase):
+    """Placing orders reserves stock with conditional updates"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = make_user()
+        self.client.force_authenticate(self.user)
+
+    def place(self, items):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/orders/', {'items': items}, format='json')
+
+    def test_order_decrements_stock_and_snapshots_lines(self):
+        product = make_product(stock=3)
+        untracked = make_product(name='Untracked', price=Decimal('20.00'))
+        response = self.place([{'product': product.id, 'quantity': 2}, {'product': untracked.id, 'quantity': 5}])
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(response.data['total'], '300.00')
+        self.assertEqual(response.data['number'], f'CF-{10000 + response.data["id"]}')
+        self.assertEqual(
+            [(item['id'], item['quantity'], item['price']) for item in response.data['items']],
+            [(product.id, 2, '100.00'), (untracked.id, 5, '20.00')],
+        )
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.in_stock), (1, True))
+
+        # Selling the last unit marks the product out of stock
+        self.place([{'product': product.id, 'quantity': 1}])
+        product.refresh_from_db()
+        self.assertEqual((product.stock, product.in_stock), (0, False))
+
+    def test_shortage_is_a_conflict_and_rolls_back(self):
+        plenty = make_product(stock=10)
+        scarce = make_product(name='Scarce', stock=1)
+        response = self.place([{'product': plenty.id, 'quantity': 2}, {'product': scarce.id, 'quantity': 2}])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.data['items'], [{'product': scarce.id, 'requested': 2, 'available': 1}])
+        plenty.refresh_from_db()
+        self.assertEqual(plenty.stock, 10)
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_from_cart_clears_it(self):
+        product = make_product(stock=5)
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, product=product, quantity=2, unit_price=product.price)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post('/api/orders/', {'cart': str(cart.token)}, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertFalse(cart.items.exists())
+
+    def test_history_lists_own_orders_only(self):
+        product = make_product()
+        self.place([{'product': product.id, 'quantity': 1}])
+        other = APIClient()
+        other.force_authenticate(make_user(1))
+        self.assertEqual(other.get('/api/orders/').data, [])
+        self.assertEqual(len(self.client.get('/api/orders/').data), 1)
+        self.assertEqual(APIClient().get('/api/orders/').status_code, 401)
+
+    def test_lock_errors_are_retried(self):
+        calls = []
+
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise OperationalError('database is locked')
+            return 'placed'
+
+        with override_settings(ORDERS_RETRY_BACKOFF=0), mock.patch('orders.placement.connection') as conn:
+            conn.in_atomic_block = False
+            self.assertEqual(with_lock_retry(flaky), 'placed')
+        self.assertEqual(len(calls), 3)
+
+
+@override_settings(ORDERS_LOCK_RETRIES=100, ORDERS_RETRY_BACKOFF=0.001)
+class ConcurrentOrderTests(TransactionTestCase):
+    """Many buyers racing for the same stock never oversell it"""
+
+    def test_fifty_buyers_do_not_oversell(self):
+        product = make_product(stock=120)
+        users = [make_user(index) for index in range(50)]
+        result = run_buyers(users, product.id, quantity=1)
+        self.assertEqual(result['errors'], [])
+        product.refresh_from_db()
+        self.assertEqual(product.stock, 0)
+        self.assertFalse(product.in_stock)
+        self.assertEqual(result['orders'], 120)
+        self.assertEqual(Order.objects.count(), 120)
@@ -0,0 +1,61 @@
+from django.db import OperationalError
+from django.db.models import Q
+from django.shortcuts import get_object_or_404
+from rest_framework import mixins, status, viewsets
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from cart.models import Cart
+from .models import Order
+from .placement import InsufficientStock, is_lock_error, place_order
+from .serializers import OrderSerializer, PlaceOrderSerializer
+
+
+class OrderViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                   mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    The signed-in user's orders
+    - GET /api/orders/ - Order history, newest first
+    - GET /api/orders/{id}/ - One order
+    - POST /api/orders/ - Place an order: {"items": [{"product": 1, "quantity": 2}]}
+      or {"cart": "<token>"}. Stock is reserved atomically; 409 lists the
+      lines that can't be filled, 503 means the store was too busy to try.
+    """
+    serializer_class = OrderSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return Order.objects.filter(user=self.request.user).prefetch_related('items')
+
+    def create(self, request, *args, **kwargs):
+        payload = PlaceOrderSerializer(data=request.data)
+        payload.is_valid(raise_exception=True)
+        cart = None
+        if 'cart' in payload.validated_data:
+            # Anonymous carts can be checked out by whoever holds the token
+            cart = get_object_or_404(
+                Cart.objects.filter(Q(user__isnull=True) | Q(user=request.user)),
+                token=payload.validated_data['cart'],
+            )
+            lines = [{'product': item.product_id, 'quantity': item.quantity} for item in cart.items.all()]
+            if not lines:
+                return Response({'detail': 'The cart is empty.'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            lines = payload.validated_data['items']
+
+        try:
+            order = place_order(request.user, lines, cart=cart)
+        except InsufficientStock as e:
+            return Response(
+                {'detail': 'Not enough stock for some items.', 'items': e.shortages},
+                status=status.HTTP_409_CONFLICT,
+            )
+        except OperationalError as e:
+            if not is_lock_error(e):
+                raise
+            return Response(
+                {'detail': 'The store is busy, please try again.'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={'Retry-After': '1'},
+            )
+        order = self.get_queryset().get(pk=order.pk)
+        return Response(self.get_serializer(order).data, status=status.HTTP_201_CREATED)
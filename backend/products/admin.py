@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import Product, SubDescription, ProductThumbnail, Review
+from .search import filter_by_search
 
 
 class SubDescriptionInline(admin.TabularInline):
@@ -20,10 +21,22 @@ class ReviewInline(admin.TabularInline):
 
 @admin.register(Product)
 class ProductAdmin(admin.ModelAdmin):
-    list_display = ['name', 'category', 'price', 'rating', 'in_stock', 'created_at']
+    list_display = ['name', 'category', 'price', 'rating', 'in_stock', 'stock', 'created_at']
     list_filter = ['category', 'in_stock', 'created_at']
     search_fields = ['name', 'description']
     inlines = [SubDescriptionInline, ProductThumbnailInline, ReviewInline]
+    readonly_fields = ['review_count', 'rating_sum']
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Use the full-text index instead of LIKE '%term%' table scans"""
+        if not search_term.strip():
+            return queryset, False
+        return filter_by_search(queryset, search_term), False
+    
+    def save_related(self, request, form, formsets, change):
+        """Review inlines may have changed, so rebuild the rating aggregates"""
+        super().save_related(request, form, formsets, change)
+        Product.objects.filter(pk=form.instance.pk).rebuild_rating_aggregates()
 
 
 @admin.register(Review)
@@ -31,3 +44,16 @@ class ReviewAdmin(admin.ModelAdmin):
     list_display = ['product', 'user_name', 'rating', 'date']
     list_filter = ['rating', 'date']
     search_fields = ['user_name', 'comment']
+    
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        Product.objects.filter(pk=obj.product_id).rebuild_rating_aggregates()
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        Product.objects.filter(pk=obj.product_id).rebuild_rating_aggregates()
+    
+    def delete_queryset(self, request, queryset):
+        product_ids = list(queryset.values_list('product_id', flat=True).distinct())
+        super().delete_queryset(request, queryset)
+        Product.objects.filter(pk__in=product_ids).rebuild_rating_aggregates()
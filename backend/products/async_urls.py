@@ -0,0 +1,11 @@
+from django.urls import path, re_path
+from . import async_views
+
+# Served under ASGI only (see tatva_backend.asgi_urls); ids are numeric so
+# the router's other detail=False actions (search/, changes/) fall through
+urlpatterns = [
+    path('products/', async_views.list_view, name='product-list-async'),
+    path('products/facets/', async_views.facets_view, name='product-facets-async'),
+    re_path(r'^products/(?P<pk>[0-9]+)/$', async_views.detail_view, name='product-detail-async'),
+    re_path(r'^products/(?P<pk>[0-9]+)/reviews/$', async_views.reviews_view, name='product-reviews-async'),
+]
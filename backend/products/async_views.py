@@ -0,0 +1,134 @@
+"""
+Async versions of the read-heavy catalog endpoints, for ASGI.
+
+Under ASGI (see tatva_backend.middleware.asgi_urlconf_middleware) GET and
+HEAD on these URLs are served here instead of by ProductViewSet:
+- /api/products/ (list)
+- /api/products/{id}/ (detail)
+- /api/products/facets/
+- /api/products/{id}/reviews/
+A request waiting on the cache or the database then parks a coroutine
+instead of holding a worker thread. The responses are the same as the sync
+views': the same filters, fieldsets, cache keys, ETags and serializers,
+with queries run on Django's async ORM and the cache read through its
+async API. Other methods fall through to ProductViewSet.
+
+REST framework's views are synchronous, so these are plain Django views
+that render with the project's JSON renderer themselves.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from rest_framework.request import Request
+from tatva_backend.renderers import FastJSONRenderer
+from . import facets, fieldsets, images
+from .cache import aget_or_build
+from .conditional import adetail_validators, alist_validators, not_modified_response, set_validator_headers
+from .filters import filter_products, get_sort_ordering
+from .models import Product, Review
+from .pagination import KeysetPagination, ReviewPagination
+from .serializers import ProductListSerializer, ProductSerializer, ReviewSerializer
+from .views import ProductViewSet
+
+renderer = FastJSONRenderer()
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    return HttpResponse(renderer.render(data), content_type='application/json', status=status_code)
+
+
+def error_response(exc):
+    """The body and status REST framework's exception handler would give"""
+    data = exc.detail if isinstance(exc.detail, (list, dict)) else {'detail': exc.detail}
+    return json_response(data, exc.status_code)
+
+
+def read_only(async_view, fallback):
+    """
+    Serve GET/HEAD with async_view and every other method with the sync
+    fallback view; API errors become JSON responses
+    """
+    @csrf_exempt
+    async def view(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await sync_to_async(fallback)(request, *args, **kwargs)
+        try:
+            return await async_view(Request(request), *args, **kwargs)
+        except APIException as exc:
+            return error_response(exc)
+    return view
+
+
+async def list_context(products, fieldset):
+    """Async ProductViewSet.get_list_context"""
+    context = {'fieldset': fieldset}
+    if 'image' in fieldset:
+        context['image_variants'] = await sync_to_async(images.variant_urls)(
+            [product.image for product in products], images.get_list_width()
+        )
+    return context
+
+
+async def product_list(request):
+    fieldset = fieldsets.get_fieldset(request.query_params, ProductListSerializer)
+    queryset = filter_products(Product.objects.all(), request.query_params)
+    queryset = queryset.order_by(*get_sort_ordering(request.query_params))
+
+    validators = await aget_or_build('list-validators', request, lambda: alist_validators(queryset, request))
+    not_modified = not_modified_response(request, validators)
+    if not_modified is not None:
+        return not_modified
+
+    async def build():
+        ordering = [field.lstrip('-') for field in queryset.query.order_by]
+        paginator = KeysetPagination()
+        page = await paginator.apaginate_queryset(fieldsets.shape_queryset(queryset, fieldset, keep=ordering), request)
+        serializer = ProductListSerializer(page, many=True, context=await list_context(page, fieldset))
+        return {'next': paginator.get_next_link(), 'results': serializer.data}
+    return set_validator_headers(json_response(await aget_or_build('list', request, build)), validators)
+
+
+async def product_detail(request, pk):
+    fieldset = fieldsets.get_fieldset(request.query_params, ProductSerializer)
+
+    async def validate():
+        return await adetail_validators(Product.objects.all(), pk, fieldsets.fieldset_key(fieldset))
+    validators = await aget_or_build('detail-validators', request, validate)
+    if validators is None:
+        raise NotFound()
+    not_modified = not_modified_response(request, validators)
+    if not_modified is not None:
+        return not_modified
+
+    async def build():
+        try:
+            instance = await fieldsets.shape_queryset(Product.objects.all(), fieldset).aget(pk=pk)
+        except Product.DoesNotExist:
+            raise NotFound()
+        return ProductSerializer(instance, context={'fieldset': fieldset}).data
+    return set_validator_headers(json_response(await aget_or_build('detail', request, build)), validators)
+
+
+async def product_facets(request):
+    return json_response(await facets.aget_facets(Product.objects.all(), request.query_params))
+
+
+async def product_reviews(request, pk):
+    async def build():
+        if not await Product.objects.filter(pk=pk).aexists():
+            raise NotFound()
+        queryset = Review.objects.filter(product_id=pk).order_by('-date', '-id')
+        paginator = ReviewPagination()
+        page = await paginator.apaginate_queryset(queryset, request)
+        return {'next': paginator.get_next_link(), 'results': ReviewSerializer(page, many=True).data}
+    return json_response(await aget_or_build('reviews', request, build))
+
+
+list_view = read_only(product_list, ProductViewSet.as_view({'get': 'list', 'post': 'create'}))
+detail_view = read_only(product_detail, ProductViewSet.as_view({
+    'get': 'retrieve', 'put': 'update', 'patch': 'partial_update', 'delete': 'destroy',
+}))
+facets_view = read_only(product_facets, ProductViewSet.as_view({'get': 'facets'}))
+reviews_view = read_only(product_reviews, ProductViewSet.as_view({'get': 'reviews'}))
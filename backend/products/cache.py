@@ -0,0 +1,141 @@
+"""
+Versioned response cache for the catalog read endpoints.
+
+Every cached response key embeds the current catalog version. Any write to
+a product or one of its nested rows bumps the version (see signals.py), so
+older entries simply stop being addressed and expire on their own - stale
+pages are never served and nothing has to be deleted by pattern, which the
+local-memory and file-based backends cannot do anyway.
+
+The a-prefixed functions do the same through the async cache API, for the
+async views (products.async_views).
+"""
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+CATALOG_VERSION_KEY = 'products:catalog-version'
+
+
+def get_cache():
+    return caches[getattr(settings, 'PRODUCTS_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'PRODUCTS_CACHE_TIMEOUT', 300)
+
+
+def fresh_version():
+    """
+    Seed for a missing version counter. Responses cached under the old
+    counter may outlive it, so a restart must not reuse its numbers: the
+    clock in nanoseconds is past every version the old counter reached
+    (it would take a bump per nanosecond to catch up).
+    """
+    return time.time_ns()
+
+
+def get_catalog_version():
+    """Return the current catalog version, initialising it if missing"""
+    cache = get_cache()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        seed = fresh_version()
+        cache.add(CATALOG_VERSION_KEY, seed, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, seed)
+    return version
+
+
+def is_in_process(cache):
+    """
+    Django's async cache API hops to a worker thread for every call; for
+    the local-memory backend that hop costs far more than the lookup, which
+    never waits on I/O, so the async functions call it directly
+    """
+    return isinstance(cache, LocMemCache)
+
+
+async def aget_catalog_version():
+    if is_in_process(get_cache()):
+        return get_catalog_version()
+    cache = get_cache()
+    version = await cache.aget(CATALOG_VERSION_KEY)
+    if version is None:
+        seed = fresh_version()
+        await cache.aadd(CATALOG_VERSION_KEY, seed, timeout=None)
+        version = await cache.aget(CATALOG_VERSION_KEY, seed)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every cached catalog response"""
+    cache = get_cache()
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # Key missing (first write, or evicted): start from a fresh seed,
+        # never from a number the lost counter may have used
+        cache.add(CATALOG_VERSION_KEY, fresh_version(), timeout=None)
+        return cache.incr(CATALOG_VERSION_KEY)
+
+
+def response_cache_key(kind, request):
+    """
+    Build the cache key for a read endpoint response.
+    Query parameters are sorted so equivalent URLs share an entry; the host
+    is included because paginated responses carry absolute next links.
+    """
+    return versioned_cache_key(kind, request_signature(request))
+
+
+def request_signature(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    return f'{request.get_host()}|{request.path}|{params}'
+
+
+def versioned_cache_key(kind, raw, version=None):
+    """Cache key for `raw` (any string identifying the response) under the current catalog version"""
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    if version is None:
+        version = get_catalog_version()
+    return f'products:v{version}:{kind}:{digest}'
+
+
+def get_or_build(kind, request, build):
+    """Return cached response data for this request, building it on a miss"""
+    return get_or_build_key(response_cache_key(kind, request), build)
+
+
+def get_or_build_key(key, build):
+    """Return the data cached under key, building and caching it on a miss"""
+    cache = get_cache()
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, timeout=get_timeout())
+    return data
+
+
+async def aget_or_build(kind, request, build):
+    """get_or_build for async views; build is a coroutine function"""
+    key = versioned_cache_key(kind, request_signature(request), await aget_catalog_version())
+    return await aget_or_build_key(key, build)
+
+
+async def aget_or_build_key(key, build):
+    cache = get_cache()
+    in_process = is_in_process(cache)
+    data = cache.get(key) if in_process else await cache.aget(key)
+    if data is None:
+        data = await build()
+        if in_process:
+            cache.set(key, data, timeout=get_timeout())
+        else:
+            await cache.aset(key, data, timeout=get_timeout())
+    return data
@@ -0,0 +1,206 @@
+"""
+NDJSON catalog export/import used by the export_catalog and import_catalog
+management commands.
+
+Each line is one product with its nested rows:
+
+    {"id": 1, "name": "...", "price": "1499.00", ...,
+     "sub_descriptions": [{"title": "...", "body": "...", "order": 0}],
+     "thumbnails": [{"image_url": "...", "order": 0}],
+     "reviews": [{"user_name": "...", "rating": 5, "comment": "...", "date": "..."}]}
+"""
+import json
+from decimal import Decimal, InvalidOperation
+from django.db import connection, transaction
+from django.db.models import Prefetch
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from . import media, search
+from .models import Product, SubDescription, ProductThumbnail, Review, ProductTombstone
+
+PRODUCT_FIELDS = [
+    'name', 'category', 'price', 'image', 'alt', 'description', 'main_description',
+    'dimensions', 'material', 'weight', 'in_stock', 'stock',
+]
+
+# Nested rows replaced by an import
+NESTED_MODELS = (SubDescription, ProductThumbnail, Review)
+
+# Product ids per DELETE, under SQLite's bound parameter limit
+DELETE_CHUNK = 500
+
+
+def export_queryset():
+    """Products in id order with every nested row prefetched in export order"""
+    return Product.objects.order_by('id').prefetch_related(
+        Prefetch('sub_descriptions', queryset=SubDescription.objects.order_by('order', 'id')),
+        Prefetch('thumbnails', queryset=ProductThumbnail.objects.order_by('order', 'id')),
+        Prefetch('reviews', queryset=Review.objects.order_by('date', 'id')),
+    )
+
+
+def product_to_record(product):
+    record = {'id': product.pk}
+    for field in PRODUCT_FIELDS:
+        record[field] = getattr(product, field)
+    record['price'] = str(product.price)
+    record['created_at'] = product.created_at.isoformat()
+    record['sub_descriptions'] = [
+        {'title': sub.title, 'body': sub.body, 'order': sub.order}
+        for sub in product.sub_descriptions.all()
+    ]
+    record['thumbnails'] = [
+        {'image_url': thumb.image_url, 'order': thumb.order}
+        for thumb in product.thumbnails.all()
+    ]
+    record['reviews'] = [
+        {
+            'user_name': review.user_name,
+            'rating': review.rating,
+            'comment': review.comment,
+            'date': review.date.isoformat(),
+        }
+        for review in product.reviews.all()
+    ]
+    return record
+
+
+def iter_export_lines(chunk_size):
+    """
+    Yield one NDJSON line per product. iterator(chunk_size=...) streams the
+    products and prefetches the nested rows one chunk at a time, so memory
+    stays flat however large the catalog is.
+    """
+    for product in export_queryset().iterator(chunk_size=chunk_size):
+        yield json.dumps(product_to_record(product), ensure_ascii=False, separators=(',', ':')) + '\n'
+
+
+def iter_records(lines):
+    """Parse NDJSON lines, skipping blanks; raises ValueError with the line number"""
+    for number, line in enumerate(lines, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f'Line {number}: invalid JSON ({e})')
+        try:
+            record['id'] = int(record['id'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Line {number}: expected an object with an integer "id"')
+        yield record
+
+
+def delete_nested_rows(ids):
+    """
+    Plain DELETEs of the products' nested rows, skipping the per-row
+    post_delete handlers (parent touch, cache bump, reindex, image
+    references): import_batch redoes them all once per batch
+    """
+    with connection.cursor() as cursor:
+        for model in NESTED_MODELS:
+            table = connection.ops.quote_name(model._meta.db_table)
+            column = connection.ops.quote_name(model._meta.get_field('product').column)
+            for start in range(0, len(ids), DELETE_CHUNK):
+                chunk = ids[start:start + DELETE_CHUNK]
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {table} WHERE {column} IN ({placeholders})', chunk)
+
+
+@transaction.atomic
+def import_batch(records):
+    """
+    Upsert a batch of product records by id in one transaction.
+    Products are bulk created/updated; each product's nested rows are
+    replaced by the ones in its record. Returns (created, updated, nested).
+    """
+    # A later line for the same id wins
+    records_by_id = {record['id']: record for record in records}
+    records = list(records_by_id.values())
+    ids = list(records_by_id)
+    existing = Product.objects.in_bulk(ids)
+    previous_images = [product.image for product in existing.values()]
+
+    now = timezone.now()
+    to_create = []
+    to_update = []
+    for record in records:
+        product = existing.get(record['id']) or Product(pk=record['id'])
+        product.updated_at = now
+        for field in PRODUCT_FIELDS:
+            if field in record:
+                setattr(product, field, record[field])
+        try:
+            product.price = Decimal(str(product.price))
+            if not product.price.is_finite():
+                raise InvalidOperation
+        except InvalidOperation:
+            raise ValueError(f'Product {record["id"]}: invalid price {record.get("price")!r}')
+        if product.stock is not None:
+            product.in_stock = product.stock > 0
+        (to_update if product.pk in existing else to_create).append(product)
+
+    if to_create:
+        Product.objects.bulk_create(to_create)
+        # Re-created ids are no longer deleted as far as delta sync goes
+        ProductTombstone.objects.filter(product_id__in=[product.pk for product in to_create]).delete()
+    if to_update:
+        Product.objects.bulk_update(to_update, PRODUCT_FIELDS + ['updated_at'])
+
+    # created_at is auto_now_add, so restore the exported value afterwards
+    created_at = []
+    for product in to_create + to_update:
+        value = parse_datetime(records_by_id[product.pk].get('created_at') or '')
+        if value is not None:
+            product.created_at = value
+            created_at.append(product)
+    if created_at:
+        Product.objects.bulk_update(created_at, ['created_at'])
+
+    previous_images += ProductThumbnail.objects.filter(product_id__in=ids).values_list('image_url', flat=True)
+    delete_nested_rows(ids)
+
+    sub_descriptions = [
+        SubDescription(product_id=record['id'], title=sub.get('title', ''),
+                       body=sub.get('body', ''), order=sub.get('order', idx))
+        for record in records
+        for idx, sub in enumerate(record.get('sub_descriptions', []))
+    ]
+    thumbnails = [
+        ProductThumbnail(product_id=record['id'], image_url=thumb['image_url'],
+                         order=thumb.get('order', idx))
+        for record in records
+        for idx, thumb in enumerate(record.get('thumbnails', []))
+    ]
+    reviews = []
+    review_dates = []
+    for record in records:
+        for data in record.get('reviews', []):
+            review = Review(product_id=record['id'], user_name=data.get('user_name', 'Anonymous'),
+                            rating=data.get('rating', 5), comment=data.get('comment', ''))
+            reviews.append(review)
+            review_dates.append(parse_datetime(data.get('date') or ''))
+    SubDescription.objects.bulk_create(sub_descriptions)
+    ProductThumbnail.objects.bulk_create(thumbnails)
+    Review.objects.bulk_create(reviews)
+
+    # date is auto_now_add too; keep the exported review dates
+    dated = []
+    for review, date in zip(reviews, review_dates):
+        if date is not None:
+            review.date = date
+            dated.append(review)
+    if dated:
+        Review.objects.bulk_update(dated, ['date'])
+
+    # Bulk writes send no signals: refresh aggregates, search index and
+    # the response cache explicitly (rebuild bumps the cache on commit)
+    Product.objects.filter(pk__in=ids).rebuild_rating_aggregates()
+    search.index_products(ids)
+    media.adjust_references(
+        added=[product.image for product in to_create + to_update] + [thumb.image_url for thumb in thumbnails],
+        removed=previous_images,
+    )
+
+    return len(to_create), len(to_update), len(sub_descriptions) + len(thumbnails) + len(reviews)
@@ -0,0 +1,100 @@
+"""
+Conditional GET support (ETag / Last-Modified) for the catalog endpoints.
+
+Product.updated_at is the version of a product *and* its nested rows:
+signals.py touches it whenever a sub-description, thumbnail or review is
+written. A detail ETag is therefore derived from (id, updated_at), and a
+list ETag from max(updated_at) and the row count of the filtered set, so a
+deletion also changes it. A list also renders the image variants of its
+products (products.images), which are written without touching them, so
+its ETag includes the catalog version too (products.cache).
+"""
+import hashlib
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from .cache import aget_catalog_version, get_catalog_version
+
+LIST_VERSION = {'last_updated': Max('updated_at'), 'total': Count('id')}
+
+
+def make_etag(*parts):
+    """Strong ETag from the given version parts"""
+    raw = '|'.join(str(part) for part in parts)
+    return quote_etag(hashlib.sha1(raw.encode('utf-8')).hexdigest())
+
+
+def detail_validators(queryset, pk, representation=''):
+    """
+    Validators for one product, or None if it does not exist.
+    Costs a single indexed lookup and no serialization. `representation`
+    distinguishes the ETags of different fieldsets of the same product.
+    """
+    try:
+        updated_at = detail_version(queryset, pk).first()
+    except (TypeError, ValueError):
+        return None
+    return detail_validators_from(pk, updated_at, representation)
+
+
+async def adetail_validators(queryset, pk, representation=''):
+    try:
+        updated_at = await detail_version(queryset, pk).afirst()
+    except (TypeError, ValueError):
+        return None
+    return detail_validators_from(pk, updated_at, representation)
+
+
+def detail_version(queryset, pk):
+    return queryset.prefetch_related(None).filter(pk=pk).values_list('updated_at', flat=True)
+
+
+def detail_validators_from(pk, updated_at, representation):
+    if updated_at is None:
+        return None
+    return {
+        'etag': make_etag('detail', pk, updated_at.isoformat(), representation),
+        'last_modified': int(updated_at.timestamp()),
+    }
+
+
+def list_validators(queryset, request):
+    """
+    Validators for a filtered list page.
+    No Last-Modified is sent for lists: deleting a product does not move
+    max(updated_at), so only the ETag (which includes the count) is safe.
+    """
+    stats = queryset.order_by().aggregate(**LIST_VERSION)
+    return list_validators_from(stats, get_catalog_version(), request)
+
+
+async def alist_validators(queryset, request):
+    stats = await queryset.order_by().aaggregate(**LIST_VERSION)
+    return list_validators_from(stats, await aget_catalog_version(), request)
+
+
+def list_validators_from(stats, catalog_version, request):
+    last_updated = stats['last_updated'].isoformat() if stats['last_updated'] else ''
+    return {
+        'etag': make_etag('list', request.get_full_path(), last_updated, stats['total'], catalog_version),
+        'last_modified': None,
+    }
+
+
+def not_modified_response(request, validators):
+    """Return a 304 response if the client's copy is current, else None"""
+    response = get_conditional_response(
+        request,
+        etag=validators['etag'],
+        last_modified=validators['last_modified'],
+    )
+    if response is not None:
+        set_validator_headers(response, validators)
+    return response
+
+
+def set_validator_headers(response, validators):
+    response['ETag'] = validators['etag']
+    if validators['last_modified'] is not None:
+        response['Last-Modified'] = http_date(validators['last_modified'])
+    return response
@@ -0,0 +1,137 @@
+"""
+Sidebar facets for the catalog: GET /api/products/facets/.
+
+Counts are computed in the database with grouped aggregates, so the
+sidebar never needs the product array:
+- one GROUP BY category query gives every category's product and in-stock
+  counts (the totals of the current selection are summed from it)
+- one MIN/MAX aggregate and one GROUP BY bucket query give the price
+  histogram
+
+Facets are disjunctive: category counts ignore the category filter and the
+price histogram ignores the price range, so the sidebar can show what
+choosing another category or widening the range would yield. Every other
+filter applies. Results are cached per normalized filter signature under
+the catalog version (see products.cache).
+"""
+from decimal import Decimal
+from django.conf import settings
+from django.db.models import Count, FloatField, Max, Min, Q, Value
+from django.db.models.functions import Cast, Floor
+from .cache import aget_catalog_version, aget_or_build_key, get_or_build_key, versioned_cache_key
+from .filters import filter_products, filter_signature, parse_categories
+from .models import Product
+
+CENTS = Decimal('0.01')
+
+PRICE_BOUNDS = {'low': Min('price'), 'high': Max('price')}
+
+
+def get_price_buckets():
+    return max(int(getattr(settings, 'PRODUCTS_FACET_PRICE_BUCKETS', 10)), 1)
+
+
+def category_counts(queryset, query_params):
+    """Product and in-stock counts per category, ignoring the category filter"""
+    return (
+        filter_products(queryset, query_params, exclude={'category'})
+        .values('category')
+        .annotate(count=Count('id'), in_stock=Count('id', filter=Q(in_stock=True)))
+    )
+
+
+def summarize_categories(rows, query_params):
+    """Every category's counts, plus the totals of the selected categories"""
+    counts = {row['category']: row for row in rows}
+    selected = parse_categories(query_params)
+    categories = []
+    total = in_stock = 0
+    for category, _ in Product.CATEGORY_CHOICES:
+        row = counts.get(category, {'count': 0, 'in_stock': 0})
+        categories.append({'category': category, 'count': row['count'], 'inStock': row['in_stock']})
+        if not selected or category in selected:
+            total += row['count']
+            in_stock += row['in_stock']
+    return {'total': total, 'inStock': in_stock, 'categories': categories}
+
+
+def plan_buckets(bounds):
+    """
+    (low, high, size, width) of equal-width price buckets spanning the
+    cheapest to the dearest product, or None when there are no products
+    """
+    low, high = bounds['low'], bounds['high']
+    if low is None:
+        return None
+    low, high = Decimal(low), Decimal(high)
+    if high > low:
+        return low, high, get_price_buckets(), (high - low) / get_price_buckets()
+    return low, high, 1, Decimal(1)
+
+
+def bucket_counts(queryset, plan):
+    low, _, _, width = plan
+    return (
+        queryset
+        .annotate(bucket=Floor(
+            (Cast('price', FloatField()) - Value(float(low))) / Value(float(width)),
+        ))
+        .values('bucket')
+        .annotate(count=Count('id'))
+    )
+
+
+def summarize_histogram(plan, rows):
+    """The histogram; its top bucket is closed, so the dearest product lands in it"""
+    if plan is None:
+        return {'min': None, 'max': None, 'buckets': []}
+    low, high, size, width = plan
+    counts = [0] * size
+    for row in rows:
+        counts[min(max(int(row['bucket']), 0), size - 1)] += row['count']
+
+    buckets = []
+    for index, count in enumerate(counts):
+        bucket_high = high if index == size - 1 else low + width * (index + 1)
+        buckets.append({
+            'min': str((low + width * index).quantize(CENTS)),
+            'max': str(bucket_high.quantize(CENTS)),
+            'count': count,
+        })
+    return {'min': str(low.quantize(CENTS)), 'max': str(high.quantize(CENTS)), 'buckets': buckets}
+
+
+def build_facets(queryset, query_params):
+    queryset = queryset.order_by()
+    facets = summarize_categories(category_counts(queryset, query_params), query_params)
+    prices = filter_products(queryset, query_params, exclude={'price'})
+    plan = plan_buckets(prices.aggregate(**PRICE_BOUNDS))
+    facets['price'] = summarize_histogram(plan, bucket_counts(prices, plan) if plan else [])
+    return facets
+
+
+async def abuild_facets(queryset, query_params):
+    """build_facets on the async ORM"""
+    queryset = queryset.order_by()
+    rows = [row async for row in category_counts(queryset, query_params)]
+    facets = summarize_categories(rows, query_params)
+    prices = filter_products(queryset, query_params, exclude={'price'})
+    plan = plan_buckets(await prices.aaggregate(**PRICE_BOUNDS))
+    rows = [row async for row in bucket_counts(prices, plan)] if plan else []
+    facets['price'] = summarize_histogram(plan, rows)
+    return facets
+
+
+def facets_signature(query_params):
+    return f'{filter_signature(query_params)}|{get_price_buckets()}'
+
+
+def get_facets(queryset, query_params):
+    """Facets for the filters in query_params, cached per filter signature"""
+    key = versioned_cache_key('facets', facets_signature(query_params))
+    return get_or_build_key(key, lambda: build_facets(queryset, query_params))
+
+
+async def aget_facets(queryset, query_params):
+    key = versioned_cache_key('facets', facets_signature(query_params), await aget_catalog_version())
+    return await aget_or_build_key(key, lambda: abuild_facets(queryset, query_params))
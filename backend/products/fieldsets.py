@@ -0,0 +1,105 @@
+"""
+Sparse fieldsets for the product read endpoints: ?fields= and ?expand=.
+
+    GET /api/products/?fields=id,name,price,image
+    GET /api/products/?expand=thumbnails,ratingDistribution
+    GET /api/products/42/?fields=id,name,description&expand=reviews
+
+fields= picks the output fields (default: the serializer's default_fields),
+expand= adds nested relations on top. The resolved fieldset shapes the SQL
+as well as the output: only the columns behind the requested fields are
+selected (so the description TextFields are skipped unless asked for), and
+only the requested relations are prefetched.
+"""
+from rest_framework.exceptions import ValidationError
+from .models import detail_prefetches
+
+# Model columns read by each output field
+FIELD_COLUMNS = {
+    'id': ['id'],
+    'name': ['name'],
+    'category': ['category'],
+    'price': ['price'],
+    'image': ['image'],
+    'imageOriginal': ['image'],
+    'alt': ['alt'],
+    'description': ['description'],
+    'main_description': ['main_description'],
+    'dimensions': ['dimensions'],
+    'material': ['material'],
+    'weight': ['weight'],
+    'inStock': ['in_stock'],
+    'stock': ['stock'],
+    'rating': ['rating'],
+    'reviewCount': ['review_count'],
+    'created_at': ['created_at'],
+    'updated_at': ['updated_at'],
+}
+
+# Fields backed by a related table rather than a column
+EXPANDABLE = ('sub_descriptions', 'thumbnails', 'reviews', 'ratingDistribution')
+
+
+def parse_names(query_params, name):
+    """Field names from a repeated or comma-separated parameter, or None"""
+    if name not in query_params:
+        return None
+    return [
+        part.strip()
+        for value in query_params.getlist(name)
+        for part in value.split(',')
+        if part.strip()
+    ]
+
+
+def get_fieldset(query_params, serializer_class):
+    """
+    The set of output fields for a request. Raises ValidationError (400)
+    naming any unknown fields.
+    """
+    available = list(serializer_class.Meta.fields)
+    fields = parse_names(query_params, 'fields')
+    expand = parse_names(query_params, 'expand')
+
+    errors = {}
+    if fields is not None:
+        unknown = [name for name in fields if name not in available]
+        if unknown:
+            errors['fields'] = [f'Unknown field(s): {", ".join(unknown)}. Available: {", ".join(available)}.']
+    expandable = [name for name in EXPANDABLE if name in available]
+    if expand is not None:
+        unknown = [name for name in expand if name not in expandable]
+        if unknown:
+            errors['expand'] = [f'Cannot expand: {", ".join(unknown)}. Expandable: {", ".join(expandable)}.']
+    if errors:
+        raise ValidationError(errors)
+
+    if fields is None:
+        fields = getattr(serializer_class, 'default_fields', None) or available
+    return frozenset(fields) | frozenset(expand or ())
+
+
+def shape_queryset(queryset, fieldset, keep=()):
+    """
+    Select only the columns behind `fieldset` (plus `keep`, e.g. the
+    ordering fields a paginator reads) and prefetch only its relations.
+    """
+    columns = {'id', *keep}
+    for name in fieldset:
+        columns.update(FIELD_COLUMNS.get(name, ()))
+    queryset = queryset.only(*columns).prefetch_related(None)
+
+    prefetches = [
+        prefetch for prefetch in detail_prefetches()
+        if prefetch.prefetch_through in fieldset
+    ]
+    if prefetches:
+        queryset = queryset.prefetch_related(*prefetches)
+    if 'ratingDistribution' in fieldset:
+        queryset = queryset.with_rating_distribution()
+    return queryset
+
+
+def fieldset_key(fieldset):
+    """Stable string for a fieldset, e.g. for ETags"""
+    return ','.join(sorted(fieldset))
@@ -0,0 +1,119 @@
+from decimal import Decimal, InvalidOperation
+from rest_framework.filters import BaseFilterBackend
+
+
+# Sort keys accepted by the list endpoint -> ORM ordering.
+# Every ordering ends on the primary key so it is total, which keyset
+# pagination relies on.
+SORT_ORDERINGS = {
+    'popularity': ('-review_count', '-id'),
+    'rating': ('-rating', '-id'),
+    'price_asc': ('price', 'id'),
+    'price_desc': ('-price', '-id'),
+    'newest': ('-created_at', '-id'),
+}
+
+DEFAULT_SORT = 'newest'
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'no', 'off'}
+
+
+def parse_decimal(value):
+    """Parse a query parameter as a Decimal, returning None if invalid"""
+    if value in (None, ''):
+        return None
+    try:
+        return Decimal(value)
+    except (InvalidOperation, ValueError):
+        return None
+
+
+def parse_bool(value):
+    """Parse a query parameter as a boolean, returning None if unset or invalid"""
+    if value is None:
+        return None
+    value = value.lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    return None
+
+
+def parse_categories(query_params):
+    """
+    Collect categories from ?category=A&category=B or ?category=A,B
+    Unknown categories are ignored.
+    """
+    from .models import Product
+    valid = {choice for choice, _ in Product.CATEGORY_CHOICES}
+    categories = []
+    for raw in query_params.getlist('category'):
+        for category in raw.split(','):
+            category = category.strip()
+            if category in valid and category not in categories:
+                categories.append(category)
+    return categories
+
+
+def filter_products(queryset, query_params, exclude=()):
+    """
+    Apply category, price range and stock filters from query parameters.
+    `exclude` names filters to skip ('category', 'price', 'in_stock'), which
+    facet counts use to count the alternatives to the current selection.
+    """
+    categories = parse_categories(query_params)
+    if categories and 'category' not in exclude:
+        queryset = queryset.filter(category__in=categories)
+
+    if 'price' not in exclude:
+        min_price = parse_decimal(query_params.get('min_price'))
+        if min_price is not None:
+            queryset = queryset.filter(price__gte=min_price)
+
+        max_price = parse_decimal(query_params.get('max_price'))
+        if max_price is not None:
+            queryset = queryset.filter(price__lte=max_price)
+
+    in_stock = parse_bool(query_params.get('in_stock'))
+    if in_stock is not None and 'in_stock' not in exclude:
+        queryset = queryset.filter(in_stock=in_stock)
+
+    return queryset
+
+
+def filter_signature(query_params):
+    """
+    Normalized form of the filters in query parameters, so equivalent
+    requests (parameter order, repeated vs comma separated categories,
+    "10" vs "10.00", unrelated parameters) share one cache entry
+    """
+    min_price = parse_decimal(query_params.get('min_price'))
+    max_price = parse_decimal(query_params.get('max_price'))
+    return repr((
+        sorted(parse_categories(query_params)),
+        None if min_price is None else str(min_price.normalize()),
+        None if max_price is None else str(max_price.normalize()),
+        parse_bool(query_params.get('in_stock')),
+    ))
+
+
+def get_sort_ordering(query_params):
+    """Return the ORM ordering for the ?sort= parameter"""
+    sort = query_params.get('sort', DEFAULT_SORT)
+    return SORT_ORDERINGS.get(sort, SORT_ORDERINGS[DEFAULT_SORT])
+
+
+class ProductFilterBackend(BaseFilterBackend):
+    """
+    Filter and sort products from query parameters
+    - category: one or more categories (repeated or comma separated)
+    - min_price / max_price: inclusive price bounds
+    - in_stock: true / false
+    - sort: popularity, rating, price_asc, price_desc, newest
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        queryset = filter_products(queryset, request.query_params)
+        return queryset.order_by(*get_sort_ordering(request.query_params))
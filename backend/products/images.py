@@ -0,0 +1,178 @@
+"""
+Resized, re-encoded variants of uploaded product images.
+
+upload_image stores the original, then schedule_variants() queues the
+resizing on a small thread pool so the request returns as soon as the
+original is saved. Each variant is bounded to a width from
+PRODUCT_IMAGE_VARIANT_WIDTHS, re-encoded to WebP and recorded as an
+ImageVariant row. List endpoints use the recorded variants to hand out
+small images for grid cards.
+
+Pillow is optional: without it uploads still work and no variants are
+produced.
+"""
+import io
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from .models import ImageVariant
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow is an optional dependency
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+VARIANT_FORMAT = 'WEBP'
+VARIANT_EXTENSION = 'webp'
+
+_executor = None
+
+
+def get_widths():
+    return tuple(getattr(settings, 'PRODUCT_IMAGE_VARIANT_WIDTHS', (320, 640, 1280)))
+
+
+def get_list_width():
+    """Width handed out by list endpoints for grid cards"""
+    return getattr(settings, 'PRODUCT_IMAGE_LIST_WIDTH', 320)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'PRODUCT_IMAGE_WORKERS', 2),
+            thread_name_prefix='image-variants',
+        )
+    return _executor
+
+
+def is_enabled():
+    return Image is not None
+
+
+def variant_name(source, width):
+    """Storage name of a variant, e.g. products/variants/abc_w320.webp"""
+    directory, filename = posixpath.split(source)
+    stem = filename.rsplit('.', 1)[0]
+    return posixpath.join(directory, 'variants', f'{stem}_w{width}.{VARIANT_EXTENSION}')
+
+
+def plan_variants(file):
+    """
+    Read only the image header and return the variant widths to produce
+    (those narrower than the original). Returns [] if Pillow is missing or
+    the file is not a readable image.
+    """
+    if not is_enabled():
+        return []
+    try:
+        file.seek(0)
+        with Image.open(file) as image:
+            width = image.width
+    except Exception:
+        return []
+    finally:
+        file.seek(0)
+    return [w for w in get_widths() if w < width]
+
+
+def schedule_variants(source, widths):
+    """
+    Queue variant generation for a stored original once the current
+    transaction commits. Returns {width: storage name} of the planned variants.
+    """
+    if not widths:
+        return {}
+    planned = {width: variant_name(source, width) for width in widths}
+    if getattr(settings, 'PRODUCT_IMAGE_VARIANTS_ASYNC', True):
+        transaction.on_commit(lambda: get_executor().submit(run_in_worker, source, widths))
+    else:
+        generate_variants(source, widths)
+    return planned
+
+
+def run_in_worker(source, widths):
+    """Worker entry point: own DB connection, never raises into the pool"""
+    close_old_connections()
+    try:
+        generate_variants(source, widths)
+    except Exception:
+        logger.exception('Failed to generate image variants for %s', source)
+    finally:
+        close_old_connections()
+
+
+def generate_variants(source, widths):
+    """Decode the original once, then write and record one variant per width"""
+    with default_storage.open(source, 'rb') as f:
+        with Image.open(f) as original:
+            original = ImageOps.exif_transpose(original)
+            if original.mode not in ('RGB', 'RGBA'):
+                original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+            for width in sorted(widths, reverse=True):
+                height = max(1, round(original.height * width / original.width))
+                # Resize from the previous (larger) variant: each step is cheaper
+                original = original.resize((width, height), Image.LANCZOS)
+                buffer = io.BytesIO()
+                original.save(buffer, VARIANT_FORMAT, quality=80, method=4)
+                name = variant_name(source, width)
+                if default_storage.exists(name):
+                    default_storage.delete(name)
+                saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+                ImageVariant.objects.update_or_create(
+                    source=source, width=width,
+                    defaults={'name': saved, 'height': height, 'size': buffer.tell()},
+                )
+
+
+def media_url(name):
+    return settings.MEDIA_URL.rstrip('/') + '/' + name
+
+
+def source_from_url(url):
+    """Storage name of a media URL (absolute or relative), or None if not ours"""
+    if not url:
+        return None
+    path = urlsplit(url).path
+    prefix = '/' + settings.MEDIA_URL.strip('/') + '/'
+    if not path.startswith(prefix):
+        return None
+    return path[len(prefix):]
+
+
+def variant_urls(urls, width):
+    """
+    Map each image URL to the URL of its smallest variant at least `width`
+    wide (or its widest variant), in one query. URLs without variants are
+    left out.
+    """
+    sources = {}
+    for url in urls:
+        source = source_from_url(url)
+        if source:
+            sources.setdefault(source, []).append(url)
+    if not sources:
+        return {}
+
+    best = {}
+    for variant in ImageVariant.objects.filter(source__in=list(sources)).order_by('width'):
+        current = best.get(variant.source)
+        if current is None or current.width < width:
+            best[variant.source] = variant
+
+    result = {}
+    for source, variant in best.items():
+        for url in sources[source]:
+            # Keep the scheme and host of the original URL
+            parts = urlsplit(url)
+            origin = f'{parts.scheme}://{parts.netloc}' if parts.netloc else ''
+            result[url] = origin + media_url(variant.name)
+    return result
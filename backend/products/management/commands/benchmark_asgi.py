@@ -0,0 +1,154 @@
+import asyncio
+import random
+import threading
+import time
+import uuid
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient, Client
+from products.cache import get_cache
+from products.models import Product, Review
+
+# Share of each endpoint in the request mix
+MIX = [('list', 0.6), ('detail', 0.15), ('facets', 0.15), ('reviews', 0.1)]
+
+SORTS = ['popularity', 'price_asc', 'price_desc', 'newest']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark the catalog reads (list, detail, facets, reviews) through the '
+        'WSGI path (sync DRF views on a pool of worker threads) and the ASGI path '
+        '(async views on one event loop) with many concurrent clients. Requests '
+        'go through the in-process Django handlers, so no server is needed. '
+        'Creates a throwaway set of products and deletes it after.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=200, help='Concurrent clients')
+        parser.add_argument('--threads', type=int, default=16, help='WSGI worker threads')
+        parser.add_argument('--requests', type=int, default=4000, help='Requests per run')
+        parser.add_argument('--products', type=int, default=500, help='Throwaway products to create')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if min(options['concurrency'], options['threads'], options['requests'], options['products']) < 1:
+            raise CommandError('All counts must be positive.')
+
+        run_id = uuid.uuid4().hex[:8]
+        ids = self.create_products(random.Random(options['seed']), run_id, options['products'])
+        try:
+            urls = self.make_urls(random.Random(options['seed']), ids, options['requests'])
+            self.stdout.write(f'{"path":>6}{"req/s":>9}{"p50 ms":>9}{"p95 ms":>9}{"errors":>8}')
+            results = {}
+            for path, run in (('wsgi', self.run_wsgi), ('asgi', self.run_asgi)):
+                # Both runs start from a cold response cache
+                get_cache().clear()
+                results[path] = result = run(urls, options)
+                self.stdout.write(
+                    f'{path:>6}{result["rate"]:>9.0f}{result["p50"]:>9.1f}{result["p95"]:>9.1f}{result["errors"]:>8}'
+                )
+        finally:
+            Product.objects.filter(name__startswith=f'Benchmark {run_id}').delete()
+
+        self.stdout.write(f'ASGI vs WSGI: {results["asgi"]["rate"] / max(results["wsgi"]["rate"], 1e-6):.2f}x throughput')
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished (throwaway products deleted)'))
+
+    def create_products(self, rng, run_id, count):
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        products = Product.objects.bulk_create([
+            Product(
+                name=f'Benchmark {run_id} {index}',
+                category=rng.choice(categories),
+                price=Decimal(rng.randint(100, 50000)),
+                image='https://example.com/image.webp',
+                description='Hand-finished brass with antique polish.',
+            )
+            for index in range(count)
+        ])
+        Review.objects.bulk_create([
+            Review(product=product, user_name=f'Buyer {index}', rating=rng.randint(1, 5), comment='Lovely')
+            for product in products
+            for index in range(rng.randint(0, 12))
+        ])
+        return [product.pk for product in products]
+
+    def make_urls(self, rng, ids, count):
+        """A reproducible request mix; repeated URLs hit the response cache like real traffic"""
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        kinds, weights = zip(*MIX)
+        urls = []
+        for kind in rng.choices(kinds, weights, k=count):
+            if kind == 'list':
+                urls.append(
+                    f'/api/products/?category={rng.choice(categories)}&sort={rng.choice(SORTS)}'
+                    f'&min_price={rng.choice([0, 1000, 5000, 20000])}'
+                )
+            elif kind == 'detail':
+                urls.append(f'/api/products/{rng.choice(ids)}/')
+            elif kind == 'facets':
+                urls.append(f'/api/products/facets/?category={rng.choice(categories)}')
+            else:
+                urls.append(f'/api/products/{rng.choice(ids)}/reviews/')
+        return urls
+
+    def summarize(self, latencies, errors, elapsed):
+        latencies = sorted(latencies)
+        return {
+            'rate': len(latencies) / elapsed,
+            'p50': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+            'p95': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            'errors': errors,
+        }
+
+    def run_wsgi(self, urls, options):
+        """
+        One thread per client; a request holds one of --threads worker slots
+        for its whole duration, as under a threaded WSGI server
+        """
+        workers = threading.BoundedSemaphore(options['threads'])
+        pending = iter(urls)
+        lock = threading.Lock()
+        latencies, errors = [], [0]
+
+        def client():
+            http = Client()
+            while True:
+                with lock:
+                    url = next(pending, None)
+                if url is None:
+                    return
+                start = time.perf_counter()
+                with workers:
+                    response = http.get(url)
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+                    errors[0] += response.status_code != 200
+
+        threads = [threading.Thread(target=client) for _ in range(options['concurrency'])]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return self.summarize(latencies, errors[0], time.perf_counter() - start)
+
+    def run_asgi(self, urls, options):
+        """One coroutine per client on a single event loop"""
+        pending = iter(urls)
+        latencies, errors = [], [0]
+
+        async def client():
+            http = AsyncClient()
+            for url in pending:
+                start = time.perf_counter()
+                response = await http.get(url)
+                latencies.append(time.perf_counter() - start)
+                errors[0] += response.status_code != 200
+
+        async def main():
+            await asyncio.gather(*(client() for _ in range(options['concurrency'])))
+
+        start = time.perf_counter()
+        asyncio.run(main())
+        return self.summarize(latencies, errors[0], time.perf_counter() - start)
@@ -0,0 +1,88 @@
+import random
+import time
+from io import BytesIO
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from products.models import Product
+from products.serializers import ProductListSerializer
+from tatva_backend import renderers
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark rendering and parsing a product list page with the stock '
+        'JSON renderer/parser against the orjson-backed ones. Products are '
+        'built in memory; the database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[1_000, 10_000, 100_000],
+            help='Numbers of products to render',
+        )
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per measurement')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not renderers.is_enabled():
+            raise CommandError('orjson is not installed; the fast renderer falls back to the stdlib.')
+
+        rng = random.Random(options['seed'])
+        stock_renderer, fast_renderer = JSONRenderer(), renderers.FastJSONRenderer()
+        stock_parser, fast_parser = JSONParser(), renderers.FastJSONParser()
+        context = {'encoding': 'utf-8'}
+
+        self.stdout.write(
+            f'{"products":>9}{"MB":>8}{"render ms":>11}{"fast ms":>9}{"speedup":>9}'
+            f'{"parse ms":>10}{"fast ms":>9}{"speedup":>9}'
+        )
+        for size in options['sizes']:
+            data = ProductListSerializer(self.make_products(rng, size), many=True).data
+            body = stock_renderer.render(data)
+            if fast_parser.parse(BytesIO(fast_renderer.render(data)), parser_context=context) \
+                    != stock_parser.parse(BytesIO(body), parser_context=context):
+                raise CommandError('Fast and stock renderers disagree')
+
+            render_ms = self.time(options['repeat'], lambda: stock_renderer.render(data))
+            fast_render_ms = self.time(options['repeat'], lambda: fast_renderer.render(data))
+            parse_ms = self.time(options['repeat'], lambda: stock_parser.parse(BytesIO(body), parser_context=context))
+            fast_parse_ms = self.time(options['repeat'], lambda: fast_parser.parse(BytesIO(body), parser_context=context))
+            self.stdout.write(
+                f'{size:>9}{len(body) / 1e6:>8.1f}'
+                f'{render_ms:>11.1f}{fast_render_ms:>9.1f}{render_ms / max(fast_render_ms, 1e-6):>8.1f}x'
+                f'{parse_ms:>10.1f}{fast_parse_ms:>9.1f}{parse_ms / max(fast_parse_ms, 1e-6):>8.1f}x'
+            )
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished'))
+
+    def make_products(self, rng, count):
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        now = timezone.now()
+        return [
+            Product(
+                id=pk,
+                name=f'Handcrafted Brass Idol {pk}',
+                category=rng.choice(categories),
+                price=Decimal(rng.randint(10000, 5000000)) / 100,
+                image=f'https://example.com/media/products/{pk}.webp',
+                alt='Brass idol',
+                description='Hand-finished brass idol with antique polish – ideal for gifting.',
+                rating=Decimal(rng.randint(100, 500)) / 100,
+                in_stock=rng.random() > 0.1,
+                created_at=now,
+                updated_at=now,
+            )
+            for pk in range(1, count + 1)
+        ]
+
+    def time(self, repeat, func):
+        """Best-of-N wall time in milliseconds"""
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
@@ -0,0 +1,97 @@
+import random
+import time
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Q
+from products import search
+from products.models import Product
+
+WORDS = [
+    'brass', 'ganesha', 'lakshmi', 'elephant', 'frame', 'wooden', 'handcrafted', 'antique',
+    'gold', 'silver', 'marble', 'teak', 'rosewood', 'lotus', 'peacock', 'diya', 'temple',
+    'vintage', 'carved', 'painted', 'mandala', 'tanjore', 'kerala', 'mural', 'decor',
+    'family', 'portrait', 'corporate', 'gift', 'premium', 'classic', 'modern', 'royal',
+]
+
+SYLLABLES = ['ka', 'ra', 'ma', 'ti', 'lo', 'vi', 'sha', 'na', 'de', 'pu', 'go', 'ri', 'ta', 'mu', 'be']
+
+QUERIES = ['ganesha', 'brass elephant', 'hand', 'tanjore gold', 'rosewood carved frame']
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark full-text search against LIKE scans on a synthetic catalog. '
+        'Runs inside a transaction that is rolled back, so no data is kept.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000, help='Synthetic catalog size')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            raise CommandError('The full-text index is SQLite only.')
+
+        rng = random.Random(options['seed'])
+        # Catalog words plus a long tail of filler words with a Zipf-like
+        # distribution, so query terms match a realistic fraction of rows
+        vocabulary = WORDS + [
+            ''.join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(5000)
+        ]
+        rng.shuffle(vocabulary)
+        weights = [1 / (rank + 1) for rank in range(len(vocabulary))]
+        with transaction.atomic():
+            self.stdout.write(f'Creating {options["products"]} products...')
+            start = time.perf_counter()
+            self.create_products(rng, options['products'], vocabulary, weights)
+            search.rebuild_index()
+            self.stdout.write(f'  done in {time.perf_counter() - start:.1f}s (including indexing)')
+
+            self.stdout.write(f'{"query":<24}{"matches":>9}{"LIKE ms":>10}{"FTS5 ms":>10}{"speedup":>10}')
+            for query in QUERIES:
+                matches = search.filter_by_search(Product.objects.all(), query).count()
+                like_ms = self.time(options['repeat'], lambda: self.like_search(query))
+                fts_ms = self.time(options['repeat'], lambda: search.search_product_ids(query, 20))
+                self.stdout.write(
+                    f'{query:<24}{matches:>9}{like_ms:>10.2f}{fts_ms:>10.2f}{like_ms / max(fts_ms, 1e-6):>9.1f}x'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished (synthetic data rolled back)'))
+
+    def create_products(self, rng, count, vocabulary, weights, batch_size=5000):
+        categories = [choice for choice, _ in Product.CATEGORY_CHOICES]
+        for start in range(0, count, batch_size):
+            Product.objects.bulk_create([
+                Product(
+                    name=' '.join(rng.sample(WORDS, 3)).title(),
+                    category=rng.choice(categories),
+                    price=Decimal(rng.randint(100, 50000)),
+                    image='https://example.com/image.webp',
+                    description=' '.join(rng.choices(vocabulary, weights, k=30)),
+                    main_description=' '.join(rng.choices(vocabulary, weights, k=60)),
+                )
+                for _ in range(min(batch_size, count - start))
+            ])
+
+    def like_search(self, query):
+        """What the admin's search_fields did: AND of per-word LIKE '%word%' scans"""
+        queryset = Product.objects.all()
+        for word in query.split():
+            queryset = queryset.filter(
+                Q(name__icontains=word) | Q(description__icontains=word)
+                | Q(main_description__icontains=word)
+            )
+        return list(queryset.order_by('-rating', '-id').values_list('id', flat=True)[:20])
+
+    def time(self, repeat, func):
+        """Best-of-N wall time in milliseconds"""
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+        return best * 1000
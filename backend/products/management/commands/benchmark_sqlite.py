@@ -0,0 +1,164 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from django.core.management.base import BaseCommand, CommandError
+from tatva_backend.sqlite3.base import DEFAULT_PRAGMAS, apply_pragmas
+
+SCHEMA = """
+CREATE TABLE products (
+    id INTEGER PRIMARY KEY, category TEXT NOT NULL, price REAL NOT NULL,
+    review_count INTEGER NOT NULL DEFAULT 0, rating_total INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX products_category_price ON products (category, price, id);
+CREATE TABLE reviews (
+    id INTEGER PRIMARY KEY, product_id INTEGER NOT NULL, rating INTEGER NOT NULL, comment TEXT NOT NULL
+);
+"""
+
+CATEGORIES = ['Photo Frames', 'Idols', 'Home Interiors', 'Corporate Gifts']
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-test SQLite with concurrent catalog reads and review writes, once '
+        'with stock connection settings (rollback journal) and once with the '
+        'tuned PRAGMAs of tatva_backend.sqlite3 (WAL, synchronous=NORMAL, ...). '
+        'Runs against a throwaway database file; the project database is not touched.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8, help='Reader threads')
+        parser.add_argument('--writers', type=int, default=4, help='Writer threads')
+        parser.add_argument('--seconds', type=float, default=5.0, help='Duration of each run')
+        parser.add_argument('--products', type=int, default=5_000, help='Rows in the products table')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['readers'] < 0 or options['writers'] < 0 or options['readers'] + options['writers'] < 1:
+            raise CommandError('Need at least one reader or writer.')
+
+        self.stdout.write(
+            f'{"mode":>8}{"reads/s":>10}{"writes/s":>10}{"read p95 ms":>13}{"locked":>8}'
+        )
+        results = {}
+        for mode, pragmas in (('stock', {}), ('tuned', DEFAULT_PRAGMAS)):
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'bench.sqlite3')
+                self.seed_database(path, pragmas, options)
+                results[mode] = result = self.run(path, pragmas, options)
+            self.stdout.write(
+                f'{mode:>8}{result["reads"]:>10.0f}{result["writes"]:>10.0f}'
+                f'{result["read_p95"]:>13.2f}{result["locked"]:>8}'
+            )
+
+        stock, tuned = results['stock'], results['tuned']
+        self.stdout.write(
+            f'Tuned vs stock: {tuned["reads"] / max(stock["reads"], 1e-6):.1f}x reads, '
+            f'{tuned["writes"] / max(stock["writes"], 1e-6):.1f}x writes'
+        )
+        self.stdout.write(self.style.SUCCESS('✓ Benchmark finished'))
+
+    def connect(self, path, pragmas):
+        # Autocommit like Django: transactions are opened explicitly
+        conn = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        apply_pragmas(conn, pragmas)
+        return conn
+
+    def seed_database(self, path, pragmas, options):
+        rng = random.Random(options['seed'])
+        conn = self.connect(path, pragmas)
+        conn.executescript(SCHEMA)
+        conn.execute('BEGIN')
+        conn.executemany(
+            'INSERT INTO products (id, category, price) VALUES (?, ?, ?)',
+            [(pk, rng.choice(CATEGORIES), rng.randint(100, 50_000)) for pk in range(1, options['products'] + 1)],
+        )
+        conn.execute('COMMIT')
+        conn.close()
+
+    def run(self, path, pragmas, options):
+        """Run readers and writers together for --seconds; rates per second"""
+        products = options['products']
+        deadline = [0.0]
+        barrier = threading.Barrier(options['readers'] + options['writers'] + 1)
+        lock = threading.Lock()
+        totals = {'reads': 0, 'writes': 0, 'locked': 0, 'latencies': []}
+
+        def reader(seed):
+            rng = random.Random(seed)
+            conn = self.connect(path, pragmas)
+            reads, locked, latencies = 0, 0, []
+            barrier.wait()
+            while time.perf_counter() < deadline[0]:
+                # A filtered catalog page, like GET /api/products/?category=...
+                low = rng.randint(100, 40_000)
+                start = time.perf_counter()
+                try:
+                    conn.execute(
+                        'SELECT id, price, review_count FROM products '
+                        'WHERE category = ? AND price >= ? ORDER BY price, id LIMIT 24',
+                        (rng.choice(CATEGORIES), low),
+                    ).fetchall()
+                except sqlite3.OperationalError:
+                    locked += 1
+                    continue
+                latencies.append(time.perf_counter() - start)
+                reads += 1
+            conn.close()
+            with lock:
+                totals['reads'] += reads
+                totals['locked'] += locked
+                totals['latencies'].extend(latencies)
+
+        def writer(seed):
+            rng = random.Random(seed)
+            conn = self.connect(path, pragmas)
+            writes = locked = 0
+            barrier.wait()
+            while time.perf_counter() < deadline[0]:
+                # A review and its product's aggregates, like add_review
+                product_id, rating = rng.randint(1, products), rng.randint(1, 5)
+                try:
+                    conn.execute('BEGIN')
+                    conn.execute(
+                        'INSERT INTO reviews (product_id, rating, comment) VALUES (?, ?, ?)',
+                        (product_id, rating, 'Lovely finish'),
+                    )
+                    conn.execute(
+                        'UPDATE products SET review_count = review_count + 1, '
+                        'rating_total = rating_total + ? WHERE id = ?',
+                        (rating, product_id),
+                    )
+                    conn.execute('COMMIT')
+                except sqlite3.OperationalError:
+                    if conn.in_transaction:
+                        conn.execute('ROLLBACK')
+                    locked += 1
+                    continue
+                writes += 1
+            conn.close()
+            with lock:
+                totals['writes'] += writes
+                totals['locked'] += locked
+
+        threads = [threading.Thread(target=reader, args=(options['seed'] + i,)) for i in range(options['readers'])]
+        threads += [threading.Thread(target=writer, args=(-options['seed'] - i,)) for i in range(options['writers'])]
+        for thread in threads:
+            thread.start()
+        deadline[0] = time.perf_counter() + options['seconds']
+        barrier.wait()
+        start = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+
+        latencies = sorted(totals['latencies'])
+        return {
+            'reads': totals['reads'] / elapsed,
+            'writes': totals['writes'] / elapsed,
+            'read_p95': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+            'locked': totals['locked'],
+        }
@@ -0,0 +1,42 @@
+import sys
+import time
+from django.core.management.base import BaseCommand
+from products.catalog_io import iter_export_lines
+
+
+class Command(BaseCommand):
+    help = 'Stream the product catalog (with thumbnails, sub-descriptions and reviews) as NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', nargs='?', default='-',
+            help='File to write to (default: stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=1000,
+            help='Products fetched (and nested rows prefetched) per database round-trip',
+        )
+
+    def handle(self, *args, **options):
+        output = options['output']
+        # Progress goes to stderr so stdout can carry the NDJSON stream
+        log = self.stderr if output == '-' else self.stdout
+
+        start = time.perf_counter()
+        count = 0
+        stream = sys.stdout if output == '-' else open(output, 'w', encoding='utf-8')
+        try:
+            for line in iter_export_lines(options['chunk_size']):
+                stream.write(line)
+                count += 1
+                if count % 10000 == 0:
+                    log.write(f'  {count} products exported...')
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        log.write(self.style.SUCCESS(
+            f'✓ Exported {count} product(s) in {elapsed:.1f}s '
+            f'({count / max(elapsed, 1e-9):.0f} products/s)'
+        ))
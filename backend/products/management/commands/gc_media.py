@@ -0,0 +1,57 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products import media
+from products.models import StoredImage
+
+
+class Command(BaseCommand):
+    help = (
+        'Recount stored-image references from Product.image and '
+        'ProductThumbnail.image_url, then delete unreferenced images and their variants'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace', type=float, default=24,
+            help='Keep unreferenced images uploaded less than this many hours ago (default: 24)',
+        )
+        parser.add_argument(
+            '--legacy', action='store_true',
+            help='Also delete unreferenced pre-hashing uploads (products/<uuid>.<ext>)',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report what would be deleted')
+
+    def handle(self, *args, grace, legacy, dry_run, **options):
+        # Signals keep the counts current, but a full recount also covers
+        # raw SQL edits and anything written before reference counting existed
+        counts = media.recount_references()
+
+        cutoff = timezone.now() - timedelta(hours=grace)
+        orphans = list(
+            StoredImage.objects.filter(ref_count__lte=0, created_at__lt=cutoff)
+            .values_list('name', flat=True)
+        )
+        if legacy:
+            orphans += [
+                name for name in media.legacy_names()
+                if name not in counts and not media.is_content_addressed(name)
+            ]
+
+        reclaimed = 0
+        for name in orphans:
+            if default_storage.exists(name):
+                reclaimed += default_storage.size(name)
+            if dry_run:
+                self.stdout.write(f'Would delete {name}')
+            else:
+                media.delete_stored(name)
+
+        verb = 'Would delete' if dry_run else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✓ {verb} {len(orphans)} unreferenced image(s) '
+                f'({reclaimed} bytes of originals); {len(counts)} image(s) in use'
+            )
+        )
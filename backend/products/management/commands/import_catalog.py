@@ -0,0 +1,51 @@
+import sys
+import time
+from django.core.management.base import BaseCommand, CommandError
+from products.catalog_io import import_batch, iter_records
+
+
+class Command(BaseCommand):
+    help = 'Upsert products (with thumbnails, sub-descriptions and reviews) from an NDJSON catalog export'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'input', nargs='?', default='-',
+            help='File to read from (default: stdin)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Products upserted per transaction',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        start = time.perf_counter()
+        created = updated = nested = 0
+
+        stream = sys.stdin if options['input'] == '-' else open(options['input'], encoding='utf-8')
+        try:
+            batch = []
+            for record in iter_records(stream):
+                batch.append(record)
+                if len(batch) >= batch_size:
+                    counts = import_batch(batch)
+                    created, updated, nested = created + counts[0], updated + counts[1], nested + counts[2]
+                    batch = []
+                    if (created + updated) % 10000 < batch_size:
+                        self.stdout.write(f'  {created + updated} products imported...')
+            if batch:
+                counts = import_batch(batch)
+                created, updated, nested = created + counts[0], updated + counts[1], nested + counts[2]
+        except ValueError as e:
+            raise CommandError(f'Import stopped: {e}')
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - start
+        total = created + updated
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ Imported {total} product(s) in {elapsed:.1f}s '
+            f'({total / max(elapsed, 1e-9):.0f} products/s)'
+        ))
+        self.stdout.write(f'  Created: {created}, updated: {updated}, nested rows: {nested}')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from products import sync
+from products.models import ProductTombstone
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete product tombstones older than PRODUCTS_TOMBSTONE_RETENTION_DAYS. '
+        'Sync cursors older than that are refused anyway (410), so clients resync.'
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - sync.get_retention()
+        deleted, _ = ProductTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Pruned {deleted} tombstone(s) older than {cutoff:%Y-%m-%d %H:%M}')
+        )
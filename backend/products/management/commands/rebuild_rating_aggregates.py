@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Coalesce
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Rebuild review_count, rating_sum and rating for products from their reviews'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'product_ids', nargs='*', type=int,
+            help='Only rebuild these products (default: all products)',
+        )
+
+    def handle(self, *args, **options):
+        products = Product.objects.all()
+        if options['product_ids']:
+            products = products.filter(pk__in=options['product_ids'])
+
+        actual = products.annotate(
+            actual_count=Count('reviews'),
+            actual_sum=Coalesce(Sum('reviews__rating'), 0),
+        )
+        drifted = actual.exclude(review_count=F('actual_count'), rating_sum=F('actual_sum')).count()
+        with transaction.atomic():
+            updated = products.rebuild_rating_aggregates()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rebuilt rating aggregates for {updated} product(s)')
+        )
+        self.stdout.write(f'  Products that had drifted: {drifted}')
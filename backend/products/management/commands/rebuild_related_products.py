@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from products import related
+
+
+class Command(BaseCommand):
+    help = (
+        'Precompute the related products of every product whose list is stale '
+        '(updated, new or shortened by a deletion since it was scored). '
+        'Cheap when little changed, so it can run often from cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rescore every product')
+
+    def handle(self, *args, **options):
+        count = related.rebuild(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Rewrote the related products of {count} product(s)')
+        )
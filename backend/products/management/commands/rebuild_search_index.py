@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from products import search
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text product search index from the products tables'
+
+    def handle(self, *args, **options):
+        if not search.is_enabled():
+            self.stdout.write(
+                self.style.WARNING('Full-text index is SQLite only; nothing to rebuild.')
+            )
+            return
+
+        with transaction.atomic():
+            count = search.rebuild_index()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ Indexed {count} product(s)')
+        )
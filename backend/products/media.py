@@ -0,0 +1,168 @@
+"""
+Content-addressed, deduplicating storage for uploaded product images.
+
+Uploads are named by the SHA-256 of their bytes, e.g.
+products/3f/3fa9...c1.png, so uploading the same photo again (for another
+product, or twice by accident) reuses the stored file instead of writing a
+new one. Because a name always refers to the same bytes, these files (and
+their variants) can be served with immutable cache headers.
+
+Every stored file has a StoredImage row whose ref_count tracks how many
+Product.image / ProductThumbnail.image_url values point at it. Signals keep
+the count current for single-row writes; bulk writers call
+adjust_references(), and the gc_media command recounts everything from
+scratch before removing orphans.
+"""
+import hashlib
+import posixpath
+import re
+from collections import Counter
+from django.core.files.storage import default_storage
+from django.db.models import F
+from django.views.static import serve
+from . import images
+from .images import source_from_url
+from .models import Product, ProductThumbnail, StoredImage, ImageVariant
+
+HASHED_NAME_RE = re.compile(r'^products/[0-9a-f]{2}/(variants/)?[0-9a-f]{64}(_w\d+)?\.[0-9a-z]+$')
+
+# Files whose content-derived names never change meaning can be cached forever
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Image URL field of each model that references stored images
+REFERENCE_FIELDS = {Product: 'image', ProductThumbnail: 'image_url'}
+
+EXTENSION_ALIASES = {'jpeg': 'jpg', 'tif': 'tiff'}
+
+
+def content_name(digest, extension):
+    return f'products/{digest[:2]}/{digest}.{extension}'
+
+
+def is_content_addressed(name):
+    return bool(HASHED_NAME_RE.match(name))
+
+
+def normalize_extension(extension):
+    extension = re.sub(r'[^0-9a-z]', '', (extension or '').lower())
+    return EXTENSION_ALIASES.get(extension, extension) or 'jpg'
+
+
+def hash_file(file):
+    """SHA-256 and size of a Django File, read chunk by chunk"""
+    digest = hashlib.sha256()
+    size = 0
+    file.seek(0)
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def store_image(file, extension):
+    """
+    Store an uploaded image under its content hash.
+    Returns (name, created): created is False when identical bytes were
+    already stored and no write happened.
+    """
+    digest, size = hash_file(file)
+    name = content_name(digest, normalize_extension(extension))
+    created = False
+    if not default_storage.exists(name):
+        saved = default_storage.save(name, file)
+        if saved != name:
+            # A concurrent upload of the same bytes won the race; the
+            # storage picked another name for ours, so drop the duplicate
+            default_storage.delete(saved)
+        else:
+            created = True
+    StoredImage.objects.get_or_create(name=name, defaults={'sha256': digest, 'size': size})
+    return name, created
+
+
+def save_upload(file, extension):
+    """
+    Store an upload and make sure its variants exist or are queued.
+    Returns (name, {width: variant name}). Re-uploading known bytes writes
+    nothing and returns the variants already recorded for them.
+    """
+    name, created = store_image(file, extension)
+    if not created:
+        existing = dict(ImageVariant.objects.filter(source=name).values_list('width', 'name'))
+        if existing:
+            return name, existing
+    return name, images.schedule_variants(name, images.plan_variants(file))
+
+
+def adjust_references(added=(), removed=()):
+    """
+    Apply reference count changes for image URLs that were added to or
+    removed from products/thumbnails. URLs outside our media are ignored.
+    """
+    delta = Counter()
+    for url in added:
+        name = source_from_url(url)
+        if name:
+            delta[name] += 1
+    for url in removed:
+        name = source_from_url(url)
+        if name:
+            delta[name] -= 1
+    for name, change in delta.items():
+        if change:
+            StoredImage.objects.filter(name=name).update(ref_count=F('ref_count') + change)
+
+
+def count_references():
+    """Count references to every stored name with one pass over both tables"""
+    counts = Counter()
+    urls = Product.objects.values_list('image', flat=True).iterator(chunk_size=2000)
+    thumbnail_urls = ProductThumbnail.objects.values_list('image_url', flat=True).iterator(chunk_size=2000)
+    for iterable in (urls, thumbnail_urls):
+        for url in iterable:
+            name = source_from_url(url)
+            if name:
+                counts[name] += 1
+    return counts
+
+
+def recount_references():
+    """Reset every StoredImage.ref_count from a full scan; returns the counts"""
+    counts = count_references()
+    StoredImage.objects.exclude(name__in=list(counts)).update(ref_count=0)
+    for stored in StoredImage.objects.filter(name__in=list(counts)).only('pk', 'name', 'ref_count'):
+        if stored.ref_count != counts[stored.name]:
+            StoredImage.objects.filter(pk=stored.pk).update(ref_count=counts[stored.name])
+    return counts
+
+
+def delete_stored(name):
+    """Delete a stored original with its variant files and rows"""
+    for variant in ImageVariant.objects.filter(source=name):
+        default_storage.delete(variant.name)
+        variant.delete()
+    default_storage.delete(name)
+    StoredImage.objects.filter(name=name).delete()
+
+
+def legacy_names(directory='products'):
+    """Pre-hashing uploads (products/<uuid>.<ext>) still in storage"""
+    try:
+        _, files = default_storage.listdir(directory)
+    except FileNotFoundError:
+        return []
+    return [posixpath.join(directory, filename) for filename in files]
+
+
+def serve_media(request, path, document_root=None):
+    """
+    Development media view: like django.views.static.serve, but
+    content-addressed files get a far-future immutable Cache-Control.
+    In production the web server serving MEDIA_ROOT should do the same for
+    the products/<xx>/ directories.
+    """
+    response = serve(request, path, document_root=document_root)
+    if is_content_addressed(path):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+    return response
@@ -0,0 +1,37 @@
+# Generated by Django 5.0.1 on 2026-10-17 15:54
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_review_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    Review = apps.get_model('products', 'Review')
+    totals = Review.objects.order_by().values('product_id').annotate(count=Count('id'), total=Sum('rating'))
+    for row in totals.iterator():
+        Product.objects.filter(pk=row['product_id']).update(
+            review_count=row['count'],
+            rating_sum=row['total'],
+            rating=round(row['total'] / row['count'], 2),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_product_list_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_review_aggregates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+from django.db import migrations
+
+
+CREATE_SQL = '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS products_search USING fts5(
+        name, description, main_description, sub_descriptions,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3 4'
+    )
+'''
+
+POPULATE_SQL = '''
+    INSERT INTO products_search(rowid, name, description, main_description, sub_descriptions)
+    SELECT p.id, p.name, COALESCE(p.description, ''), COALESCE(p.main_description, ''),
+           COALESCE((SELECT group_concat(s.title || ' ' || s.body, ' ')
+                     FROM product_sub_descriptions s WHERE s.product_id = p.id), '')
+    FROM products p
+'''
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 is SQLite only; other backends use the icontains fallback
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREATE_SQL)
+    schema_editor.execute(POPULATE_SQL)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS products_search')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_review_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
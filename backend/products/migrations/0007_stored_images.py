@@ -0,0 +1,29 @@
+# Generated by Django 5.0.1 on 2026-10-17 16:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_image_variants'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StoredImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=500, unique=True)),
+                ('sha256', models.CharField(max_length=64)),
+                ('size', models.PositiveIntegerField(default=0)),
+                ('ref_count', models.IntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'product_stored_images',
+                'ordering': ['name'],
+                'indexes': [models.Index(fields=['ref_count', 'created_at'], name='stored_image_orphan_idx')],
+            },
+        ),
+    ]
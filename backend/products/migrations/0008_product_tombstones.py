@@ -0,0 +1,33 @@
+# Generated by Django 5.0.1 on 2026-10-17 16:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_stored_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('product_id', models.BigIntegerField(unique=True)),
+                ('deleted_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'product_tombstones',
+                'ordering': ['deleted_at', 'product_id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['updated_at', 'id'], name='products_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producttombstone',
+            index=models.Index(fields=['deleted_at', 'product_id'], name='tombstone_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.0.1 on 2026-10-17 17:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_related_products'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['category', '-review_count', '-id'], name='products_cat_popular_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['-review_count', '-id'], name='products_popular_idx'),
+        ),
+    ]
@@ -1,5 +1,115 @@
-from django.db import models
+from decimal import Decimal
+from django.core.validators import MaxValueValidator, MinValueValidator
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
+from django.db.models.lookups import GreaterThan
+from django.utils import timezone
 import json
+from .cache import bump_catalog_version
+
+# Rating shown for products that have no reviews yet
+DEFAULT_RATING = Decimal('5.00')
+
+# Number of newest reviews embedded in the product detail payload; the rest
+# are served by the paginated /api/products/{id}/reviews/ endpoint
+REVIEW_PREVIEW_SIZE = 3
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet helpers for Product"""
+
+    def with_detail_relations(self):
+        """
+        Prefetch the nested relations rendered by ProductSerializer, already
+        in display order, so serializing N products costs 4 queries, not 3N+1
+        """
+        return self.prefetch_related(*detail_prefetches()).with_rating_distribution()
+    
+    def with_rating_distribution(self):
+        """Annotate rating_<n>_count (n = 1..5) with one correlated subquery each"""
+        annotations = {}
+        for rating in range(1, 6):
+            counts = (
+                Review.objects.filter(product=OuterRef('pk'), rating=rating)
+                .order_by().values('product').annotate(n=Count('id')).values('n')
+            )
+            annotations[f'rating_{rating}_count'] = Coalesce(Subquery(counts), 0)
+        return self.annotate(**annotations)
+    
+    def apply_review_delta(self, count_delta, sum_delta):
+        """
+        Atomically adjust review_count/rating_sum and re-derive rating in a
+        single UPDATE. The right-hand side sees the pre-update values, so
+        concurrent reviews never overwrite each other's contribution.
+        """
+        new_count = F('review_count') + count_delta
+        new_sum = F('rating_sum') + sum_delta
+        updated = self.update(
+            review_count=new_count,
+            rating_sum=new_sum,
+            rating=rating_expression(new_count, new_sum),
+        )
+        transaction.on_commit(bump_catalog_version)
+        return updated
+    
+    def rebuild_rating_aggregates(self):
+        """Recompute review_count/rating_sum/rating from the reviews table"""
+        reviews = Review.objects.filter(product=OuterRef('pk')).order_by().values('product')
+        count = Coalesce(Subquery(reviews.annotate(n=Count('id')).values('n')), 0)
+        total = Coalesce(Subquery(reviews.annotate(s=Sum('rating')).values('s')), 0)
+        updated = self.update(
+            review_count=count,
+            rating_sum=total,
+            rating=rating_expression(count, total),
+        )
+        transaction.on_commit(bump_catalog_version)
+        return updated
+    
+    def reserve_stock(self, quantity):
+        """
+        Take `quantity` units with one conditional UPDATE ... WHERE stock >= n.
+        Rows without enough stock simply don't match, so concurrent orders can
+        never oversell; untracked rows (stock NULL) only need in_stock.
+        Returns the number of rows updated.
+        """
+        updated = self.filter(Q(stock__gte=quantity) | Q(stock__isnull=True, in_stock=True)).update(
+            stock=F('stock') - quantity,
+            in_stock=Case(
+                When(stock__isnull=True, then=F('in_stock')),
+                When(stock__gt=quantity, then=Value(True)),
+                default=Value(False),
+            ),
+            updated_at=timezone.now(),
+        )
+        if updated:
+            transaction.on_commit(bump_catalog_version)
+        return updated
+
+
+def rating_expression(count, total):
+    """SQL expression for the average rating, DEFAULT_RATING when unreviewed"""
+    return Case(
+        When(GreaterThan(count, 0), then=Round(Cast(total, models.FloatField()) / count, 2)),
+        default=Value(DEFAULT_RATING),
+        output_field=models.DecimalField(max_digits=3, decimal_places=2),
+    )
+
+
+def detail_prefetches():
+    """
+    Ordered prefetches for sub-descriptions, thumbnails and the newest
+    reviews (stored on product.review_preview)
+    """
+    return [
+        models.Prefetch('sub_descriptions', queryset=SubDescription.objects.order_by('order', 'id')),
+        models.Prefetch('thumbnails', queryset=ProductThumbnail.objects.order_by('order', 'id')),
+        models.Prefetch(
+            'reviews',
+            queryset=Review.objects.order_by('-date', '-id')[:REVIEW_PREVIEW_SIZE],
+            to_attr='review_preview',
+        ),
+    ]
 
 
 class Product(models.Model):
@@ -23,16 +133,45 @@ class Product(models.Model):
     material = models.CharField(max_length=100, blank=True, null=True)
     weight = models.CharField(max_length=50, blank=True, null=True)
     in_stock = models.BooleanField(default=True)
+    # Units on hand; NULL means stock isn't tracked and in_stock alone applies
+    stock = models.PositiveIntegerField(null=True, blank=True)
     rating = models.DecimalField(max_digits=3, decimal_places=2, default=5.0)
+    # Denormalized review aggregates; rating is derived from them
+    # (see ProductQuerySet.apply_review_delta)
+    review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = ProductQuerySet.as_manager()
+    
     class Meta:
         db_table = 'products'
         ordering = ['-created_at']
+        # Composite indexes backing the list endpoint's filters and sort orders
+        # (see products.filters.SORT_ORDERINGS); each ends on id so keyset
+        # pagination can seek straight to the cursor position.
+        indexes = [
+            models.Index(fields=['category', 'price', 'id'], name='products_cat_price_idx'),
+            models.Index(fields=['category', '-rating', '-id'], name='products_cat_rating_idx'),
+            models.Index(fields=['category', '-review_count', '-id'], name='products_cat_popular_idx'),
+            models.Index(fields=['category', '-created_at', '-id'], name='products_cat_created_idx'),
+            models.Index(fields=['price', 'id'], name='products_price_idx'),
+            models.Index(fields=['-rating', '-id'], name='products_rating_idx'),
+            models.Index(fields=['-review_count', '-id'], name='products_popular_idx'),
+            models.Index(fields=['-created_at', '-id'], name='products_created_idx'),
+            # Delta sync (products.sync) scans changes in (updated_at, id) order
+            models.Index(fields=['updated_at', 'id'], name='products_updated_idx'),
+        ]
     
     def __str__(self):
         return self.name
+    
+    def save(self, *args, **kwargs):
+        # A tracked stock level decides availability
+        if self.stock is not None:
+            self.in_stock = self.stock > 0
+        super().save(*args, **kwargs)
 
 
 class SubDescription(models.Model):
@@ -68,13 +207,105 @@ class Review(models.Model):
     """Product reviews"""
     product = models.ForeignKey(Product, related_name='reviews', on_delete=models.CASCADE)
     user_name = models.CharField(max_length=100)
-    rating = models.IntegerField()
+    rating = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
     comment = models.TextField()
     date = models.DateTimeField(auto_now_add=True)
     
     class Meta:
         db_table = 'product_reviews'
         ordering = ['-date']
+        indexes = [
+            # Keyset pagination of a product's reviews, newest first
+            models.Index(fields=['product', '-date', '-id'], name='reviews_product_date_idx'),
+            # Per-product rating distribution counts
+            models.Index(fields=['product', 'rating'], name='reviews_product_rating_idx'),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.user_name} ({self.rating} stars)"
+
+
+class ImageVariant(models.Model):
+    """Resized, re-encoded copy of an uploaded image (see products.images)"""
+    source = models.CharField(max_length=500)
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+    name = models.CharField(max_length=500)
+    size = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'product_image_variants'
+        ordering = ['source', 'width']
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'width'], name='image_variant_source_width_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.source} @ {self.width}px"
+
+
+class StoredImage(models.Model):
+    """
+    An uploaded original stored under its content hash (see products.media).
+    ref_count is the number of Product.image / ProductThumbnail.image_url
+    values pointing at it; unreferenced files are removed by gc_media.
+    """
+    name = models.CharField(max_length=500, unique=True)
+    sha256 = models.CharField(max_length=64)
+    size = models.PositiveIntegerField(default=0)
+    ref_count = models.IntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'product_stored_images'
+        ordering = ['name']
+        indexes = [
+            models.Index(fields=['ref_count', 'created_at'], name='stored_image_orphan_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class ProductTombstone(models.Model):
+    """
+    Record of a deleted product, so delta sync (products.sync) can report
+    the deletion. Removed again if a product with the same id is re-created.
+    """
+    product_id = models.BigIntegerField(unique=True)
+    deleted_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'product_tombstones'
+        ordering = ['deleted_at', 'product_id']
+        indexes = [
+            models.Index(fields=['deleted_at', 'product_id'], name='tombstone_deleted_idx'),
+        ]
+    
+    def __str__(self):
+        return f"Product {self.product_id} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+class RelatedProduct(models.Model):
+    """
+    One entry of a product's precomputed top-K related products (see
+    products.related). computed_at is when the product's list was scored;
+    a product updated after it has a stale list.
+    """
+    product = models.ForeignKey(Product, related_name='related_entries', on_delete=models.CASCADE)
+    related = models.ForeignKey(Product, related_name='related_from', on_delete=models.CASCADE)
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'product_related'
+        ordering = ['product', 'rank']
+        constraints = [
+            # Also the index /related/ reads a product's list from, in rank order
+            models.UniqueConstraint(fields=['product', 'rank'], name='related_product_rank_uniq'),
+        ]
+    
+    def __str__(self):
+        return f"{self.product_id} -> {self.related_id} (#{self.rank})"
@@ -0,0 +1,150 @@
+import base64
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset (seek) pagination over the queryset's own ordering.
+
+    The cursor stores the ordering values of the last row on the page, and
+    the next page is fetched with a WHERE clause that starts right after it,
+    so page N costs the same as page 1 (no OFFSET scan). The queryset
+    ordering must end on a unique field (e.g. the primary key).
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 24
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        return self.set_page([row async for row in self.page_queryset(queryset, request)])
+
+    def page_queryset(self, queryset, request):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(self.build_seek_filter(queryset.model, position))
+
+        # Fetch one extra row to know whether there is a next page
+        return queryset[:self.page_size + 1]
+
+    def set_page(self, results):
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        return min(page_size, self.max_page_size)
+
+    def get_ordering(self, queryset):
+        ordering = tuple(queryset.query.order_by) or tuple(queryset.model._meta.ordering)
+        assert ordering, 'KeysetPagination requires an ordered queryset.'
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        last = self.page[-1]
+        position = [
+            self.serialize_value(getattr(last, field.lstrip('-')))
+            for field in self.ordering
+        ]
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(position))
+
+    def build_seek_filter(self, model, position):
+        """
+        Build (a > x) OR (a = x AND b > y) OR ... for the ordering fields,
+        flipping the comparison for descending fields
+        """
+        seek = Q()
+        equal = Q()
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            value = self.deserialize_value(model, name, value)
+            seek |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return seek
+
+    def encode_cursor(self, position):
+        data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        except (TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        # Ordering columns are non-null scalars; anything else is forged
+        if not all(isinstance(value, (str, int, float)) for value in position):
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def serialize_value(self, value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    def deserialize_value(self, model, name, value):
+        try:
+            field = model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return value
+        try:
+            value = field.to_python(value)
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if value is None:
+            raise NotFound(self.invalid_cursor_message)
+        return value
+
+
+class ReviewPagination(KeysetPagination):
+    """Keyset pagination for a product's reviews, newest first"""
+    page_size = 10
+    max_page_size = 50
@@ -0,0 +1,291 @@
+"""
+Precomputed "related products": GET /api/products/{id}/related/.
+
+Every product keeps its top PRODUCTS_RELATED_COUNT related products as
+ranked RelatedProduct rows, so serving a list is one indexed range read.
+A pair of products is scored from:
+- the same category
+- the same material
+- price proximity, 1 - |a - b| / max(a, b)
+- co-review overlap, the Jaccard similarity of their reviewers' names
+A pair's score depends on nothing but the two products, which is what lets
+rebuild() work incrementally: only the stale lists (products updated since
+their list was scored, new products, lists shortened by a deletion) are
+rescored, and every other list just merges in its scores against the
+stale products. A list that contained a stale product is rescored too,
+since that product's score may have dropped.
+
+A product is not scored against the whole catalog, only against the
+candidates that can make its list: the products sharing a reviewer with
+it, and the K closest in price overall, in its category, in its material
+and in both. Any other product shares no reviewer, so it scores its price
+proximity plus the category/material bonuses, and is beaten by the K
+closer products of the bucket with the same bonuses. Candidates come from price-sorted
+indexes over the catalog's narrow columns; reviewer names are only loaded
+for the products being scored (all of them on a full rebuild).
+
+rebuild() is run by the rebuild_related_products command, e.g. from cron.
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+from .cache import bump_catalog_version
+from .models import Product, RelatedProduct, Review
+
+WEIGHTS = {
+    'category': 3.0,
+    'material': 1.5,
+    'price': 1.0,
+    'reviewers': 2.0,
+}
+
+# Reviewer names that don't identify anyone
+ANONYMOUS_REVIEWERS = {'', 'anonymous'}
+
+# Ids per IN (...) query, under SQLite's bound parameter limit
+QUERY_CHUNK = 500
+
+
+def get_related_count():
+    return getattr(settings, 'PRODUCTS_RELATED_COUNT', 8)
+
+
+def chunked(values):
+    values = list(values)
+    for start in range(0, len(values), QUERY_CHUNK):
+        yield values[start:start + QUERY_CHUNK]
+
+
+def price_proximity(a, b):
+    high = max(a, b)
+    return 1 - abs(a - b) / high if high > 0 else 1
+
+
+class Catalog:
+    """
+    What the score reads for every product, with the indexes candidates
+    are drawn from. Reviewer sets start empty and are filled by
+    load_reviewers() for the products about to be scored.
+    """
+
+    def __init__(self, full=False):
+        self.features = {}
+        by_category, by_material, by_both = defaultdict(list), defaultdict(list), defaultdict(list)
+        for product_id, category, material, price, updated_at in Product.objects.order_by().values_list(
+            'id', 'category', 'material', 'price', 'updated_at',
+        ):
+            material = (material or '').strip().lower()
+            self.features[product_id] = {
+                'category': category,
+                'material': material,
+                'price': float(price),
+                'reviewers': set(),
+                'updated_at': updated_at,
+            }
+            by_category[category].append((float(price), product_id))
+            if material:
+                by_material[material].append((float(price), product_id))
+                by_both[category, material].append((float(price), product_id))
+        self.by_price = sorted((product['price'], product_id) for product_id, product in self.features.items())
+        self.by_category = {key: sorted(bucket) for key, bucket in by_category.items()}
+        self.by_material = {key: sorted(bucket) for key, bucket in by_material.items()}
+        self.by_both = {key: sorted(bucket) for key, bucket in by_both.items()}
+        self.loaded = set()
+        # {reviewer: product ids}, when every review has been read
+        self.reviewed = None
+        if full:
+            self.load_all_reviewers()
+
+    def add_reviewer(self, product_id, name):
+        name = name.strip().lower()
+        if name in ANONYMOUS_REVIEWERS or product_id not in self.features:
+            return False
+        self.features[product_id]['reviewers'].add(name)
+        return True
+
+    def load_all_reviewers(self):
+        self.reviewed = defaultdict(set)
+        for product_id, name in Review.objects.order_by().values_list('product_id', 'user_name'):
+            if self.add_reviewer(product_id, name):
+                self.reviewed[name.strip().lower()].add(product_id)
+        self.loaded = set(self.features)
+
+    def load_reviewers(self, product_ids):
+        missing = [product_id for product_id in product_ids if product_id not in self.loaded]
+        for chunk in chunked(missing):
+            rows = Review.objects.order_by().filter(product_id__in=chunk).values_list('product_id', 'user_name')
+            for product_id, name in rows:
+                self.add_reviewer(product_id, name)
+        self.loaded.update(missing)
+
+    def reviewed_by(self, names):
+        """Products with a review by any of the (normalized) names"""
+        if self.reviewed is not None:
+            return set().union(*(self.reviewed.get(name, ()) for name in names))
+        product_ids = set()
+        for chunk in chunked(names):
+            product_ids.update(
+                Review.objects.order_by().annotate(reviewer=Lower(Trim('user_name')))
+                .filter(reviewer__in=chunk).values_list('product_id', flat=True).distinct()
+            )
+        return product_ids
+
+    def nearest(self, bucket, product_id, limit):
+        """
+        The limit products of a price-sorted bucket closest in price to
+        product_id (more on a tie for the last place)
+        """
+        price = self.features[product_id]['price']
+        position = bisect_left(bucket, (price, product_id))
+        left, right = position - 1, position + 1
+        found, last = [], None
+        while left >= 0 or right < len(bucket):
+            take_left = right >= len(bucket) or (
+                left >= 0 and price_proximity(price, bucket[left][0]) >= price_proximity(price, bucket[right][0])
+            )
+            index = left if take_left else right
+            proximity = price_proximity(price, bucket[index][0])
+            if len(found) >= limit and proximity != last:
+                break
+            found.append(bucket[index][1])
+            last = proximity
+            if take_left:
+                left -= 1
+            else:
+                right += 1
+        return found
+
+    def candidates(self, product_id, limit):
+        """Every product that can make product_id's top limit"""
+        own = self.features[product_id]
+        found = set(self.nearest(self.by_price, product_id, limit))
+        found.update(self.nearest(self.by_category[own['category']], product_id, limit))
+        if own['material']:
+            found.update(self.nearest(self.by_material[own['material']], product_id, limit))
+            found.update(self.nearest(self.by_both[own['category'], own['material']], product_id, limit))
+        if own['reviewers']:
+            found.update(self.reviewed_by(own['reviewers']))
+        found.discard(product_id)
+        # A review of a product deleted since the catalog was read
+        found.intersection_update(self.features)
+        return found
+
+
+def score(a, b):
+    total = 0.0
+    if a['category'] == b['category']:
+        total += WEIGHTS['category']
+    if a['material'] and a['material'] == b['material']:
+        total += WEIGHTS['material']
+    total += WEIGHTS['price'] * price_proximity(a['price'], b['price'])
+    if a['reviewers'] and b['reviewers']:
+        shared = len(a['reviewers'] & b['reviewers'])
+        total += WEIGHTS['reviewers'] * shared / len(a['reviewers'] | b['reviewers'])
+    return total
+
+
+def top(candidates, limit):
+    """Best (related id, score) pairs first; ties go to the lower id"""
+    return sorted(candidates, key=lambda candidate: (-candidate[1], candidate[0]))[:limit]
+
+
+def score_product(product_id, catalog, limit):
+    catalog.load_reviewers([product_id])
+    candidates = catalog.candidates(product_id, limit)
+    catalog.load_reviewers(candidates)
+    own = catalog.features[product_id]
+    return top([(other, score(own, catalog.features[other])) for other in candidates], limit)
+
+
+def load_lists():
+    """{product id: (computed_at, [(related id, score), ...] in rank order)}"""
+    lists = {}
+    rows = RelatedProduct.objects.order_by('product', 'rank').values_list(
+        'product_id', 'related_id', 'score', 'computed_at',
+    )
+    for product_id, related_id, related_score, computed_at in rows:
+        # A list is always written whole, so its rows share computed_at
+        lists.setdefault(product_id, (computed_at, []))[1].append((related_id, related_score))
+    return lists
+
+
+def find_stale(features, lists, limit):
+    """Products whose list is missing, outdated or the wrong length"""
+    expected = min(limit, len(features) - 1)
+    stale = set()
+    for product_id, product in features.items():
+        built, entries = lists.get(product_id, (None, []))
+        if len(entries) != expected or (built is not None and product['updated_at'] > built):
+            stale.add(product_id)
+    return stale
+
+
+def rebuild(full=False):
+    """
+    Bring the related lists up to date and return how many were rewritten.
+    full rescores every product instead of only what changed.
+    """
+    computed_at = timezone.now()
+    limit = get_related_count()
+    catalog = Catalog(full=full)
+    features = catalog.features
+    lists = {} if full else load_lists()
+    stale = set(features) if full else find_stale(features, lists, limit)
+    if not stale:
+        return 0
+
+    catalog.load_reviewers(stale)
+    updated = {product_id: score_product(product_id, catalog, limit) for product_id in stale}
+    merging = {}
+    for product_id, (_, entries) in lists.items():
+        if product_id in stale or product_id not in features or not entries:
+            continue
+        if any(related_id in stale for related_id, _ in entries):
+            updated[product_id] = score_product(product_id, catalog, limit)
+            continue
+        # Without its reviewers loaded a product scores at most the
+        # reviewer weight short; skip the stale products that can't make
+        # the list even with it
+        own, lowest = features[product_id], entries[-1][1]
+        contenders = [
+            other for other in stale
+            if score(own, features[other]) + (WEIGHTS['reviewers'] if features[other]['reviewers'] else 0) >= lowest
+        ]
+        if contenders:
+            merging[product_id] = (entries, contenders)
+
+    catalog.load_reviewers(merging)
+    for product_id, (entries, contenders) in merging.items():
+        own = features[product_id]
+        merged = top(entries + [(other, score(own, features[other])) for other in contenders], limit)
+        if merged != entries:
+            updated[product_id] = merged
+
+    write_lists(updated, computed_at, full)
+    return len(updated)
+
+
+@transaction.atomic
+def write_lists(lists, computed_at, replace_all=False):
+    existing = RelatedProduct.objects.all()
+    if not replace_all:
+        existing = existing.filter(product_id__in=list(lists))
+    existing.delete()
+    RelatedProduct.objects.bulk_create(
+        [
+            RelatedProduct(product_id=product_id, related_id=related_id, rank=rank,
+                           score=related_score, computed_at=computed_at)
+            for product_id, entries in lists.items()
+            for rank, (related_id, related_score) in enumerate(entries)
+        ],
+        batch_size=500,
+    )
+    transaction.on_commit(bump_catalog_version)
+
+
+def related_products(queryset, product_id):
+    """A product's related products, best first, in one indexed lookup"""
+    return queryset.filter(related_from__product_id=product_id).order_by('related_from__rank')
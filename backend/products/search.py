@@ -0,0 +1,158 @@
+"""
+Full-text product search backed by an SQLite FTS5 index.
+
+The products_search virtual table (created in migration 0005) holds one row
+per product, keyed by rowid = product id, over the name, description,
+main_description and the concatenated sub-description titles/bodies.
+signals.py keeps it in sync after every commit. On other database
+backends search falls back to icontains lookups.
+"""
+import re
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from .models import Product
+
+SEARCH_TABLE = 'products_search'
+
+# Column weights for bm25(): name matches count most, then the
+# descriptions, then sub-descriptions
+BM25_WEIGHTS = (10.0, 3.0, 2.0, 1.0)
+
+SNIPPET_START = '<mark>'
+SNIPPET_END = '</mark>'
+SNIPPET_ELLIPSIS = '…'
+SNIPPET_TOKENS = 16
+
+INDEX_SELECT_SQL = '''
+    SELECT p.id, p.name, COALESCE(p.description, ''), COALESCE(p.main_description, ''),
+           COALESCE((SELECT group_concat(s.title || ' ' || s.body, ' ')
+                     FROM product_sub_descriptions s WHERE s.product_id = p.id), '')
+    FROM products p
+'''
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def is_enabled():
+    """FTS5 is only available on SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def build_match_query(query):
+    """
+    Turn free text into an FTS5 MATCH expression: every word is quoted (so
+    FTS operators in user input are inert) and prefix-matched, and all words
+    must match. Returns None if the query has no searchable words.
+    """
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def index_products(product_ids):
+    """(Re)index the given products; ids of deleted products are just removed"""
+    if not is_enabled() or not product_ids:
+        return
+    product_ids = list(product_ids)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, name, description, main_description, sub_descriptions) '
+            f'{INDEX_SELECT_SQL} WHERE p.id IN ({placeholders})',
+            product_ids,
+        )
+
+
+def remove_products(product_ids):
+    if not is_enabled() or not product_ids:
+        return
+    product_ids = list(product_ids)
+    placeholders = ', '.join(['%s'] * len(product_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})', product_ids)
+
+
+def rebuild_index():
+    """Rebuild the whole index from the products tables; returns the row count"""
+    if not is_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SEARCH_TABLE}(rowid, name, description, main_description, sub_descriptions) '
+            f'{INDEX_SELECT_SQL}'
+        )
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+        cursor.execute(f'SELECT COUNT(*) FROM {SEARCH_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search_product_ids(query, limit, offset=0):
+    """
+    Return [(product_id, snippet), ...] best match first.
+    Snippets highlight matched terms with <mark>…</mark>.
+    """
+    if not is_enabled():
+        return fallback_search_product_ids(query, limit, offset)
+    match = build_match_query(query)
+    if match is None:
+        return []
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, snippet({SEARCH_TABLE}, -1, %s, %s, %s, %s) '
+            f'FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s '
+            f'ORDER BY bm25({SEARCH_TABLE}, {weights}) LIMIT %s OFFSET %s',
+            [SNIPPET_START, SNIPPET_END, SNIPPET_ELLIPSIS, SNIPPET_TOKENS, match, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def fallback_search_product_ids(query, limit, offset=0):
+    """Unranked icontains search for databases without FTS5"""
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        return []
+    queryset = Product.objects.all()
+    for token in tokens:
+        queryset = queryset.filter(
+            Q(name__icontains=token)
+            | Q(description__icontains=token)
+            | Q(main_description__icontains=token)
+            | Q(sub_descriptions__body__icontains=token)
+        )
+    ids = queryset.order_by('-rating', '-id').values_list('id', flat=True).distinct()
+    if limit is not None:
+        ids = ids[offset:offset + limit]
+    return [(product_id, '') for product_id in ids]
+
+
+def filter_by_search(queryset, query):
+    """
+    Restrict a Product queryset to full-text matches (unranked), e.g. for
+    the admin changelist. Uses a single rowid subquery on SQLite.
+    """
+    if not is_enabled():
+        ids = [product_id for product_id, _ in fallback_search_product_ids(query, limit=None)]
+        return queryset.filter(pk__in=ids)
+    match = build_match_query(query)
+    if match is None:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(f'SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s', [match])
+    )
+
+
+def search_products(query, limit, offset=0, queryset=None):
+    """
+    Return [(product, snippet), ...] best match first, in two queries.
+    Products are loaded from `queryset` (default: all products).
+    """
+    hits = search_product_ids(query, limit, offset)
+    if queryset is None:
+        queryset = Product.objects.all()
+    products = queryset.in_bulk([product_id for product_id, _ in hits])
+    return [(products[product_id], snippet) for product_id, snippet in hits if product_id in products]
@@ -1,5 +1,10 @@
+from django.db import transaction
+from django.db.models import Count, prefetch_related_objects
 from rest_framework import serializers
-from .models import Product, SubDescription, ProductThumbnail, Review
+from .models import (
+    Product, SubDescription, ProductThumbnail, Review, REVIEW_PREVIEW_SIZE, detail_prefetches,
+)
+from . import media
 
 
 class SubDescriptionSerializer(serializers.ModelSerializer):
@@ -34,11 +39,29 @@ class ReviewSerializer(serializers.ModelSerializer):
         return ret
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """
+    Serialize only the fields in context['fieldset'] (see products.fieldsets),
+    or default_fields when the request asked for no particular fields
+    (None: every field in Meta.fields)
+    """
+    default_fields = None
+    
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset') or self.default_fields
+        if fieldset is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in fieldset}
+
+
+class ProductSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     """Serializer for Product model"""
     sub_descriptions = serializers.SerializerMethodField()
     thumbnails = serializers.SerializerMethodField()
     reviews = serializers.SerializerMethodField()
+    reviewCount = serializers.IntegerField(source='review_count', read_only=True)
+    ratingDistribution = serializers.SerializerMethodField()
     inStock = serializers.SerializerMethodField()
     
     class Meta:
@@ -46,8 +69,9 @@ class ProductSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'category', 'price', 'image', 'alt',
             'description', 'main_description', 'sub_descriptions',
-            'dimensions', 'material', 'weight', 'inStock',
-            'thumbnails', 'reviews', 'rating', 'created_at', 'updated_at'
+            'dimensions', 'material', 'weight', 'inStock', 'stock',
+            'thumbnails', 'reviews', 'reviewCount', 'ratingDistribution',
+            'rating', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'rating']
     
@@ -55,21 +79,65 @@ class ProductSerializer(serializers.ModelSerializer):
         """Return in_stock as inStock for frontend compatibility"""
         return obj.in_stock
     
+    def validate(self, attrs):
+        """Submitted reviews are written without ReviewSerializer, so bound their ratings here"""
+        reviews_data = self.initial_data.get('reviews')
+        rating_field = ReviewSerializer().fields['rating']
+        errors = {}
+        for idx, review_data in enumerate(reviews_data if isinstance(reviews_data, list) else []):
+            if not (review_data and review_data.get('comment')):
+                continue
+            try:
+                rating_field.run_validation(review_data.get('rating', 5))
+            except serializers.ValidationError as e:
+                errors[idx] = {'rating': e.detail}
+        if errors:
+            raise serializers.ValidationError({'reviews': errors})
+        return attrs
+    
+    # Nested relations are read with .all() only: the viewset prefetches them
+    # already ordered (Product.objects.with_detail_relations()), and any
+    # further .order_by() here would bypass the prefetch cache.
+    
     def get_thumbnails(self, obj):
         """Get thumbnail URLs as a list"""
-        thumbnails = obj.thumbnails.all().order_by('order')
-        return [thumb.image_url for thumb in thumbnails]
+        return [thumb.image_url for thumb in obj.thumbnails.all()]
     
     def get_sub_descriptions(self, obj):
         """Get sub-descriptions as a list of dicts"""
-        sub_descs = obj.sub_descriptions.all().order_by('order')
-        return [{'title': sub.title, 'body': sub.body} for sub in sub_descs]
+        return [{'title': sub.title, 'body': sub.body} for sub in obj.sub_descriptions.all()]
     
     def get_reviews(self, obj):
-        """Get reviews as a list"""
-        reviews = obj.reviews.all().order_by('-date')
+        """
+        Get the newest REVIEW_PREVIEW_SIZE reviews as a list; the full list
+        is paginated under /api/products/{id}/reviews/
+        """
+        reviews = getattr(obj, 'review_preview', None)
+        if reviews is None:
+            reviews = obj.reviews.order_by('-date', '-id')[:REVIEW_PREVIEW_SIZE]
         return ReviewSerializer(reviews, many=True).data
     
+    def get_ratingDistribution(self, obj):
+        """Number of reviews per star rating, e.g. {'5': 10, '4': 2, ...}"""
+        if hasattr(obj, 'rating_5_count'):
+            counts = {rating: getattr(obj, f'rating_{rating}_count') for rating in range(1, 6)}
+        else:
+            counts = dict.fromkeys(range(1, 6), 0)
+            rows = obj.reviews.order_by().values('rating').annotate(n=Count('id'))
+            for row in rows:
+                if row['rating'] in counts:
+                    counts[row['rating']] = row['n']
+        return {str(rating): counts[rating] for rating in range(5, 0, -1)}
+    
+    def refresh_relations(self, product):
+        """Reload nested relations into the prefetch cache after a write"""
+        if hasattr(product, '_prefetched_objects_cache'):
+            product._prefetched_objects_cache.clear()
+        if hasattr(product, 'review_preview'):
+            del product.review_preview
+        prefetch_related_objects([product], *detail_prefetches())
+    
+    @transaction.atomic
     def create(self, validated_data):
         """Create product with nested sub-descriptions, thumbnails, and reviews"""
         # Get nested data from initial_data since they're SerializerMethodFields
@@ -85,40 +153,36 @@ class ProductSerializer(serializers.ModelSerializer):
         
         product = Product.objects.create(**validated_data)
         
-        # Create sub-descriptions
-        for idx, sub_desc_data in enumerate(sub_descriptions_data):
-            if sub_desc_data and (sub_desc_data.get('title') or sub_desc_data.get('body')):
-                SubDescription.objects.create(
-                    product=product,
-                    title=sub_desc_data.get('title', ''),
-                    body=sub_desc_data.get('body', ''),
-                    order=idx
-                )
-        
-        # Create thumbnails
-        for idx, thumbnail_url in enumerate(thumbnails_data):
-            if thumbnail_url:  # Only add non-empty URLs
-                ProductThumbnail.objects.create(
-                    product=product,
-                    image_url=thumbnail_url,
-                    order=idx
-                )
-        
-        # Create reviews
-        for review_data in reviews_data:
-            if review_data and review_data.get('comment'):
-                from .models import Review
-                Review.objects.create(
-                    product=product,
-                    user_name=review_data.get('userName') or review_data.get('user_name', 'Anonymous'),
-                    rating=review_data.get('rating', 5),
-                    comment=review_data.get('comment', '')
-                )
+        # Insert each nested collection with a single bulk INSERT
+        SubDescription.objects.bulk_create([
+            SubDescription(product=product, order=order, **values)
+            for order, values in self.desired_sub_descriptions(sub_descriptions_data).items()
+        ])
+        thumbnails = ProductThumbnail.objects.bulk_create([
+            ProductThumbnail(product=product, order=order, **values)
+            for order, values in self.desired_thumbnails(thumbnails_data).items()
+        ])
+        media.adjust_references(added=[thumbnail.image_url for thumbnail in thumbnails])
+        reviews = self.desired_reviews(reviews_data)
+        if reviews:
+            Review.objects.bulk_create([
+                Review(product=product, **{key: value for key, value in values.items() if key != 'id'})
+                for values in reviews
+            ])
+            Product.objects.filter(pk=product.pk).rebuild_rating_aggregates()
+            product.refresh_from_db(fields=['review_count', 'rating_sum', 'rating'])
         
+        self.refresh_relations(product)
         return product
     
+    @transaction.atomic
     def update(self, instance, validated_data):
-        """Update product with nested sub-descriptions, thumbnails, and reviews"""
+        """
+        Update product with nested sub-descriptions, thumbnails, and reviews.
+        Nested collections are diffed against the stored rows and only the
+        differences are written (bulk insert/update, one delete per collection),
+        so unchanged rows - and review dates - are left alone.
+        """
         # Get nested data from initial_data since they're SerializerMethodFields
         # Handle both snake_case and camelCase for sub_descriptions
         sub_descriptions_data = self.initial_data.get('sub_descriptions', None)
@@ -132,76 +196,192 @@ class ProductSerializer(serializers.ModelSerializer):
         if 'inStock' in self.initial_data:
             instance.in_stock = self.initial_data.get('inStock', True)
         
-        # Update basic fields
+        # Update basic fields. Only the edited columns are written, so a
+        # review landing concurrently keeps its review_count/rating_sum.
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
-        instance.save()
+        instance.save(update_fields=[*validated_data, 'in_stock', 'updated_at'])
+        
+        # Nested rows are about to change, so drop any prefetched copies
+        if hasattr(instance, '_prefetched_objects_cache'):
+            instance._prefetched_objects_cache.clear()
         
         # Update sub-descriptions if provided
         if sub_descriptions_data is not None:
-            # Delete existing sub-descriptions
-            instance.sub_descriptions.all().delete()
-            # Create new ones
-            for idx, sub_desc_data in enumerate(sub_descriptions_data):
-                if sub_desc_data and (sub_desc_data.get('title') or sub_desc_data.get('body')):
-                    SubDescription.objects.create(
-                        product=instance,
-                        title=sub_desc_data.get('title', ''),
-                        body=sub_desc_data.get('body', ''),
-                        order=idx
-                    )
+            self.sync_ordered_rows(
+                SubDescription, instance,
+                self.desired_sub_descriptions(sub_descriptions_data), ['title', 'body'],
+            )
         
         # Update thumbnails if provided
         if thumbnails_data is not None:
-            # Delete existing thumbnails
-            instance.thumbnails.all().delete()
-            # Create new ones
-            for idx, thumbnail_url in enumerate(thumbnails_data):
-                if thumbnail_url:  # Only add non-empty URLs
-                    ProductThumbnail.objects.create(
-                        product=instance,
-                        image_url=thumbnail_url,
-                        order=idx
-                    )
+            self.sync_ordered_rows(
+                ProductThumbnail, instance,
+                self.desired_thumbnails(thumbnails_data), ['image_url'],
+            )
         
         # Update reviews if provided (even if empty array, to clear reviews)
         if reviews_data is not None:
-            from .models import Review
-            # Delete existing reviews
-            instance.reviews.all().delete()
-            # Create new ones if provided
-            if isinstance(reviews_data, list) and len(reviews_data) > 0:
-                for review_data in reviews_data:
-                    if review_data and review_data.get('comment'):
-                        Review.objects.create(
-                            product=instance,
-                            user_name=review_data.get('userName') or review_data.get('user_name', 'Anonymous'),
-                            rating=review_data.get('rating', 5),
-                            comment=review_data.get('comment', '')
-                        )
-            # Recalculate product rating
-            reviews = instance.reviews.all()
-            if reviews:
-                avg_rating = sum(r.rating for r in reviews) / len(reviews)
-                instance.rating = round(avg_rating, 2)
-            else:
-                instance.rating = 5.0  # Default rating if no reviews
-            instance.save()
+            if self.sync_reviews(instance, self.desired_reviews(reviews_data)):
+                # Recalculate review aggregates in SQL
+                Product.objects.filter(pk=instance.pk).rebuild_rating_aggregates()
+                instance.refresh_from_db(fields=['review_count', 'rating_sum', 'rating'])
         
+        self.refresh_relations(instance)
         return instance
+    
+    def desired_sub_descriptions(self, data):
+        """Map order -> field values for the non-empty submitted sub-descriptions"""
+        return {
+            idx: {'title': sub_desc_data.get('title', ''), 'body': sub_desc_data.get('body', '')}
+            for idx, sub_desc_data in enumerate(data or [])
+            if sub_desc_data and (sub_desc_data.get('title') or sub_desc_data.get('body'))
+        }
+    
+    def desired_thumbnails(self, data):
+        """Map order -> field values for the non-empty submitted thumbnail URLs"""
+        return {
+            idx: {'image_url': thumbnail_url}
+            for idx, thumbnail_url in enumerate(data or [])
+            if thumbnail_url  # Only add non-empty URLs
+        }
+    
+    def desired_reviews(self, data):
+        """Field values (plus the optional id) for the submitted reviews that have a comment"""
+        if not isinstance(data, list):
+            return []
+        
+        def review_id(review_data):
+            try:
+                return int(review_data.get('id'))
+            except (TypeError, ValueError):
+                return None
+        
+        return [
+            {
+                'id': review_id(review_data),
+                'user_name': review_data.get('userName') or review_data.get('user_name', 'Anonymous'),
+                'rating': int(review_data.get('rating', 5)),
+                'comment': review_data.get('comment', ''),
+            }
+            for review_data in data
+            if review_data and review_data.get('comment')
+        ]
+    
+    def sync_ordered_rows(self, model, product, desired, fields):
+        """
+        Make the product's rows of `model` match `desired` (order -> values),
+        matching existing rows by their order. Returns True if anything changed.
+        """
+        matched = {}
+        stale = []
+        for row in model.objects.filter(product=product).order_by('order', 'id'):
+            if row.order in desired and row.order not in matched:
+                matched[row.order] = row
+            else:
+                stale.append(row.pk)
+        
+        to_create = []
+        to_update = []
+        replaced = []
+        for order, values in desired.items():
+            row = matched.get(order)
+            if row is None:
+                to_create.append(model(product=product, order=order, **values))
+            elif any(getattr(row, field) != value for field, value in values.items()):
+                replaced.append(model(**{field: getattr(row, field) for field in fields}))
+                for field, value in values.items():
+                    setattr(row, field, value)
+                to_update.append(row)
+        
+        if stale:
+            model.objects.filter(pk__in=stale).delete()
+        if to_create:
+            model.objects.bulk_create(to_create)
+        if to_update:
+            model.objects.bulk_update(to_update, fields)
+        
+        # Bulk writes send no signals; keep stored-image references in step
+        # (the stale rows were deleted one by one, so their signals ran)
+        reference_field = media.REFERENCE_FIELDS.get(model)
+        if reference_field:
+            media.adjust_references(
+                added=[getattr(row, reference_field) for row in to_create + to_update],
+                removed=[getattr(row, reference_field) for row in replaced],
+            )
+        return bool(stale or to_create or to_update)
+    
+    def sync_reviews(self, product, desired):
+        """
+        Make the product's reviews match `desired`. Submitted reviews are
+        matched to stored ones by id when given, otherwise by identical
+        content, so untouched reviews keep their row and date.
+        Returns True if anything changed.
+        """
+        existing = {review.pk: review for review in product.reviews.all()}
+        
+        def content(values):
+            return (values['user_name'], values['rating'], values['comment'])
+        
+        unmatched = []
+        to_update = []
+        for values in desired:
+            review = existing.pop(values['id'], None) if values['id'] is not None else None
+            if review is None:
+                unmatched.append(values)
+            elif content(values) != (review.user_name, review.rating, review.comment):
+                review.user_name, review.rating, review.comment = content(values)
+                to_update.append(review)
+        
+        by_content = {}
+        for review in existing.values():
+            by_content.setdefault((review.user_name, review.rating, review.comment), []).append(review)
+        to_create = []
+        for values in unmatched:
+            same = by_content.get(content(values))
+            if same:
+                existing.pop(same.pop().pk)
+            else:
+                to_create.append(Review(
+                    product=product,
+                    user_name=values['user_name'],
+                    rating=values['rating'],
+                    comment=values['comment'],
+                ))
+        
+        if existing:
+            Review.objects.filter(pk__in=list(existing)).delete()
+        if to_create:
+            Review.objects.bulk_create(to_create)
+        if to_update:
+            Review.objects.bulk_update(to_update, ['user_name', 'rating', 'comment'])
+        return bool(existing or to_create or to_update)
 
 
-class ProductListSerializer(serializers.ModelSerializer):
-    """Simplified serializer for product lists"""
-    inStock = serializers.SerializerMethodField()
+class ProductListSerializer(ProductSerializer):
+    """
+    Simplified serializer for product lists. Renders default_fields unless
+    the request picks others with ?fields= / ?expand=.
+    """
+    image = serializers.SerializerMethodField()
+    imageOriginal = serializers.CharField(source='image', read_only=True)
     
-    class Meta:
-        model = Product
+    default_fields = [
+        'id', 'name', 'category', 'price', 'image', 'imageOriginal', 'alt', 'rating', 'inStock'
+    ]
+    
+    class Meta(ProductSerializer.Meta):
         fields = [
-            'id', 'name', 'category', 'price', 'image', 'alt', 'rating', 'inStock'
+            'id', 'name', 'category', 'price', 'image', 'imageOriginal', 'alt', 'rating', 'inStock',
+            'description', 'main_description', 'sub_descriptions', 'dimensions', 'material',
+            'weight', 'stock', 'thumbnails', 'reviews', 'reviewCount', 'ratingDistribution',
+            'created_at', 'updated_at',
         ]
     
-    def get_inStock(self, obj):
-        """Return in_stock as inStock for frontend compatibility"""
-        return obj.in_stock
+    def get_image(self, obj):
+        """
+        Small, re-encoded variant for grid cards when one exists (the view
+        passes them in context['image_variants']), else the original URL
+        """
+        return self.context.get('image_variants', {}).get(obj.image, obj.image)
 
@@ -0,0 +1,102 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+from . import media, search
+from .cache import bump_catalog_version
+from .models import Product, SubDescription, ProductThumbnail, Review, ImageVariant, ProductTombstone
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=SubDescription)
+@receiver(post_delete, sender=SubDescription)
+@receiver(post_save, sender=ProductThumbnail)
+@receiver(post_delete, sender=ProductThumbnail)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+@receiver(post_save, sender=ImageVariant)
+@receiver(post_delete, sender=ImageVariant)
+def invalidate_catalog_cache(sender, **kwargs):
+    """
+    Any catalog write makes every cached list/detail response stale.
+    The bump waits for commit so a concurrent reader cannot cache the
+    pre-commit state under the new version.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=SubDescription)
+@receiver(post_delete, sender=SubDescription)
+@receiver(post_save, sender=ProductThumbnail)
+@receiver(post_delete, sender=ProductThumbnail)
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def touch_parent_product(sender, instance, origin=None, **kwargs):
+    """
+    Bump the parent's updated_at when a nested row changes, so it versions
+    the whole product (ETags, Last-Modified). Skipped while the product
+    itself is being deleted and its rows are cascading away.
+    """
+    if isinstance(origin, Product):
+        return
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Product)
+def reindex_saved_product(sender, instance, **kwargs):
+    """Refresh the product's full-text search row once the write commits"""
+    product_id = instance.pk
+    transaction.on_commit(lambda: search.index_products([product_id]))
+
+
+@receiver(post_delete, sender=Product)
+def unindex_deleted_product(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: search.remove_products([product_id]))
+
+
+@receiver(post_save, sender=SubDescription)
+@receiver(post_delete, sender=SubDescription)
+def reindex_parent_product(sender, instance, origin=None, **kwargs):
+    """Sub-description bodies are searchable, so reindex their product"""
+    if isinstance(origin, Product):
+        return
+    product_id = instance.product_id
+    transaction.on_commit(lambda: search.index_products([product_id]))
+
+
+@receiver(pre_save, sender=Product)
+@receiver(pre_save, sender=ProductThumbnail)
+def count_image_reference(sender, instance, update_fields=None, **kwargs):
+    """Move the stored-image reference from the old URL to the new one"""
+    field = media.REFERENCE_FIELDS[sender]
+    if update_fields is not None and field not in update_fields:
+        return
+    new_url = getattr(instance, field)
+    old_url = None
+    if not instance._state.adding and instance.pk is not None:
+        old_url = sender.objects.filter(pk=instance.pk).values_list(field, flat=True).first()
+    if old_url != new_url:
+        media.adjust_references(added=[new_url], removed=[old_url])
+
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductThumbnail)
+def release_image_reference(sender, instance, **kwargs):
+    media.adjust_references(removed=[getattr(instance, media.REFERENCE_FIELDS[sender])])
+
+
+@receiver(post_delete, sender=Product)
+def record_tombstone(sender, instance, **kwargs):
+    """Remember the deletion so delta sync can report it (products.sync)"""
+    ProductTombstone.objects.update_or_create(
+        product_id=instance.pk, defaults={'deleted_at': timezone.now()},
+    )
+
+
+@receiver(post_save, sender=Product)
+def clear_tombstone(sender, instance, created, **kwargs):
+    """A product re-created under a deleted id is no longer deleted"""
+    if created:
+        ProductTombstone.objects.filter(product_id=instance.pk).delete()
@@ -0,0 +1,158 @@
+"""
+Delta sync for client-side product replicas: GET /api/products/changes/.
+
+A client starts without a cursor and receives the whole catalog (paged),
+then calls again with ?since=<cursor> to receive only the products created
+or updated (by updated_at) and the ids deleted (ProductTombstone rows)
+since. Each response carries the cursor for the next call, so a replica
+stays current in O(changes) rather than O(catalog).
+
+The cursor holds one (timestamp, id) position per stream, products and
+tombstones, and both streams are read in that order from their indexes.
+Only rows older than a short settle window are returned, so a row whose
+timestamp was taken just before a slow commit is not skipped. Tombstones
+are kept for PRODUCTS_TOMBSTONE_RETENTION_DAYS; an older cursor gets a 410
+and the client must resync from scratch.
+"""
+import base64
+import json
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, NotFound
+from .models import ProductTombstone
+
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'Sync cursor is too old; discard the local copy and sync from scratch.'
+    default_code = 'cursor_expired'
+
+
+def get_settle_window():
+    return timedelta(seconds=getattr(settings, 'PRODUCTS_SYNC_SETTLE_SECONDS', 2))
+
+
+def get_retention():
+    return timedelta(days=getattr(settings, 'PRODUCTS_TOMBSTONE_RETENTION_DAYS', 30))
+
+
+def get_page_size(query_params):
+    try:
+        page_size = int(query_params['page_size'])
+    except (KeyError, ValueError):
+        return DEFAULT_PAGE_SIZE
+    if page_size <= 0:
+        return DEFAULT_PAGE_SIZE
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def encode_cursor(position):
+    data = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+
+def decode_cursor(encoded):
+    """
+    {'products': [timestamp, id] or None, 'deleted': [timestamp, id]} from
+    a cursor string. id None means "everything at or before timestamp".
+    """
+    invalid = NotFound('Invalid sync cursor.')
+    try:
+        padded = encoded + '=' * (-len(encoded) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        positions = {}
+        for stream in ('products', 'deleted'):
+            position = data[stream]
+            if position is None and stream == 'products':
+                positions[stream] = None
+                continue
+            timestamp, row_id = position
+            timestamp = parse_datetime(timestamp)
+            # A naive timestamp can't be compared with the aware ones it meets
+            if timestamp is None or not timezone.is_aware(timestamp):
+                raise invalid
+            if not (row_id is None or isinstance(row_id, int)):
+                raise invalid
+            positions[stream] = (timestamp, row_id)
+    except (TypeError, ValueError, KeyError):
+        raise invalid
+    return positions
+
+
+def position_to_json(position):
+    """Cursor entry for a (timestamp, id) position"""
+    timestamp, row_id = position
+    return [timestamp.isoformat(), row_id]
+
+
+def seek(queryset, time_field, id_field, position):
+    """Rows strictly after `position` in (time_field, id_field) order"""
+    if position is None:
+        return queryset
+    timestamp, row_id = position
+    if row_id is None:
+        return queryset.filter(**{f'{time_field}__gt': timestamp})
+    return queryset.filter(
+        Q(**{f'{time_field}__gt': timestamp})
+        | Q(**{time_field: timestamp, f'{id_field}__gt': row_id})
+    )
+
+
+def get_changes(queryset, since, page_size):
+    """
+    One page of changes after the `since` cursor (None: initial sync).
+    Returns (changed products, deleted ids, next cursor, has_more).
+    `queryset` selects and shapes the products to load.
+    """
+    horizon = timezone.now() - get_settle_window()
+    if since:
+        positions = decode_cursor(since)
+        if positions['deleted'][0] < timezone.now() - get_retention():
+            raise CursorExpired()
+    else:
+        # Deletions before the snapshot starts are irrelevant to a new replica
+        positions = {'products': None, 'deleted': (horizon, None)}
+
+    products = list(
+        seek(queryset.filter(updated_at__lte=horizon), 'updated_at', 'id', positions['products'])
+        .order_by('updated_at', 'id')[:page_size + 1]
+    )
+    tombstones = list(
+        seek(ProductTombstone.objects.filter(deleted_at__lte=horizon),
+             'deleted_at', 'product_id', positions['deleted'])
+        .order_by('deleted_at', 'product_id')[:page_size + 1]
+    )
+
+    # Merge both streams by time and keep the first page_size events
+    events = sorted(
+        [(product.updated_at, 0, product.pk, product) for product in products]
+        + [(tombstone.deleted_at, 1, tombstone.product_id, tombstone) for tombstone in tombstones],
+        key=lambda event: event[:3],
+    )
+    has_more = len(events) > page_size
+    events = events[:page_size]
+
+    changed = [event[3] for event in events if event[1] == 0]
+    deleted = [event[2] for event in events if event[1] == 1]
+    if has_more:
+        # Each stream resumes after the last event it contributed
+        for kind, stream in ((0, 'products'), (1, 'deleted')):
+            taken = [event for event in events if event[1] == kind]
+            if taken:
+                positions[stream] = (taken[-1][0], taken[-1][2])
+    else:
+        # Everything up to the horizon has been returned
+        positions = {'products': (horizon, None), 'deleted': (horizon, None)}
+
+    cursor = encode_cursor({
+        'products': position_to_json(positions['products']) if positions['products'] else None,
+        'deleted': position_to_json(positions['deleted']),
+    })
+    return changed, deleted, cursor, has_more
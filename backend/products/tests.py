@@ -1,3 +1,960 @@
-from django.test import TestCase
+from decimal import Decimal
+import base64
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from asgiref.sync import sync_to_async
+from io import BytesIO, StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from . import images, media, related
+from .cache import CATALOG_VERSION_KEY
+from .models import Product, ProductThumbnail, ImageVariant, Review, StoredImage
+from .serializers import ProductSerializer
 
-# Create your tests here.
+User = get_user_model()
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+
+def make_product(**kwargs):
+    defaults = {
+        'name': 'Test Product',
+        'category': 'Idols',
+        'price': Decimal('100.00'),
+        'image': 'https://example.com/image.webp',
+    }
+    defaults.update(kwargs)
+    return Product.objects.create(**defaults)
+
+
+class CatalogTestCase(TestCase):
+    """Base test case: fresh API client and an empty response cache"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+
+class ProductListTests(CatalogTestCase):
+    """Filtering, sorting and keyset pagination on GET /api/products/"""
+
+    def fetch_all(self, params):
+        """Follow next links and return every result"""
+        results = []
+        response = self.client.get('/api/products/', params)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            results.extend(response.data['results'])
+            if not response.data['next']:
+                return results
+            response = self.client.get(response.data['next'])
+
+    def test_filters(self):
+        make_product(name='Cheap idol', price=Decimal('50.00'))
+        make_product(name='Pricey idol', price=Decimal('500.00'))
+        make_product(name='Frame', category='Photo Frames', price=Decimal('80.00'))
+        make_product(name='Sold out', category='Photo Frames', in_stock=False)
+
+        response = self.client.get('/api/products/', {'category': 'Idols', 'max_price': '100'})
+        self.assertEqual([p['name'] for p in response.data['results']], ['Cheap idol'])
+
+        response = self.client.get('/api/products/', {'category': 'Photo Frames', 'in_stock': 'true'})
+        self.assertEqual([p['name'] for p in response.data['results']], ['Frame'])
+
+        response = self.client.get('/api/products/', {'category': 'Idols,Photo Frames', 'min_price': '90'})
+        self.assertEqual(len(response.data['results']), 2)
+
+    def test_keyset_pagination_with_ties(self):
+        # Many products share a price, so the cursor must break ties on id
+        for i in range(25):
+            make_product(name=f'Product {i}', price=Decimal(10 + i % 3))
+
+        results = self.fetch_all({'sort': 'price_asc', 'page_size': 4})
+        self.assertEqual(len(results), 25)
+        self.assertEqual(len({p['id'] for p in results}), 25)
+        keys = [(Decimal(p['price']), p['id']) for p in results]
+        self.assertEqual(keys, sorted(keys))
+
+        results = self.fetch_all({'sort': 'newest', 'page_size': 7})
+        self.assertEqual([p['id'] for p in results], sorted((p['id'] for p in results), reverse=True))
+
+    def test_popularity_is_review_count_not_rating(self):
+        loved = make_product(name='Loved', review_count=1, rating_sum=5, rating=Decimal('5.0'))
+        popular = make_product(name='Popular', review_count=40, rating_sum=120, rating=Decimal('3.0'))
+        tied = make_product(name='Tied', review_count=40, rating_sum=160, rating=Decimal('4.0'))
+
+        results = self.fetch_all({'sort': 'popularity', 'page_size': 1})
+        self.assertEqual([p['id'] for p in results], [tied.id, popular.id, loved.id])
+        results = self.fetch_all({'sort': 'rating', 'page_size': 1})
+        self.assertEqual([p['id'] for p in results], [loved.id, tied.id, popular.id])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/products/', {'cursor': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_forged_cursor_is_404(self):
+        make_product()
+        for position in ([1, 2], [[1], 2], [{'a': 1}, 3], [None, None], ['2026-01-01T00:00:00', 'x']):
+            cursor = base64.urlsafe_b64encode(json.dumps(position).encode()).decode().rstrip('=')
+            response = self.client.get('/api/products/', {'cursor': cursor, 'sort': 'newest'})
+            self.assertEqual(response.status_code, 404, position)
+            self.assertEqual(str(response.data['detail']), 'Invalid cursor')
+
+
+class ProductQueryCountTests(CatalogTestCase):
+    """Serializing products costs a fixed number of queries, whatever the catalog size"""
+
+    def make_detailed_product(self, index):
+        product = make_product(name=f'Product {index}')
+        for order in range(3):
+            product.sub_descriptions.create(title=f'Title {order}', body='Body', order=order)
+            product.thumbnails.create(image_url=f'https://example.com/{index}/{order}.webp', order=order)
+            product.reviews.create(user_name='Reviewer', rating=4, comment='Nice')
+        return product
+
+    def test_list_query_count(self):
+        for index in range(10):
+            self.make_detailed_product(index)
+        # Validators aggregate + one page query
+        with self.assertNumQueries(2):
+            self.client.get('/api/products/')
+
+    def test_full_serializer_query_count(self):
+        for index in range(10):
+            self.make_detailed_product(index)
+        with self.assertNumQueries(4):
+            data = ProductSerializer(Product.objects.with_detail_relations(), many=True).data
+        self.assertEqual(len(data), 10)
+        self.assertEqual(len(data[0]['thumbnails']), 3)
+
+    def test_retrieve_query_count(self):
+        product = self.make_detailed_product(0)
+        self.make_detailed_product(1)
+        # Validators lookup + product + three prefetches
+        with self.assertNumQueries(5):
+            response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(
+            response.data['thumbnails'],
+            [f'https://example.com/0/{order}.webp' for order in range(3)],
+        )
+        self.assertEqual([sub['title'] for sub in response.data['sub_descriptions']],
+                         ['Title 0', 'Title 1', 'Title 2'])
+
+
+class ProductFieldsetTests(CatalogTestCase):
+    """?fields= / ?expand= shape both the output and the SQL"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(name='Brass Diya', description='Long text ' * 50)
+        self.product.thumbnails.create(image_url='https://example.com/t.webp', order=0)
+        self.product.reviews.create(user_name='Asha', rating=4, comment='Lovely')
+
+    def test_list_fields_select_only_their_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/?fields=id,name,price')
+        self.assertEqual(list(response.data['results'][0]), ['id', 'name', 'price'])
+        page_sql = queries.captured_queries[-1]['sql']
+        self.assertNotIn('description', page_sql)
+        self.assertNotIn('"image"', page_sql)
+
+    def test_default_list_skips_description_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/')
+        self.assertIn('imageOriginal', response.data['results'][0])
+        self.assertNotIn('description', queries.captured_queries[-1]['sql'])
+
+    def test_expand_prefetches_only_requested_relations(self):
+        # Validators aggregate + page + thumbnails prefetch
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/products/?expand=thumbnails')
+        item = response.data['results'][0]
+        self.assertEqual(item['thumbnails'], ['https://example.com/t.webp'])
+        self.assertNotIn('reviews', item)
+
+    def test_detail_fieldset(self):
+        url = f'/api/products/{self.product.id}/'
+        # Validators lookup + product (with the distribution subqueries)
+        with self.assertNumQueries(2):
+            response = self.client.get(url + '?fields=id,name,ratingDistribution')
+        self.assertEqual(set(response.data), {'id', 'name', 'ratingDistribution'})
+        self.assertEqual(response.data['ratingDistribution']['4'], 1)
+
+        full = self.client.get(url)
+        self.assertIn('reviews', full.data)
+        self.assertNotEqual(full['ETag'], response['ETag'])
+
+    def test_search_fieldset(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        response = self.client.get('/api/products/search/?q=diya&fields=id,name')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'snippet'})
+
+    def test_unknown_fields_are_rejected(self):
+        response = self.client.get('/api/products/?fields=id,secret')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('secret', str(response.data['fields']))
+        response = self.client.get('/api/products/?expand=name')
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(PRODUCTS_SYNC_SETTLE_SECONDS=0)
+class ProductChangesTests(CatalogTestCase):
+    """Delta sync: /api/products/changes/ with tombstones for deletions"""
+
+    def sync(self, since=None, **params):
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/products/changes/', params)
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def test_initial_sync_pages_through_the_catalog(self):
+        products = [make_product(name=f'P{index}') for index in range(5)]
+        seen = []
+        data = self.sync(page_size=2)
+        seen += [item['id'] for item in data['changed']]
+        while data['has_more']:
+            data = self.sync(data['cursor'], page_size=2)
+            seen += [item['id'] for item in data['changed']]
+        self.assertEqual(sorted(seen), sorted(product.id for product in products))
+        self.assertEqual(self.sync(data['cursor'])['changed'], [])
+
+    def test_changes_since_cursor(self):
+        kept, edited, removed = (make_product(name=name) for name in ('Kept', 'Edited', 'Removed'))
+        cursor = self.sync()['cursor']
+
+        edited.name = 'Edited again'
+        edited.save()
+        removed_id = removed.id
+        removed.delete()
+        added = make_product(name='Added')
+
+        with self.assertNumQueries(2):
+            data = self.sync(cursor)
+        self.assertEqual([item['id'] for item in data['changed']], [edited.id, added.id])
+        self.assertEqual(data['changed'][0]['name'], 'Edited again')
+        self.assertEqual(data['deleted'], [removed_id])
+        self.assertFalse(data['has_more'])
+
+        data = self.sync(data['cursor'])
+        self.assertEqual((data['changed'], data['deleted']), ([], []))
+
+    def test_recreated_product_is_not_reported_deleted(self):
+        product = make_product()
+        product_id = product.id
+        cursor = self.sync()['cursor']
+        product.delete()
+        make_product(id=product_id, name='Back again')
+        data = self.sync(cursor)
+        self.assertEqual(data['deleted'], [])
+        self.assertEqual([item['name'] for item in data['changed']], ['Back again'])
+
+    def test_bad_and_expired_cursors(self):
+        self.assertEqual(self.client.get('/api/products/changes/?since=garbage').status_code, 404)
+        naive = {'products': None, 'deleted': ['2026-01-01T00:00:00', None]}
+        cursor = base64.urlsafe_b64encode(json.dumps(naive).encode()).decode().rstrip('=')
+        self.assertEqual(self.client.get('/api/products/changes/', {'since': cursor}).status_code, 404)
+        with override_settings(PRODUCTS_TOMBSTONE_RETENTION_DAYS=0):
+            cursor = self.sync()['cursor']
+            response = self.client.get('/api/products/changes/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+
+
+@override_settings(PRODUCTS_FACET_PRICE_BUCKETS=4)
+class ProductFacetTests(CatalogTestCase):
+    """Sidebar facets from grouped aggregates: /api/products/facets/"""
+
+    def setUp(self):
+        super().setUp()
+        make_product(category='Idols', price=Decimal('100.00'))
+        make_product(category='Idols', price=Decimal('300.00'), in_stock=False)
+        make_product(category='Photo Frames', price=Decimal('500.00'))
+
+    def facets(self, params=None):
+        response = self.client.get('/api/products/facets/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_counts_and_histogram(self):
+        with self.assertNumQueries(3):
+            data = self.facets()
+        self.assertEqual((data['total'], data['inStock']), (3, 2))
+        counts = {row['category']: (row['count'], row['inStock']) for row in data['categories']}
+        self.assertEqual(counts['Idols'], (2, 1))
+        self.assertEqual(counts['Photo Frames'], (1, 1))
+        self.assertEqual(counts['Corporate Gifts'], (0, 0))
+        self.assertEqual((data['price']['min'], data['price']['max']), ('100.00', '500.00'))
+        self.assertEqual(
+            [(bucket['min'], bucket['max'], bucket['count']) for bucket in data['price']['buckets']],
+            [('100.00', '200.00', 1), ('200.00', '300.00', 0), ('300.00', '400.00', 1), ('400.00', '500.00', 1)],
+        )
+
+    def test_facets_are_disjunctive(self):
+        data = self.facets({'category': 'Idols', 'max_price': '200'})
+        # The selection's totals apply every filter...
+        self.assertEqual((data['total'], data['inStock']), (1, 1))
+        # ...category counts ignore the category filter, the histogram the price range
+        counts = {row['category']: row['count'] for row in data['categories']}
+        self.assertEqual((counts['Idols'], counts['Photo Frames']), (1, 0))
+        self.assertEqual((data['price']['min'], data['price']['max']), ('100.00', '300.00'))
+        self.assertEqual(sum(bucket['count'] for bucket in data['price']['buckets']), 2)
+
+    def test_cached_per_filter_signature_until_catalog_changes(self):
+        self.facets({'category': 'Idols,Photo Frames', 'in_stock': 'true'})
+        with self.assertNumQueries(0):
+            data = self.facets({'in_stock': '1', 'category': ['Photo Frames', 'Idols'], 'sort': 'newest'})
+        self.assertEqual(data['total'], 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            make_product(category='Idols', price=Decimal('150.00'))
+        self.assertEqual(self.facets({'category': 'Idols,Photo Frames', 'in_stock': 'true'})['total'], 3)
+
+    def test_empty_catalog(self):
+        Product.objects.all().delete()
+        data = self.facets()
+        self.assertEqual(data['total'], 0)
+        self.assertEqual(data['price'], {'min': None, 'max': None, 'buckets': []})
+
+
+@override_settings(PRODUCTS_RELATED_COUNT=2)
+class RelatedProductsTests(CatalogTestCase):
+    """Precomputed related products and /api/products/{id}/related/"""
+
+    def related_ids(self, product):
+        response = self.client.get(f'/api/products/{product.id}/related/', {'fields': 'id,name'})
+        self.assertEqual(response.status_code, 200)
+        return [item['id'] for item in response.data]
+
+    def test_scores_category_material_price_and_co_reviews(self):
+        frame = make_product(category='Photo Frames', material='Oak', price=Decimal('100.00'))
+        twin = make_product(category='Photo Frames', material='Oak', price=Decimal('110.00'))
+        cousin = make_product(category='Photo Frames', material='Brass', price=Decimal('100.00'))
+        reviewed = make_product(category='Idols', material='Brass', price=Decimal('900.00'))
+        stranger = make_product(category='Idols', material='Stone', price=Decimal('900.00'))
+        for product in (cousin, reviewed):
+            Review.objects.create(product=product, user_name='Asha', rating=5, comment='')
+        self.assertEqual(related.rebuild(), 5)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.related_ids(frame), [twin.id, cousin.id])
+        # A shared reviewer and material lift a frame above the other frames
+        self.assertEqual(self.related_ids(reviewed), [stranger.id, cousin.id])
+        self.assertEqual(self.related_ids(stranger)[0], reviewed.id)
+
+    def test_incremental_rebuild_only_rewrites_affected_lists(self):
+        products = [make_product(name=f'P{index}', price=Decimal(100 + index * 100)) for index in range(5)]
+        related.rebuild()
+        self.assertEqual(related.rebuild(), 0)
+
+        # Priced next to P0 and P1, so it enters their lists and no one else's
+        added = make_product(name='New', price=Decimal('150.00'), material='Oak')
+        self.assertEqual(related.rebuild(), 3)
+        self.assertIn(added.id, self.related_ids(products[0]))
+        self.assertNotIn(added.id, self.related_ids(products[4]))
+
+        products[1].delete()
+        related.rebuild()
+        self.assertNotIn(products[1].id, self.related_ids(products[0]))
+        self.assertEqual(len(self.related_ids(products[0])), 2)
+        self.assertEqual(related.rebuild(), 0)
+
+    def assert_lists_match_full_scoring(self):
+        # What scoring every pair of products gives
+        catalog = related.Catalog(full=True)
+        features = catalog.features
+        for product_id, own in features.items():
+            expected = related.top(
+                [(other, related.score(own, features[other])) for other in features if other != product_id],
+                related.get_related_count(),
+            )
+            stored = related.load_lists()[product_id][1]
+            self.assertEqual([entry[0] for entry in stored], [entry[0] for entry in expected], product_id)
+
+    @override_settings(PRODUCTS_RELATED_COUNT=3)
+    def test_candidates_give_the_same_lists_as_scoring_every_pair(self):
+        categories, materials = ['Idols', 'Photo Frames', 'Home Interiors'], ['Oak', 'Brass', 'Stone', None]
+        products = [
+            make_product(
+                name=f'P{index}', category=categories[index % 3], material=materials[index % 4],
+                price=Decimal(100 + (index * 37) % 500),
+            )
+            for index in range(30)
+        ]
+        for index, product in enumerate(products[:12]):
+            Review.objects.create(product=product, user_name=f' Reviewer{index % 4} ', rating=4, comment='')
+        related.rebuild()
+        self.assert_lists_match_full_scoring()
+
+        products[5].price = Decimal('333.00')
+        products[5].save()
+        Review.objects.create(product=products[20], user_name='reviewer1', rating=5, comment='')
+        Product.objects.filter(pk=products[20].pk).update(updated_at=timezone.now())
+        make_product(name='New', category='Idols', material='Oak', price=Decimal('210.00'))
+        related.rebuild()
+        self.assert_lists_match_full_scoring()
+
+    def test_unknown_product_is_404(self):
+        make_product()
+        self.assertEqual(self.client.get('/api/products/999/related/').status_code, 404)
+        self.assertEqual(self.client.get('/api/products/abc/related/').status_code, 404)
+
+
+class AsyncCatalogViewTests(CatalogTestCase):
+    """Under ASGI the catalog reads are served by products.async_views"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product(name='Brass Diya', category='Home Interiors', price=Decimal('250.00'))
+        make_product(name='Ganesha', price=Decimal('900.00'))
+        for index in range(3):
+            Review.objects.create(product=self.product, user_name=f'R{index}', rating=4, comment='Nice')
+
+    async def test_async_views_answer_like_the_sync_ones(self):
+        for url in [
+            '/api/products/?sort=price_asc&page_size=1',
+            '/api/products/?category=Idols&fields=id,name,price',
+            f'/api/products/{self.product.id}/',
+            f'/api/products/{self.product.id}/?fields=id,name&expand=thumbnails,ratingDistribution',
+            '/api/products/facets/?category=Idols',
+            f'/api/products/{self.product.id}/reviews/?page_size=2',
+        ]:
+            cache.clear()
+            expected = await sync_to_async(self.client.get)(url)
+            # Drop the cached responses but keep the catalog version, which
+            # list ETags include
+            version = cache.get(CATALOG_VERSION_KEY)
+            cache.clear()
+            cache.set(CATALOG_VERSION_KEY, version, timeout=None)
+            response = await self.async_client.get(url)
+            self.assertEqual(response.status_code, 200, url)
+            self.assertTrue(response.resolver_match.url_name.endswith('-async'), url)
+            self.assertEqual(json.loads(response.content), json.loads(expected.content), url)
+            self.assertEqual(response.get('ETag'), expected.get('ETag'), url)
+
+    async def test_conditional_get_and_errors(self):
+        url = f'/api/products/{self.product.id}/'
+        etag = (await self.async_client.get(url))['ETag']
+        self.assertEqual((await self.async_client.get(url, headers={'if-none-match': etag})).status_code, 304)
+        self.assertEqual((await self.async_client.get('/api/products/999/')).status_code, 404)
+        self.assertEqual((await self.async_client.get('/api/products/999/reviews/')).status_code, 404)
+        response = await self.async_client.get('/api/products/?fields=bogus')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', json.loads(response.content))
+
+    @override_settings(CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'products': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+    }, PRODUCTS_CACHE_ALIAS='products')
+    async def test_out_of_process_cache_goes_through_the_async_api(self):
+        response = await self.async_client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['name'], 'Brass Diya')
+
+    async def test_other_routes_and_methods_fall_through(self):
+        response = await self.async_client.post('/api/products/', {}, content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get('/api/products/search/?q=diya')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.resolver_match.url_name, 'product-search')
+
+
+class ProductResponseCacheTests(CatalogTestCase):
+    """Versioned response cache on list/retrieve"""
+
+    def test_hot_reads_skip_database(self):
+        product = make_product(name='Cached')
+        self.client.get('/api/products/')
+        self.client.get(f'/api/products/{product.id}/')
+        with self.assertNumQueries(0):
+            list_response = self.client.get('/api/products/')
+            detail_response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(list_response.data['results'][0]['name'], 'Cached')
+        self.assertEqual(detail_response.data['name'], 'Cached')
+
+    def test_writes_invalidate(self):
+        product = make_product(name='Before')
+        self.client.get('/api/products/')
+        self.client.get(f'/api/products/{product.id}/')
+
+        product.name = 'After'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.client.get('/api/products/').data['results'][0]['name'], 'After')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.thumbnails.create(image_url='https://example.com/new.webp')
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response.data['thumbnails'], ['https://example.com/new.webp'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            product.delete()
+        self.assertEqual(self.client.get('/api/products/').data['results'], [])
+
+    def test_evicted_version_does_not_resurrect_old_entries(self):
+        product = make_product(name='A')
+        url = f'/api/products/{product.id}/'
+        self.client.get(url)
+        product.name = 'B'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.client.get(url).data['name'], 'B')
+
+        # The counter is evicted while responses cached under it live on
+        cache.delete(CATALOG_VERSION_KEY)
+        product.name = 'C'
+        with self.captureOnCommitCallbacks(execute=True):
+            product.save()
+        self.assertEqual(self.client.get(url).data['name'], 'C')
+
+
+class ProductConditionalGetTests(CatalogTestCase):
+    """ETag / Last-Modified handling on list/retrieve"""
+
+    def test_detail_etag(self):
+        product = make_product()
+        url = f'/api/products/{product.id}/'
+        response = self.client.get(url)
+        etag = response['ETag']
+        self.assertTrue(response.has_header('Last-Modified'))
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+
+        # A nested write versions the parent product
+        with self.captureOnCommitCallbacks(execute=True):
+            product.reviews.create(user_name='Reviewer', rating=3, comment='Okay')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_changes_on_delete(self):
+        make_product(name='Keep')
+        doomed = make_product(name='Delete me')
+        etag = self.client.get('/api/products/')['ETag']
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            doomed.delete()
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_list_etag_changes_on_new_image_variant(self):
+        # Variants are written without touching the product's updated_at
+        make_product(image='http://testserver/media/uploads/diya.jpg')
+        etag = self.client.get('/api/products/')['ETag']
+        self.assertEqual(self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            ImageVariant.objects.create(source='uploads/diya.jpg', width=480, height=480, name='variants/diya-480.webp')
+        response = self.client.get('/api/products/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.data['results'][0]['image'].endswith('/variants/diya-480.webp'))
+
+    def test_missing_product(self):
+        self.assertEqual(self.client.get('/api/products/999/').status_code, 404)
+
+
+class ReviewAggregateTests(CatalogTestCase):
+    """Denormalized review_count/rating_sum and the derived rating"""
+
+    def test_add_review_updates_aggregates(self):
+        product = make_product()
+        self.client.force_authenticate(User.objects.create_user(
+            username='reviewer', email='reviewer@example.com', password='password123'))
+        for rating in (5, 4, 2):
+            response = self.client.post(
+                f'/api/products/{product.id}/add_review/',
+                {'userName': 'Reviewer', 'rating': rating, 'comment': 'Review'},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 201)
+        product.refresh_from_db()
+        self.assertEqual((product.review_count, product.rating_sum), (3, 11))
+        self.assertEqual(product.rating, Decimal('3.67'))
+
+    def test_out_of_range_rating_is_refused(self):
+        product = make_product()
+        self.client.force_authenticate(User.objects.create_user(
+            username='reviewer', email='reviewer@example.com', password='password123'))
+        for rating in (100, -5, 0, 6):
+            response = self.client.post(
+                f'/api/products/{product.id}/add_review/',
+                {'userName': 'Reviewer', 'rating': rating, 'comment': 'Review'},
+                format='json',
+            )
+            self.assertEqual(response.status_code, 400, rating)
+            self.assertIn('rating', response.data)
+        product.refresh_from_db()
+        self.assertEqual((product.review_count, product.rating_sum), (0, 0))
+        self.assertFalse(product.reviews.exists())
+        self.assertEqual(self.client.get(f'/api/products/{product.id}/').status_code, 200)
+
+    def test_rebuild_repairs_drift(self):
+        product = make_product()
+        product.reviews.create(user_name='Reviewer', rating=3, comment='Okay')
+        product.reviews.create(user_name='Reviewer', rating=4, comment='Good')
+        Product.objects.filter(pk=product.pk).update(review_count=9, rating_sum=1, rating=1)
+        unreviewed = make_product(rating=Decimal('2.00'))
+
+        call_command('rebuild_rating_aggregates', stdout=StringIO())
+        product.refresh_from_db()
+        unreviewed.refresh_from_db()
+        self.assertEqual((product.review_count, product.rating_sum, product.rating), (2, 7, Decimal('3.50')))
+        self.assertEqual(unreviewed.rating, Decimal('5.00'))
+
+
+class ProductReviewsEndpointTests(CatalogTestCase):
+    """Paginated /api/products/{id}/reviews/ and the detail review preview"""
+
+    def setUp(self):
+        super().setUp()
+        self.product = make_product()
+        for index in range(12):
+            self.product.reviews.create(user_name=f'Reviewer {index}', rating=index % 5 + 1, comment='Review')
+
+    def test_reviews_pages(self):
+        response = self.client.get(f'/api/products/{self.product.id}/reviews/', {'page_size': 5})
+        ids = [review['id'] for review in response.data['results']]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            ids.extend(review['id'] for review in response.data['results'])
+        self.assertEqual(ids, list(self.product.reviews.order_by('-date', '-id').values_list('id', flat=True)))
+
+    def test_detail_embeds_preview(self):
+        response = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(len(response.data['reviews']), 3)
+        self.assertEqual(response.data['ratingDistribution'], {'5': 2, '4': 2, '3': 2, '2': 3, '1': 3})
+
+    def test_missing_product(self):
+        self.assertEqual(self.client.get('/api/products/999/reviews/').status_code, 404)
+
+
+class ProductSearchTests(CatalogTestCase):
+    """Full-text search on /api/products/search/"""
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ganesha = make_product(name='Brass Ganesha Idol', description='Handcrafted brass idol')
+            self.frame = make_product(name='Family Frame', category='Photo Frames', description='Teak frame')
+            self.frame.sub_descriptions.create(title='Care', body='Polish the ganeshas gently', order=0)
+
+    def test_ranked_prefix_search(self):
+        response = self.client.get('/api/products/search/', {'q': 'ganes'})
+        ids = [item['id'] for item in response.data['results']]
+        # Name matches outrank sub-description matches
+        self.assertEqual(ids, [self.ganesha.id, self.frame.id])
+        self.assertIn('<mark>', response.data['results'][0]['snippet'])
+
+    def test_all_words_must_match(self):
+        response = self.client.get('/api/products/search/', {'q': 'teak frame'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.frame.id])
+        response = self.client.get('/api/products/search/', {'q': 'teak brass'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_index_follows_writes(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.frame.sub_descriptions.all().delete()
+            self.ganesha.name = 'Lakshmi Idol'
+            self.ganesha.save()
+        self.assertEqual(self.client.get('/api/products/search/', {'q': 'ganesha'}).data['results'], [])
+        response = self.client.get('/api/products/search/', {'q': 'lakshmi'})
+        self.assertEqual([item['id'] for item in response.data['results']], [self.ganesha.id])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.ganesha.delete()
+        self.assertEqual(self.client.get('/api/products/search/', {'q': 'lakshmi'}).data['results'], [])
+
+    def test_operators_are_inert(self):
+        response = self.client.get('/api/products/search/', {'q': '"brass" OR NEAR('})
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductNestedWriteTests(CatalogTestCase):
+    """Diff-based nested writes in ProductSerializer.update"""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(User.objects.create_user(
+            username='admin', email='admin@example.com', password='password123'))
+        response = self.client.post('/api/products/', {
+            'name': 'Frame', 'category': 'Photo Frames', 'price': '10.00',
+            'image': 'https://example.com/frame.webp',
+            'sub_descriptions': [{'title': 'Size', 'body': 'A4'}, {'title': 'Care', 'body': 'Dust'}],
+            'thumbnails': ['https://example.com/1.webp', 'https://example.com/2.webp'],
+            'reviews': [
+                {'userName': 'Asha', 'rating': 5, 'comment': 'Lovely'},
+                {'userName': 'Ravi', 'rating': 3, 'comment': 'Fine'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.product = Product.objects.get(pk=response.data['id'])
+
+    def test_out_of_range_review_rating_is_refused(self):
+        response = self.client.patch(f'/api/products/{self.product.id}/', {
+            'reviews': [{'userName': 'Asha', 'rating': 100, 'comment': 'Lovely'}],
+        }, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('rating', response.data['reviews'][0])
+        self.assertEqual(sorted(self.product.reviews.values_list('rating', flat=True)), [3, 5])
+
+    def test_unchanged_rows_are_kept(self):
+        rows_before = {
+            'sub_descriptions': list(self.product.sub_descriptions.values_list('id', flat=True)),
+            'thumbnails': list(self.product.thumbnails.values_list('id', flat=True)),
+            'reviews': dict(self.product.reviews.values_list('id', 'date')),
+        }
+        response = self.client.patch(f'/api/products/{self.product.id}/', {
+            'sub_descriptions': [{'title': 'Size', 'body': 'A3'}, {'title': 'Care', 'body': 'Dust'}],
+            'thumbnails': ['https://example.com/1.webp', 'https://example.com/2.webp'],
+            'reviews': [
+                {'userName': 'Asha', 'rating': 5, 'comment': 'Lovely'},
+                {'userName': 'Ravi', 'rating': 3, 'comment': 'Fine'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sub_descriptions'][0]['body'], 'A3')
+        self.assertEqual(list(self.product.sub_descriptions.values_list('id', flat=True)),
+                         rows_before['sub_descriptions'])
+        self.assertEqual(list(self.product.thumbnails.values_list('id', flat=True)), rows_before['thumbnails'])
+        self.assertEqual(dict(self.product.reviews.values_list('id', 'date')), rows_before['reviews'])
+
+    def test_changes_are_applied(self):
+        kept = self.product.reviews.get(user_name='Asha')
+        response = self.client.patch(f'/api/products/{self.product.id}/', {
+            'sub_descriptions': [{'title': 'Size', 'body': 'A4'}],
+            'thumbnails': ['https://example.com/3.webp'],
+            'reviews': [
+                {'id': kept.id, 'userName': 'Asha', 'rating': 4, 'comment': 'Lovely'},
+                {'userName': 'Meera', 'rating': 2, 'comment': 'Small'},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['sub_descriptions'], [{'title': 'Size', 'body': 'A4'}])
+        self.assertEqual(response.data['thumbnails'], ['https://example.com/3.webp'])
+        self.assertEqual(sorted(self.product.reviews.values_list('user_name', 'rating')),
+                         [('Asha', 4), ('Meera', 2)])
+        self.assertEqual(self.product.reviews.get(user_name='Asha').date, kept.date)
+        self.assertEqual(response.data['rating'], '3.00')
+
+
+class CatalogExportImportTests(CatalogTestCase):
+    """export_catalog / import_catalog NDJSON round trip"""
+
+    def setUp(self):
+        super().setUp()
+        fd, self.path = tempfile.mkstemp(suffix='.ndjson')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+
+    def test_round_trip(self):
+        product = make_product(name='Ganesha', description='Brass')
+        product.sub_descriptions.create(title='Size', body='6 inch', order=0)
+        product.thumbnails.create(image_url='https://example.com/1.webp', order=0)
+        review = product.reviews.create(user_name='Asha', rating=4, comment='Lovely')
+        Product.objects.filter(pk=product.pk).rebuild_rating_aggregates()
+        expected = ProductSerializer(Product.objects.get(pk=product.pk)).data
+
+        call_command('export_catalog', self.path, chunk_size=10, stdout=StringIO())
+        with open(self.path, encoding='utf-8') as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual(len(records), 1)
+
+        Product.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_catalog', self.path, batch_size=10, stdout=StringIO())
+        imported = Product.objects.get(pk=product.pk)
+        data = ProductSerializer(imported).data
+        for key in ('name', 'price', 'description', 'sub_descriptions', 'thumbnails', 'rating', 'created_at'):
+            self.assertEqual(data[key], expected[key])
+        self.assertEqual(imported.reviews.get().date, review.date)
+        self.assertEqual(imported.review_count, 1)
+
+        # Importing again updates in place
+        call_command('import_catalog', self.path, stdout=StringIO())
+        self.assertEqual(Product.objects.count(), 1)
+        self.assertEqual(imported.reviews.count(), 1)
+
+    def test_bad_price_stops_the_import(self):
+        product = make_product(name='Ganesha')
+        product.reviews.create(user_name='Asha', rating=4, comment='Lovely')
+        for price in ('abc', 'NaN', None):
+            with open(self.path, 'w', encoding='utf-8') as f:
+                f.write(json.dumps({'id': product.pk, 'name': 'Renamed', 'price': price}) + '\n')
+            with self.assertRaisesMessage(CommandError, 'invalid price'):
+                call_command('import_catalog', self.path, stdout=StringIO())
+        # The batch was rolled back
+        product.refresh_from_db()
+        self.assertEqual(product.name, 'Ganesha')
+        self.assertEqual(product.reviews.count(), 1)
+
+
+@unittest.skipUnless(images.is_enabled(), 'Pillow is not installed')
+class ImageVariantTests(CatalogTestCase):
+    """Resized variants produced for uploads and used by list endpoints"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, width, height):
+        from PIL import Image
+        buffer = BytesIO()
+        Image.new('RGB', (width, height), 'orange').save(buffer, 'PNG')
+        image = SimpleUploadedFile('photo.png', buffer.getvalue(), content_type='image/png')
+        return self.client.post('/api/upload-image/', {'image': image}, format='multipart')
+
+    def test_upload_produces_variants(self):
+        response = self.upload(1000, 500)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(sorted(response.data['variants']), ['320', '640'])
+        variant = ImageVariant.objects.get(width=320)
+        self.assertEqual((variant.width, variant.height), (320, 160))
+        self.assertTrue(variant.name.endswith('_w320.webp'))
+
+        make_product(image=response.data['url'])
+        item = self.client.get('/api/products/').data['results'][0]
+        self.assertEqual(item['image'], response.data['variants']['320'])
+        self.assertEqual(item['imageOriginal'], response.data['url'])
+
+    def test_small_upload_has_no_variants(self):
+        response = self.upload(200, 200)
+        self.assertEqual(response.data['variants'], {})
+
+
+class MediaStorageTests(CatalogTestCase):
+    """Content-addressed uploads, reference counts and garbage collection"""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings_override = override_settings(MEDIA_ROOT=self.media_root, PRODUCT_IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, content, name='photo.png'):
+        # Only the PNG signature matters to the upload checks
+        image = SimpleUploadedFile(name, PNG_SIGNATURE + content, content_type='image/png')
+        return self.client.post('/api/upload-image/', {'image': image}, format='multipart')
+
+    def test_identical_uploads_share_one_file(self):
+        first = self.upload(b'same bytes')
+        second = self.upload(b'same bytes', name='copy.PNG')
+        other = self.upload(b'other bytes')
+        self.assertEqual(first.data['url'], second.data['url'])
+        self.assertNotEqual(first.data['url'], other.data['url'])
+
+        name = images.source_from_url(first.data['url'])
+        self.assertTrue(media.is_content_addressed(name))
+        self.assertEqual(StoredImage.objects.count(), 2)
+        _, files = default_storage.listdir(os.path.dirname(name))
+        self.assertEqual(files, [os.path.basename(name)])
+
+    def test_references_follow_products_and_thumbnails(self):
+        url = self.upload(b'shared photo').data['url']
+        stored = StoredImage.objects.get()
+
+        product = make_product(image=url)
+        ProductThumbnail.objects.create(product=product, image_url=url)
+        other = make_product(image=url)
+        stored.refresh_from_db()
+        self.assertEqual(stored.ref_count, 3)
+
+        other.image = 'https://example.com/elsewhere.webp'
+        other.save()
+        product.delete()
+        stored.refresh_from_db()
+        self.assertEqual(stored.ref_count, 0)
+
+    def test_gc_removes_only_orphans(self):
+        kept = self.upload(b'kept').data['url']
+        orphan = images.source_from_url(self.upload(b'orphan').data['url'])
+        make_product(image=kept)
+
+        call_command('gc_media', grace=0, stdout=StringIO())
+
+        self.assertFalse(default_storage.exists(orphan))
+        self.assertTrue(default_storage.exists(images.source_from_url(kept)))
+        self.assertEqual(list(StoredImage.objects.values_list('ref_count', flat=True)), [1])
+
+    def test_hashed_files_are_served_immutable(self):
+        name = images.source_from_url(self.upload(b'cached forever').data['url'])
+        request = RequestFactory().get('/media/' + name)
+        response = media.serve_media(request, name, document_root=self.media_root)
+        self.assertEqual(response['Cache-Control'], media.IMMUTABLE_CACHE_CONTROL)
+
+
+@override_settings(PRODUCT_IMAGE_UPLOAD_CHUNK_SIZE=7, PRODUCT_IMAGE_MAX_UPLOAD_SIZE=1000)
+class StreamingUploadTests(CatalogTestCase):
+    """Raw, data URL and multipart uploads are spooled in chunks with limits"""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, PRODUCT_IMAGE_VARIANTS_ASYNC=False)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.image = PNG_SIGNATURE + bytes(range(256))
+
+    def stored_bytes(self, response):
+        self.assertEqual(response.status_code, 201, response.data)
+        with default_storage.open(images.source_from_url(response.data['url'])) as f:
+            return f.read()
+
+    def post_json(self, body):
+        return self.client.post('/api/upload-image/', body, content_type='application/json')
+
+    def test_data_url_is_decoded_incrementally(self):
+        encoded = base64.b64encode(self.image).decode()
+        response = self.post_json(json.dumps({'name': 'x', 'image': f'data:image/png;base64,{encoded}'}))
+        self.assertEqual(self.stored_bytes(response), self.image)
+
+    def test_data_url_with_escaped_slashes(self):
+        encoded = base64.b64encode(self.image).decode().replace('/', '\\/')
+        self.assertIn('\\/', encoded)
+        response = self.post_json('{"image": "data:image/png;base64,%s"}' % encoded)
+        self.assertEqual(self.stored_bytes(response), self.image)
+
+    def test_raw_body_put(self):
+        response = self.client.put('/api/upload-image/', self.image, content_type='image/png')
+        self.assertEqual(self.stored_bytes(response), self.image)
+        self.assertTrue(response.data['url'].endswith('.png'))
+
+    def test_oversized_upload_is_refused(self):
+        big = PNG_SIGNATURE + b'\0' * 2000
+        self.assertEqual(self.client.put('/api/upload-image/', big, content_type='image/png').status_code, 413)
+        encoded = base64.b64encode(big).decode()
+        response = self.post_json(json.dumps({'image': f'data:image/png;base64,{encoded}'}))
+        self.assertEqual(response.status_code, 413)
+        image = SimpleUploadedFile('big.png', big, content_type='image/png')
+        response = self.client.post('/api/upload-image/', {'image': image}, format='multipart')
+        self.assertEqual(response.status_code, 413)
+
+    def test_wrong_type_is_refused(self):
+        response = self.client.put('/api/upload-image/', b'<svg></svg>', content_type='image/svg+xml')
+        self.assertEqual(response.status_code, 415)
+        response = self.client.put('/api/upload-image/', b'not really a png', content_type='image/png')
+        self.assertEqual(response.status_code, 415)
+        response = self.post_json(json.dumps({'image': 'data:image/png;base64,!!!!'}))
+        self.assertEqual(response.status_code, 400)
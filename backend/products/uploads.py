@@ -0,0 +1,294 @@
+"""
+Streaming receipt of image uploads for upload_image.
+
+Every upload path spools the image to a temporary file in fixed-size chunks,
+so memory per request stays flat whatever the image size:
+
+- multipart/form-data: Django's parser with a size-limited, disk-only
+  upload handler
+- raw body (POST/PUT with Content-Type: image/<type>): copied chunk by chunk
+- JSON {"image": "data:image/<type>;base64,..."}: the body is scanned as a
+  stream and the base64 payload decoded incrementally, without ever
+  building the data URL string or the decoded bytes in memory
+
+Size and type limits are checked as early as possible: the Content-Length
+header before anything is read, the declared type before the payload, the
+magic bytes on the first chunk, and the running size on every chunk.
+"""
+import base64
+import binascii
+import re
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from rest_framework import status
+
+# Magic bytes of the accepted formats
+SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+SNIFF_LENGTH = 12
+
+DATA_URL_RE = re.compile(rb'"image"\s*:\s*"data:image/([A-Za-z0-9.+-]+);base64,')
+MAX_JSON_PREFIX = 4096  # bytes allowed before the data URL starts
+
+# Base64 grows data by 4/3; allow some slack for JSON/data URL framing
+BASE64_OVERHEAD = 4 / 3
+FRAMING_ALLOWANCE = 4096
+
+
+class UploadRejected(Exception):
+    """An upload refused before or while it was read"""
+
+    def __init__(self, message, status_code=status.HTTP_400_BAD_REQUEST):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def get_max_size():
+    return getattr(settings, 'PRODUCT_IMAGE_MAX_UPLOAD_SIZE', 10 * 1024 * 1024)
+
+
+def get_allowed_types():
+    return tuple(getattr(settings, 'PRODUCT_IMAGE_ALLOWED_TYPES', ('jpeg', 'png', 'webp', 'gif')))
+
+
+def get_chunk_size():
+    return getattr(settings, 'PRODUCT_IMAGE_UPLOAD_CHUNK_SIZE', 64 * 1024)
+
+
+def normalize_type(image_type):
+    image_type = (image_type or '').lower()
+    return {'jpg': 'jpeg', 'pjpeg': 'jpeg', 'x-png': 'png'}.get(image_type, image_type)
+
+
+def sniff_type(head):
+    """Image type from the first bytes of the file, or None"""
+    for signature, image_type in SIGNATURES:
+        if head.startswith(signature):
+            return image_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+
+def too_large():
+    return UploadRejected(
+        f'Image is larger than {get_max_size()} bytes.', status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+    )
+
+
+def check_declared_type(image_type):
+    if normalize_type(image_type) not in get_allowed_types():
+        raise UploadRejected(
+            f'Unsupported image type "{image_type}". Allowed: {", ".join(get_allowed_types())}.',
+            status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+        )
+
+
+def check_content_length(request, overhead=1.0):
+    """Refuse a request whose declared body is too large before reading it"""
+    try:
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return
+    if length > get_max_size() * overhead + FRAMING_ALLOWANCE:
+        raise too_large()
+
+
+class SpooledImage:
+    """
+    Writes chunks to a TemporaryUploadedFile, enforcing the size limit and
+    checking the magic bytes as soon as enough data has arrived.
+    """
+
+    def __init__(self):
+        self.image_type = None
+        self.size = 0
+        self.head = b''
+        self.file = TemporaryUploadedFile('upload', 'application/octet-stream', 0, None)
+
+    def write(self, chunk):
+        if not chunk:
+            return
+        self.size += len(chunk)
+        if self.size > get_max_size():
+            raise too_large()
+        if self.image_type is None and len(self.head) < SNIFF_LENGTH:
+            self.head += chunk[:SNIFF_LENGTH - len(self.head)]
+            if len(self.head) >= SNIFF_LENGTH:
+                self.detect_type()
+        self.file.write(chunk)
+
+    def detect_type(self):
+        self.image_type = sniff_type(self.head)
+        if self.image_type is None or self.image_type not in get_allowed_types():
+            raise UploadRejected(
+                'File content is not a supported image.', status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+
+    def finish(self):
+        """Return (file, extension) ready to be stored"""
+        if not self.size:
+            raise UploadRejected('Uploaded image is empty.')
+        if self.image_type is None:
+            self.detect_type()
+        self.file.size = self.size
+        self.file.content_type = f'image/{self.image_type}'
+        self.file.flush()
+        self.file.seek(0)
+        return self.file, self.image_type
+
+    def close(self):
+        self.file.close()
+
+
+class Base64Decoder:
+    """Incremental base64 decoding of a JSON string's contents"""
+
+    def __init__(self):
+        self.pending = b''
+
+    def feed(self, data):
+        data = self.pending + data
+        # JSON may escape "/" as "\/"; keep a backslash split from its "/"
+        # by a chunk boundary for the next chunk
+        carry = b''
+        if data.endswith(b'\\'):
+            data, carry = data[:-1], b'\\'
+        data = re.sub(rb'\s+', b'', data.replace(b'\\/', b'/'))
+        usable = len(data) - len(data) % 4
+        self.pending = data[usable:] + carry
+        return self.decode(data[:usable])
+
+    def finish(self):
+        data, self.pending = self.pending, b''
+        if data.endswith(b'\\'):
+            raise UploadRejected('Invalid base64 image data.')
+        return self.decode(data + b'=' * (-len(data) % 4))
+
+    def decode(self, data):
+        try:
+            return base64.b64decode(data, validate=True)
+        except binascii.Error:
+            raise UploadRejected('Invalid base64 image data.')
+
+
+def iter_body(request):
+    stream = request.stream
+    if stream is None:
+        return
+    chunk_size = get_chunk_size()
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def receive_raw(request, content_type):
+    """The request body is the image itself"""
+    check_declared_type(content_type.split('/', 1)[1])
+    check_content_length(request)
+    spool = SpooledImage()
+    try:
+        for chunk in iter_body(request):
+            spool.write(chunk)
+        return spool.finish()
+    except Exception:
+        spool.close()
+        raise
+
+
+def receive_data_url(request):
+    """
+    Stream a JSON body holding {"image": "data:image/...;base64,..."}:
+    find the data URL, then decode its payload chunk by chunk until the
+    closing quote. Other keys in the object are ignored.
+    """
+    check_content_length(request, overhead=BASE64_OVERHEAD)
+    chunks = iter_body(request)
+    buffer = b''
+    match = None
+    for chunk in chunks:
+        buffer += chunk
+        match = DATA_URL_RE.search(buffer)
+        if match or len(buffer) > MAX_JSON_PREFIX:
+            break
+    if match is None:
+        if b'"image"' in buffer[:MAX_JSON_PREFIX]:
+            raise UploadRejected('Invalid image data. Expected base64 data URL or file upload.')
+        raise UploadRejected('No image provided. Send "image" field with file or base64 data.')
+
+    check_declared_type(match.group(1).decode())
+    spool = SpooledImage()
+    decoder = Base64Decoder()
+    try:
+        remainder = buffer[match.end():]
+        del buffer
+        while True:
+            end = remainder.find(b'"')
+            if end != -1:
+                spool.write(decoder.feed(remainder[:end]))
+                spool.write(decoder.finish())
+                break
+            spool.write(decoder.feed(remainder))
+            remainder = next(chunks, None)
+            if remainder is None:
+                raise UploadRejected('Invalid image data: unterminated data URL.')
+        return spool.finish()
+    except Exception:
+        spool.close()
+        raise
+
+
+class LimitedImageUploadHandler(TemporaryFileUploadHandler):
+    """
+    Disk-only multipart handler that refuses non-image parts and stops
+    reading as soon as the file grows past the size limit.
+    """
+
+    def new_file(self, field_name, file_name, content_type, *args, **kwargs):
+        if field_name == 'image' and content_type not in (None, '', 'application/octet-stream'):
+            check_declared_type(content_type.split('/', 1)[-1])
+        self.received = 0
+        super().new_file(field_name, file_name, content_type, *args, **kwargs)
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > get_max_size():
+            raise too_large()
+        return super().receive_data_chunk(raw_data, start)
+
+
+def receive_multipart(request):
+    check_content_length(request)
+    request.upload_handlers = [LimitedImageUploadHandler(request)]
+    uploaded_file = request.FILES.get('image')
+    if uploaded_file is None:
+        raise UploadRejected('No image provided. Send "image" field with file or base64 data.')
+    image_type = sniff_type(uploaded_file.read(SNIFF_LENGTH))
+    uploaded_file.seek(0)
+    if image_type is None or image_type not in get_allowed_types():
+        uploaded_file.close()
+        raise UploadRejected('File content is not a supported image.', status.HTTP_415_UNSUPPORTED_MEDIA_TYPE)
+    return uploaded_file, image_type
+
+
+def receive_image(request):
+    """
+    Spool the image of an upload request to a temporary file.
+    Returns (file, image type); the caller closes the file (which deletes
+    it). Raises UploadRejected with an HTTP status for bad uploads.
+    """
+    content_type = (request.content_type or '').split(';', 1)[0].strip().lower()
+    if content_type.startswith('image/'):
+        return receive_raw(request, content_type)
+    if content_type == 'application/json':
+        return receive_data_url(request)
+    if content_type == 'multipart/form-data':
+        return receive_multipart(request)
+    raise UploadRejected('No image provided. Send "image" field with file or base64 data.')
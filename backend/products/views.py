@@ -1,55 +1,139 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.response import Response
+from rest_framework.generics import get_object_or_404
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.permissions import AllowAny, IsAuthenticated
-from django.core.files.storage import default_storage
-from django.core.files.base import ContentFile
 from django.conf import settings
-import base64
-import uuid
+from django.db import transaction
 from .models import Product, Review
 from .serializers import ProductSerializer, ProductListSerializer, ReviewSerializer
+from .filters import ProductFilterBackend
+from .cache import get_or_build
+from .conditional import detail_validators, list_validators, not_modified_response, set_validator_headers
+from .pagination import KeysetPagination, ReviewPagination
+from .search import search_products
+from . import facets, fieldsets, images, media, related, sync, uploads
 
 
 class ProductViewSet(viewsets.ModelViewSet):
     """
     ViewSet for Product CRUD operations
-    - GET /api/products/ - List all products (public)
+    - GET /api/products/ - List products (public)
+      Query params: category, min_price, max_price, in_stock, sort, page_size, cursor,
+      fields, expand
     - GET /api/products/{id}/ - Get product details (public)
+      Query params: fields, expand
     - POST /api/products/ - Create product (requires authentication)
     - PUT /api/products/{id}/ - Update product (requires authentication)
     - DELETE /api/products/{id}/ - Delete product (requires authentication)
+    - GET /api/products/{id}/reviews/ - List a product's reviews, newest first (public)
+      Query params: page_size, cursor
+    - GET /api/products/search/?q= - Full-text search, best match first (public)
+      Query params: q, page_size, offset, fields, expand
+    - GET /api/products/changes/?since= - Products changed/deleted since a sync cursor (public)
+      Query params: since, page_size, fields, expand
+    - GET /api/products/facets/ - Category counts and price histogram for the sidebar (public)
+      Query params: category, min_price, max_price, in_stock
+    - GET /api/products/{id}/related/ - Precomputed related products, best first (public)
+      Query params: fields, expand
+    
+    fields= / expand= pick the output fields and nested relations of the
+    read endpoints; see products.fieldsets.
     """
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
+    filter_backends = [ProductFilterBackend]
+    pagination_class = KeysetPagination
     
     def get_permissions(self):
         """
         Allow anyone to read products, but require authentication for write operations
         """
-        if self.action in ['list', 'retrieve']:
+        if self.action in ['list', 'retrieve', 'reviews', 'search', 'changes', 'facets', 'related']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
     
+    def get_queryset(self):
+        """
+        Prefetch nested relations for the write actions that render
+        ProductSerializer (reads are shaped by their fieldset instead)
+        """
+        queryset = super().get_queryset()
+        if self.action in ['update', 'partial_update']:
+            queryset = queryset.with_detail_relations()
+        return queryset
+    
     def get_serializer_class(self):
         """Use different serializer for list vs detail"""
         if self.action == 'list':
             return ProductListSerializer
         return ProductSerializer
     
+    def get_fieldset(self, serializer_class=None):
+        """Output fields requested with ?fields= / ?expand= (400 for unknown names)"""
+        return fieldsets.get_fieldset(
+            self.request.query_params, serializer_class or self.get_serializer_class()
+        )
+    
+    def get_list_context(self, products, fieldset):
+        """
+        Serializer context for ProductListSerializer: the fieldset, plus small
+        image variants in one query when the image is rendered
+        """
+        context = self.get_serializer_context()
+        context['fieldset'] = fieldset
+        if 'image' in fieldset:
+            context['image_variants'] = images.variant_urls(
+                [product.image for product in products], images.get_list_width()
+            )
+        return context
+    
     def list(self, request, *args, **kwargs):
-        """List all products"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        """List products, filtered and sorted, one keyset page at a time"""
+        fieldset = self.get_fieldset()
+        queryset = self.filter_queryset(self.get_queryset())
+        
+        # Answer conditional GETs before doing any serialization
+        validators = get_or_build('list-validators', request, lambda: list_validators(queryset, request))
+        not_modified = not_modified_response(request, validators)
+        if not_modified is not None:
+            return not_modified
+        
+        def build():
+            # Select only the columns and relations the fieldset renders; the
+            # paginator also reads the ordering columns of the last row
+            ordering = [field.lstrip('-') for field in queryset.query.order_by]
+            page = self.paginate_queryset(fieldsets.shape_queryset(queryset, fieldset, keep=ordering))
+            serializer = self.get_serializer(page, many=True, context=self.get_list_context(page, fieldset))
+            return self.get_paginated_response(serializer.data).data
+        return set_validator_headers(Response(get_or_build('list', request, build)), validators)
     
     def retrieve(self, request, *args, **kwargs):
         """Get single product details"""
-        instance = self.get_object()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        fieldset = self.get_fieldset()
+        validators = get_or_build(
+            'detail-validators', request,
+            lambda: detail_validators(self.get_queryset(), pk, fieldsets.fieldset_key(fieldset)),
+        )
+        if validators is not None:
+            not_modified = not_modified_response(request, validators)
+            if not_modified is not None:
+                return not_modified
+        
+        def build():
+            queryset = fieldsets.shape_queryset(Product.objects.all(), fieldset)
+            instance = get_object_or_404(queryset, pk=pk)
+            self.check_object_permissions(request, instance)
+            serializer = self.get_serializer(instance, context={**self.get_serializer_context(), 'fieldset': fieldset})
+            return serializer.data
+        response = Response(get_or_build('detail', request, build))
+        if validators is not None:
+            set_validator_headers(response, validators)
+        return response
     
     def create(self, request, *args, **kwargs):
         """Create a new product"""
@@ -74,6 +158,98 @@ class ProductViewSet(viewsets.ModelViewSet):
         self.perform_destroy(instance)
         return Response(status=status.HTTP_204_NO_CONTENT)
     
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def search(self, request):
+        """
+        Ranked full-text search over name, descriptions and sub-descriptions.
+        Words are prefix-matched and results carry a highlighted snippet.
+        """
+        query = request.query_params.get('q', '').strip()
+        paginator = KeysetPagination()
+        page_size = paginator.get_page_size(request)
+        try:
+            offset = max(int(request.query_params.get('offset', 0)), 0)
+        except ValueError:
+            offset = 0
+        
+        fieldset = self.get_fieldset(ProductListSerializer)
+        
+        def build():
+            queryset = fieldsets.shape_queryset(Product.objects.all(), fieldset)
+            hits = search_products(query, page_size + 1, offset, queryset=queryset) if query else []
+            has_next = len(hits) > page_size
+            hits = hits[:page_size]
+            products = [product for product, _ in hits]
+            context = self.get_list_context(products, fieldset)
+            data = ProductListSerializer(products, many=True, context=context).data
+            results = [{**item, 'snippet': snippet} for item, (_, snippet) in zip(data, hits)]
+            next_url = None
+            if has_next:
+                next_url = replace_query_param(request.build_absolute_uri(), 'offset', offset + page_size)
+            return {'next': next_url, 'results': results}
+        return Response(get_or_build('search', request, build))
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def changes(self, request):
+        """
+        Delta sync: products created or updated and ids deleted since the
+        ?since= cursor (the whole catalog without one), plus the cursor for
+        the next call. Keep calling while has_more is true.
+        Not response-cached: the result depends on the clock (see products.sync).
+        """
+        fieldset = self.get_fieldset(ProductListSerializer)
+        queryset = fieldsets.shape_queryset(Product.objects.all(), fieldset, keep=['updated_at'])
+        changed, deleted, cursor, has_more = sync.get_changes(
+            queryset, request.query_params.get('since'), sync.get_page_size(request.query_params),
+        )
+        context = self.get_list_context(changed, fieldset)
+        return Response({
+            'changed': ProductListSerializer(changed, many=True, context=context).data,
+            'deleted': deleted,
+            'cursor': cursor,
+            'has_more': has_more,
+        })
+    
+    @action(detail=False, methods=['get'], permission_classes=[AllowAny])
+    def facets(self, request):
+        """
+        Per-category product and in-stock counts and a price histogram for
+        the current filters, from grouped aggregates (see products.facets)
+        """
+        return Response(facets.get_facets(Product.objects.all(), request.query_params))
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def reviews(self, request, pk=None):
+        """List a product's reviews, one keyset page at a time"""
+        def build():
+            product = get_object_or_404(Product.objects.only('id'), pk=pk)
+            queryset = Review.objects.filter(product=product).order_by('-date', '-id')
+            paginator = ReviewPagination()
+            page = paginator.paginate_queryset(queryset, request, view=self)
+            return paginator.get_paginated_response(ReviewSerializer(page, many=True).data).data
+        return Response(get_or_build('reviews', request, build))
+    
+    @action(detail=True, methods=['get'], permission_classes=[AllowAny])
+    def related(self, request, pk=None):
+        """
+        The product's related products as precomputed by
+        rebuild_related_products (see products.related)
+        """
+        fieldset = self.get_fieldset(ProductListSerializer)
+        
+        def build():
+            queryset = fieldsets.shape_queryset(Product.objects.all(), fieldset)
+            try:
+                products = list(related.related_products(queryset, pk))
+            except (TypeError, ValueError):
+                products = []
+            if not products:
+                # Only an empty list needs telling apart from a missing product
+                get_object_or_404(Product.objects.only('id'), pk=pk)
+            context = self.get_list_context(products, fieldset)
+            return ProductListSerializer(products, many=True, context=context).data
+        return Response(get_or_build('related', request, build))
+    
     @action(detail=True, methods=['post'], permission_classes=[AllowAny])
     def add_review(self, request, pk=None):
         """Add a review to a product"""
@@ -87,23 +263,22 @@ class ProductViewSet(viewsets.ModelViewSet):
         }
         serializer = ReviewSerializer(data=review_data)
         if serializer.is_valid():
-            review = Review.objects.create(
-                product=product,
-                user_name=user_name,
-                rating=review_data['rating'],
-                comment=review_data['comment']
-            )
-            # Recalculate product rating
-            reviews = product.reviews.all()
-            if reviews:
-                avg_rating = sum(r.rating for r in reviews) / len(reviews)
-                product.rating = round(avg_rating, 2)
-                product.save()
+            rating = serializer.validated_data['rating']
+            # Insert the review and fold it into the product's aggregates in
+            # one short transaction; no need to reload every review
+            with transaction.atomic():
+                review = Review.objects.create(
+                    product=product,
+                    user_name=user_name,
+                    rating=rating,
+                    comment=serializer.validated_data.get('comment', '')
+                )
+                Product.objects.filter(pk=product.pk).apply_review_delta(1, rating)
             return Response(ReviewSerializer(review).data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-@api_view(['POST'])
+@api_view(['POST', 'PUT'])
 @permission_classes([AllowAny])  # Allow unauthenticated uploads for easier admin access
 def upload_image(request):
     """
@@ -111,66 +286,35 @@ def upload_image(request):
     Accepts:
     - multipart/form-data with 'image' file field
     - OR JSON with 'image' as base64 data URL
+    - OR the raw image as the request body (Content-Type: image/<type>)
+    Every form is streamed to a temporary file (see products.uploads), so
+    large images are never held in memory whole.
     """
     try:
-        # Check if it's a file upload (multipart/form-data)
-        if 'image' in request.FILES:
-            uploaded_file = request.FILES['image']
-            
-            # Generate unique filename
-            file_extension = uploaded_file.name.split('.')[-1] if '.' in uploaded_file.name else 'jpg'
-            filename = f"products/{uuid.uuid4()}.{file_extension}"
-            
-            # Save file
-            saved_path = default_storage.save(filename, uploaded_file)
-            
-            # Get URL - construct proper media URL
-            # Remove leading slash from MEDIA_URL if present, then add saved_path
-            media_url = settings.MEDIA_URL.lstrip('/')
-            file_url = request.build_absolute_uri(f"/{media_url}{saved_path}")
-            
-            return Response({
-                'url': file_url,
-                'message': 'Image uploaded successfully'
-            }, status=status.HTTP_201_CREATED)
+        # Spool the upload to disk, checking size and type as it streams in
+        uploaded_file, image_type = uploads.receive_image(request)
         
-        # Check if it's base64 data URL (JSON)
-        elif 'image' in request.data:
-            image_data = request.data['image']
-            
-            # Handle base64 data URL
-            if isinstance(image_data, str) and image_data.startswith('data:image'):
-                # Extract base64 data
-                header, encoded = image_data.split(',', 1)
-                image_format = header.split('/')[1].split(';')[0]  # e.g., 'png', 'jpeg'
-                
-                # Decode base64
-                image_bytes = base64.b64decode(encoded)
-                
-                # Generate unique filename
-                filename = f"products/{uuid.uuid4()}.{image_format}"
-                
-                # Save file
-                saved_path = default_storage.save(filename, ContentFile(image_bytes))
-                
-                # Get URL - construct proper media URL
-                # Remove leading slash from MEDIA_URL if present, then add saved_path
-                media_url = settings.MEDIA_URL.lstrip('/')
-                file_url = request.build_absolute_uri(f"/{media_url}{saved_path}")
-                
-                return Response({
-                    'url': file_url,
-                    'message': 'Image uploaded successfully'
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response({
-                    'error': 'Invalid image data. Expected base64 data URL or file upload.'
-                }, status=status.HTTP_400_BAD_REQUEST)
-        else:
-            return Response({
-                'error': 'No image provided. Send "image" field with file or base64 data.'
-            }, status=status.HTTP_400_BAD_REQUEST)
-            
+        # Store under the content hash (known bytes are not written
+        # again), then queue resized variants off the request path
+        with uploaded_file:
+            saved_path, variants = media.save_upload(uploaded_file, image_type)
+        
+        # Get URL - construct proper media URL
+        # Remove leading slash from MEDIA_URL if present, then add saved_path
+        media_url = settings.MEDIA_URL.lstrip('/')
+        file_url = request.build_absolute_uri(f"/{media_url}{saved_path}")
+        
+        return Response({
+            'url': file_url,
+            'variants': {
+                str(width): request.build_absolute_uri(f"/{media_url}{name}")
+                for width, name in variants.items()
+            },
+            'message': 'Image uploaded successfully'
+        }, status=status.HTTP_201_CREATED)
+    
+    except uploads.UploadRejected as e:
+        return Response({'error': str(e)}, status=e.status_code)
     except Exception as e:
         return Response({
             'error': f'Failed to upload image: {str(e)}'
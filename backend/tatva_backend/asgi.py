@@ -2,6 +2,8 @@
 ASGI config for tatva_backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Under ASGI the catalog read endpoints are served by async views (see
+tatva_backend.middleware and products.async_views).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
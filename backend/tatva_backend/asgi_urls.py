@@ -0,0 +1,12 @@
+"""
+URL configuration used for requests served under ASGI: the async catalog
+read views (products.async_urls) ahead of everything in tatva_backend.urls.
+Selected per request by tatva_backend.middleware.asgi_urlconf_middleware.
+"""
+from django.urls import path, include
+from . import urls
+
+urlpatterns = [
+    path('api/', include('products.async_urls')),
+    *urls.urlpatterns,
+]
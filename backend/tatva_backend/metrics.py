@@ -0,0 +1,201 @@
+"""
+Per-request instrumentation: wall time, database queries and time,
+serializer time and response size, per endpoint.
+
+tatva_backend.middleware.request_metrics_middleware opens a RequestStats
+for each request in a context variable; a database execute wrapper (on
+every connection) and FastJSONRenderer, timing how long the response data
+takes to serialize to JSON, add to it from wherever the work runs -
+sync_to_async copies the context, so queries the async views run on a
+worker thread count too.
+
+Each finished request is recorded under its URL name and method. Methods
+outside the standard ones share the OTHER label and endpoints past
+REQUEST_METRICS_MAX_ENDPOINTS share "other", so clients can't grow the
+series without bound. Every metric keeps a rolling window of the last
+REQUEST_METRICS_WINDOW samples, for p50/p95/p99, plus a running count and
+sum; exposition() renders them as Prometheus summaries for GET
+/api/_metrics/.
+"""
+import contextvars
+import threading
+import time
+from collections import deque
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+METHODS = frozenset(('GET', 'HEAD', 'POST', 'PUT', 'PATCH', 'DELETE', 'OPTIONS'))
+
+# name, help, RequestStats attribute
+METRICS = (
+    ('tatva_request_duration_seconds', 'Wall time of the request', 'duration'),
+    ('tatva_request_db_queries', 'Database queries run by the request', 'queries'),
+    ('tatva_request_db_seconds', 'Time spent in database queries', 'db_time'),
+    ('tatva_request_serializer_seconds', 'Time spent serializing response data to JSON', 'serializer_time'),
+    ('tatva_response_size_bytes', 'Size of the response body (not streamed ones)', 'size'),
+)
+
+current_stats = contextvars.ContextVar('request_stats', default=None)
+
+
+def get_window():
+    return max(int(getattr(settings, 'REQUEST_METRICS_WINDOW', 1000)), 1)
+
+
+def get_max_endpoints():
+    return max(int(getattr(settings, 'REQUEST_METRICS_MAX_ENDPOINTS', 200)), 1)
+
+
+def server_timing_enabled():
+    return getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', True)
+
+
+class RequestStats:
+    __slots__ = ('duration', 'queries', 'db_time', 'serializer_time', 'size')
+
+    def __init__(self):
+        self.duration = 0.0
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.size = None
+
+    def server_timing(self):
+        return (
+            f'app;dur={self.duration * 1000:.1f}, '
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries", '
+            f'ser;dur={self.serializer_time * 1000:.1f}'
+        )
+
+
+def time_queries(execute, sql, params, many, context):
+    """Database execute wrapper: counts and times queries of the current request"""
+    stats = current_stats.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.db_time += time.perf_counter() - start
+        stats.queries += 1
+
+
+def instrument_connection(connection, **kwargs):
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
+
+
+def instrument_connections():
+    """Wrap the connections already open; the signal covers new ones"""
+    for connection in connections.all(initialized_only=True):
+        instrument_connection(connection)
+
+
+connection_created.connect(instrument_connection)
+
+
+def add_serializer_time(seconds):
+    """Called by FastJSONRenderer with the time a render took"""
+    stats = current_stats.get()
+    if stats is not None:
+        stats.serializer_time += seconds
+
+
+class Summary:
+    """Rolling window of samples plus running count and sum"""
+    __slots__ = ('samples', 'count', 'total')
+
+    def __init__(self, window):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        self.samples.append(value)
+        self.count += 1
+        self.total += value
+
+    def quantiles(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {q: ordered[min(int(q * len(ordered)), len(ordered) - 1)] for q in QUANTILES}
+
+
+class Registry:
+    """Thread-safe summaries per (endpoint, method) and metric"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.summaries = {}
+        self.endpoints = set()
+
+    def record(self, endpoint, method, stats):
+        if method not in METHODS:
+            method = 'OTHER'
+        with self.lock:
+            if endpoint not in self.endpoints:
+                if len(self.endpoints) < get_max_endpoints():
+                    self.endpoints.add(endpoint)
+                else:
+                    endpoint = 'other'
+            for name, _, attribute in METRICS:
+                value = getattr(stats, attribute)
+                if value is None:
+                    continue
+                key = (name, endpoint, method)
+                summary = self.summaries.get(key)
+                if summary is None:
+                    summary = self.summaries[key] = Summary(get_window())
+                summary.observe(value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                key: (summary.quantiles(), summary.count, summary.total)
+                for key, summary in self.summaries.items()
+            }
+
+    def clear(self):
+        with self.lock:
+            self.summaries.clear()
+            self.endpoints.clear()
+
+
+registry = Registry()
+
+
+def endpoint_name(request):
+    """The URL name of the matched route; unmatched requests share one label"""
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return 'unmatched'
+    return match.view_name or match.route or 'unnamed'
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def exposition():
+    """Every summary in the Prometheus text format (version 0.0.4)"""
+    snapshot = registry.snapshot()
+    lines = []
+    for name, help_text, _ in METRICS:
+        keys = sorted(key for key in snapshot if key[0] == name)
+        if not keys:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} summary')
+        for key in keys:
+            quantiles, count, total = snapshot[key]
+            labels = f'endpoint="{escape_label(key[1])}",method="{escape_label(key[2])}"'
+            for quantile, value in quantiles.items():
+                lines.append(f'{name}{{{labels},quantile="{quantile}"}} {value:.6g}')
+            lines.append(f'{name}_sum{{{labels}}} {total:.6g}')
+            lines.append(f'{name}_count{{{labels}}} {count}')
+    return '\n'.join(lines) + '\n'
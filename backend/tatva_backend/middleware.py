@@ -0,0 +1,57 @@
+import time
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+from . import metrics
+
+
+@sync_and_async_middleware
+def asgi_urlconf_middleware(get_response):
+    """
+    Route requests served under ASGI through settings.ASGI_URLCONF, which
+    adds async views for the read-heavy catalog endpoints. Django builds an
+    async middleware chain only under ASGI, so WSGI requests keep
+    ROOT_URLCONF and the sync views.
+    """
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            request.urlconf = settings.ASGI_URLCONF
+            return await get_response(request)
+        return middleware
+    return get_response
+
+
+@sync_and_async_middleware
+def request_metrics_middleware(get_response):
+    """
+    Measure every request (see tatva_backend.metrics): record it under its
+    endpoint and, with REQUEST_METRICS_SERVER_TIMING, report the timings in
+    a Server-Timing header. First in MIDDLEWARE, so the wall time covers
+    the other middleware too.
+    """
+    def start():
+        metrics.instrument_connections()
+        stats = metrics.RequestStats()
+        return stats, metrics.current_stats.set(stats), time.perf_counter()
+
+    def finish(request, response, stats, token, started):
+        stats.duration = time.perf_counter() - started
+        metrics.current_stats.reset(token)
+        if not response.streaming:
+            stats.size = len(response.content)
+        metrics.registry.record(metrics.endpoint_name(request), request.method, stats)
+        if metrics.server_timing_enabled():
+            response['Server-Timing'] = stats.server_timing()
+        return response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            stats, token, started = start()
+            response = await get_response(request)
+            return finish(request, response, stats, token, started)
+    else:
+        def middleware(request):
+            stats, token, started = start()
+            response = get_response(request)
+            return finish(request, response, stats, token, started)
+    return middleware
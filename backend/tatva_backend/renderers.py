@@ -0,0 +1,78 @@
+"""
+Fast JSON renderer and parser for REST framework.
+
+Uses orjson when it is installed. orjson serializes straight to bytes and
+handles datetimes and UUIDs natively; Decimals and the other types DRF's
+encoder knows about (lazy strings, querysets, ...) go through that
+encoder's default(). Without orjson both classes behave exactly like the
+stock JSONRenderer/JSONParser.
+"""
+import time
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+from . import metrics
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is an optional dependency
+    orjson = None
+
+ORJSON_OPTIONS = (orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+_fallback_encoder = JSONEncoder()
+
+
+def encode_default(obj):
+    """Types orjson doesn't know: Decimal, lazy strings, querysets, ..."""
+    return _fallback_encoder.default(obj)
+
+
+def is_enabled():
+    return orjson is not None
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer that renders with orjson when available. Render time is
+    reported to the request's metrics (tatva_backend.metrics).
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return self.encode(data, accepted_media_type, renderer_context)
+        finally:
+            metrics.add_serializer_time(time.perf_counter() - start)
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if orjson is None or data is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        # Indented output (e.g. "application/json; indent=4") is for humans:
+        # leave it to the stdlib
+        if self.get_indent(accepted_media_type, renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type, renderer_context)
+        ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        # Like JSONRenderer, escape U+2028/U+2029 (valid JSON, invalid
+        # JavaScript). Their last UTF-8 byte is a cheap memchr pre-check
+        # that skips two full multi-byte scans on most responses.
+        if b'\xa8' in ret or b'\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """JSONParser that parses with orjson when available"""
+
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
@@ -2,6 +2,7 @@
 Django settings for tatva_backend project.
 """
 
+import os
 from pathlib import Path
 from datetime import timedelta
 
@@ -35,10 +36,15 @@ INSTALLED_APPS = [
     'corsheaders',
     'authentication',
     'products',
+    'cart',
+    'orders',
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the chain
+    'tatva_backend.middleware.request_metrics_middleware',
     'django.middleware.security.SecurityMiddleware',
+    'tatva_backend.middleware.asgi_urlconf_middleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -49,6 +55,8 @@ MIDDLEWARE = [
 ]
 
 ROOT_URLCONF = 'tatva_backend.urls'
+# Under ASGI the catalog reads are served by async views (products.async_views)
+ASGI_URLCONF = 'tatva_backend.asgi_urls'
 
 TEMPLATES = [
     {
@@ -72,13 +80,77 @@ WSGI_APPLICATION = 'tatva_backend.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+# The tuned SQLite backend applies WAL, synchronous=NORMAL, busy_timeout,
+# cache and mmap PRAGMAs on connect (see tatva_backend/sqlite3/base.py);
+# connections are kept for CONN_MAX_AGE seconds and checked before reuse.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'tatva_backend.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'pragmas': {
+                'busy_timeout': 5000,  # ms
+            },
+        },
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+# Product list/detail responses are cached under a catalog version that is
+# bumped on every catalog write. For a cache shared between worker
+# processes, switch to 'django.core.cache.backends.filebased.FileBasedCache'
+# with 'LOCATION': BASE_DIR / 'cache'.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tatva-default',
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Token revocation versions (authentication.backends, .blacklist): must
+    # be shared by every worker process, and kept apart from the response
+    # cache so catalog churn doesn't evict them. Redis when REDIS_URL is set
+    # (needs the redis package), else a table in the project database
+    # (created by authentication's migrations)
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    } if os.environ.get('REDIS_URL') else {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'auth_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 100_000,
+        },
+    },
+}
+
+PRODUCTS_CACHE_ALIAS = 'default'
+PRODUCTS_CACHE_TIMEOUT = 300  # seconds
+
+# Delta sync (/api/products/changes/): rows newer than the settle window are
+# held back until in-flight transactions have committed; cursors older than
+# the tombstone retention must resync from scratch
+PRODUCTS_SYNC_SETTLE_SECONDS = 2
+PRODUCTS_TOMBSTONE_RETENTION_DAYS = 30
+
+PRODUCTS_FACET_PRICE_BUCKETS = 10  # price histogram bars in the catalog sidebar
+
+# Related products kept per product; refreshed by the rebuild_related_products
+# command (incremental, so it can run every few minutes from cron)
+PRODUCTS_RELATED_COUNT = 8
+
+CART_MAX_QUANTITY = 99  # per product line
+
+# Order placement retries the whole (short) transaction when SQLite reports
+# "database is locked", backing off from ORDERS_RETRY_BACKOFF seconds
+ORDERS_LOCK_RETRIES = 5
+ORDERS_RETRY_BACKOFF = 0.05
+
 # Custom User Model
 AUTH_USER_MODEL = 'authentication.User'
 
@@ -125,6 +197,17 @@ STATIC_URL = 'static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Resized WebP variants generated for uploaded product images (needs Pillow)
+PRODUCT_IMAGE_VARIANT_WIDTHS = (320, 640, 1280)
+PRODUCT_IMAGE_LIST_WIDTH = 320  # variant handed out by list endpoints
+PRODUCT_IMAGE_WORKERS = 2
+PRODUCT_IMAGE_VARIANTS_ASYNC = True  # False: generate inside the upload request
+
+# Upload limits, enforced while the upload streams in (products.uploads)
+PRODUCT_IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024  # decoded bytes
+PRODUCT_IMAGE_ALLOWED_TYPES = ('jpeg', 'png', 'webp', 'gif')
+PRODUCT_IMAGE_UPLOAD_CHUNK_SIZE = 64 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.0/ref/settings/#default-auto-field
 
@@ -133,14 +216,24 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework Configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication that verifies each token once per process
+        'authentication.backends.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed when installed, stock JSON otherwise
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'tatva_backend.renderers.FastJSONRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'tatva_backend.renderers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
+    # Client IPs (login throttling) come from REMOTE_ADDR; X-Forwarded-For
+    # is client-controlled. Behind N trusted reverse proxies set this to N.
+    'NUM_PROXIES': 0,
 }
 
 # JWT Settings
@@ -155,8 +248,37 @@ SIMPLE_JWT = {
     'AUTH_HEADER_NAME': 'HTTP_AUTHORIZATION',
     'USER_ID_FIELD': 'id',
     'USER_ID_CLAIM': 'user_id',
+    # Rotated refresh tokens are revoked in authentication.blacklist
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.TokenRefreshSerializer',
 }
 
+# Verified access tokens kept per process (see authentication.backends)
+AUTH_TOKEN_CACHE_SIZE = 10_000
+# Cache holding per-user revocation versions; must be shared by all workers
+AUTH_TOKEN_CACHE_ALIAS = 'auth'
+# Seconds a process trusts the versions it read; a revocation in another
+# worker is seen within this long
+AUTH_USER_VERSION_TTL = 5
+
+# Token buckets for POST /api/auth/login/, checked before any password is
+# hashed (see authentication.throttling); None disables a scope
+LOGIN_THROTTLE_RATES = {
+    'ip': '30/min',
+    'account': '10/hour',
+}
+LOGIN_THROTTLE_MAX_KEYS = 100_000
+
+# In-memory Bloom filter over revoked refresh tokens (see
+# authentication.blacklist); prune expired rows with prune_revoked_tokens
+AUTH_BLACKLIST_BLOOM_CAPACITY = 100_000
+AUTH_BLACKLIST_BLOOM_ERROR_RATE = 0.01
+
+# Per-endpoint request metrics (see tatva_backend.metrics), served to staff
+# at /api/_metrics/; quantiles cover the last REQUEST_METRICS_WINDOW requests
+REQUEST_METRICS_WINDOW = 1000
+REQUEST_METRICS_MAX_ENDPOINTS = 200  # later URL names share the "other" label
+REQUEST_METRICS_SERVER_TIMING = True
+
 # CORS Settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:5173",  # Vite default port
@@ -186,6 +308,14 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
+    'if-modified-since',
+]
+
+# Let the frontend read the conditional GET validators on product responses
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'last-modified',
 ]
 
 
@@ -0,0 +1,60 @@
+"""
+SQLite database backend tuned for serving: the stock backend plus PRAGMAs
+applied to every new connection.
+
+- journal_mode=WAL: readers no longer block behind a writer (and the
+  writer doesn't wait for readers); the setting persists in the file
+- synchronous=NORMAL: in WAL mode still never corrupts the database, and
+  commits skip an fsync (a power cut can lose the last commits only)
+- busy_timeout: a writer waits this many ms for the write lock instead of
+  failing with "database is locked"
+- cache_size / mmap_size: keep hot pages in the page cache and read the
+  file through memory mapping rather than read() calls
+- temp_store=MEMORY: sorts and temporary indexes don't touch disk
+
+Use it with ENGINE 'tatva_backend.sqlite3'. OPTIONS['pragmas'] overrides or
+adds PRAGMAs; every other OPTIONS key goes to sqlite3.connect() as usual.
+Pair it with CONN_MAX_AGE and CONN_HEALTH_CHECKS so the PRAGMAs are paid
+once per connection, not once per request.
+"""
+import re
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,  # ms
+    'cache_size': -20000,  # negative: KiB, so ~20 MB
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+PRAGMA_NAME = re.compile(r'^[a-z_]+$')
+PRAGMA_VALUE = re.compile(r'^-?\w+$')
+
+
+def apply_pragmas(conn, pragmas):
+    """Run PRAGMA name=value for each item; names and values are checked, not quoted"""
+    for name, value in pragmas.items():
+        if value is None:
+            continue
+        if not PRAGMA_NAME.match(name) or not PRAGMA_VALUE.match(str(value)):
+            raise ValueError(f'Invalid SQLite PRAGMA {name}={value!r}')
+        conn.execute(f'PRAGMA {name} = {value}').fetchall()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+
+    def get_pragmas(self):
+        """DEFAULT_PRAGMAS overridden by OPTIONS['pragmas'] (None drops one)"""
+        return {**DEFAULT_PRAGMAS, **self.settings_dict['OPTIONS'].get('pragmas', {})}
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        apply_pragmas(conn, self.get_pragmas())
+        return conn
@@ -0,0 +1,160 @@
+from decimal import Decimal
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import uuid
+from asgiref.sync import sync_to_async
+from io import BytesIO, StringIO
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from products.tests import make_product
+from . import metrics
+from .renderers import FastJSONParser, FastJSONRenderer
+from .sqlite3.base import DEFAULT_PRAGMAS, apply_pragmas
+
+User = get_user_model()
+
+
+class FastJSONTests(TestCase):
+    """orjson-backed renderer/parser agree with the stock JSON ones"""
+
+    def test_renders_like_stock_renderer(self):
+        data = {
+            'price': Decimal('1499.50'),
+            'created': timezone.now(),
+            'id': uuid.uuid4(),
+            'name': 'Diya\u2028Lamp – brass',
+            5: 'non-string key',
+        }
+        fast = FastJSONRenderer().render(data)
+        self.assertEqual(json.loads(fast), json.loads(JSONRenderer().render(data)))
+        self.assertIn(b'\\u2028', fast)
+
+    def test_parses_like_stock_parser(self):
+        with self.assertRaises(ParseError):
+            FastJSONParser().parse(BytesIO(b'{"name": '), parser_context={'encoding': 'utf-8'})
+        self.assertEqual(
+            FastJSONParser().parse(BytesIO('{"name": "Ganesha – brass"}'.encode()), parser_context={}),
+            {'name': 'Ganesha – brass'},
+        )
+
+
+class SQLiteTuningTests(TestCase):
+    """The tuned SQLite backend applies its PRAGMAs to every connection"""
+
+    def pragma(self, conn, name):
+        return conn.execute(f'PRAGMA {name}').fetchone()[0]
+
+    def test_project_connection_is_tuned(self):
+        conn = connection.connection
+        self.assertEqual(self.pragma(conn, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(conn, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(conn, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma(conn, 'foreign_keys'), 1)
+
+    def test_file_database_switches_to_wal(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        conn = sqlite3.connect(os.path.join(directory, 'tuned.sqlite3'))
+        self.addCleanup(conn.close)
+        apply_pragmas(conn, DEFAULT_PRAGMAS)
+        self.assertEqual(self.pragma(conn, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(conn, 'cache_size'), DEFAULT_PRAGMAS['cache_size'])
+
+    def test_rejects_unsafe_pragmas(self):
+        conn = sqlite3.connect(':memory:')
+        self.addCleanup(conn.close)
+        with self.assertRaises(ValueError):
+            apply_pragmas(conn, {'journal_mode': 'WAL; DROP TABLE products'})
+
+    def test_load_test_command(self):
+        out = StringIO()
+        call_command('benchmark_sqlite', '--seconds', '0.2', '--products', '200', stdout=out)
+        self.assertIn('Tuned vs stock', out.getvalue())
+
+
+class RequestMetricsTests(TestCase):
+    """Per-request timings in Server-Timing and per-endpoint summaries at /api/_metrics/"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        metrics.registry.clear()
+        make_product(name='Brass Diya')
+        make_product(name='Ganesha')
+
+    def test_server_timing_counts_the_queries(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/products/')
+        timing = response['Server-Timing']
+        self.assertIn('app;dur=', timing)
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertIn('ser;dur=', timing)
+
+    def test_records_per_endpoint(self):
+        for _ in range(3):
+            self.client.get('/api/products/')
+        self.client.get('/api/products/999999/')
+        snapshot = metrics.registry.snapshot()
+        quantiles, count, total = snapshot[('tatva_request_duration_seconds', 'product-list', 'GET')]
+        self.assertEqual(count, 3)
+        self.assertEqual(set(quantiles), set(metrics.QUANTILES))
+        self.assertGreater(snapshot[('tatva_request_serializer_seconds', 'product-list', 'GET')][2], 0)
+        self.assertEqual(snapshot[('tatva_request_db_queries', 'product-detail', 'GET')][1], 1)
+        self.assertGreater(snapshot[('tatva_response_size_bytes', 'product-list', 'GET')][0][0.5], 0)
+
+    async def test_async_views_are_measured(self):
+        response = await self.async_client.get('/api/products/')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('desc="0 queries"', response['Server-Timing'])
+        snapshot = await sync_to_async(metrics.registry.snapshot)()
+        self.assertEqual(snapshot[('tatva_request_duration_seconds', 'product-list-async', 'GET')][1], 1)
+
+    def test_metrics_endpoint_is_staff_only(self):
+        self.client.get('/api/products/')
+        self.assertEqual(self.client.get('/api/_metrics/').status_code, 401)
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            email='buyer@example.com', username='buyer', password='pass12345',
+        ))
+        self.assertEqual(client.get('/api/_metrics/').status_code, 403)
+
+        client.force_authenticate(User.objects.create_user(
+            email='staff@example.com', username='staff', password='pass12345', is_staff=True,
+        ))
+        response = client.get('/api/_metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE tatva_request_duration_seconds summary', text)
+        self.assertIn('tatva_request_duration_seconds{endpoint="product-list",method="GET",quantile="0.99"}', text)
+        self.assertIn('tatva_request_db_queries_count{endpoint="product-list",method="GET"} 1', text)
+
+    @override_settings(REQUEST_METRICS_MAX_ENDPOINTS=2)
+    def test_labels_are_bounded(self):
+        for method in ('FOO', 'BAR', 'PROPFIND'):
+            self.client.generic(method, '/api/products/')
+        self.client.get('/api/cart/validate/')
+        self.client.get('/api/products/facets/')
+        keys = {key[1:] for key in metrics.registry.snapshot()}
+        self.assertEqual(keys, {('product-list', 'OTHER'), ('cart-validate-items', 'GET'), ('other', 'GET')})
+
+    @override_settings(REQUEST_METRICS_WINDOW=2)
+    def test_quantiles_cover_the_rolling_window(self):
+        summary = metrics.Summary(metrics.get_window())
+        for value in (100.0, 1.0, 2.0):
+            summary.observe(value)
+        self.assertEqual(summary.count, 3)
+        self.assertEqual(summary.total, 103.0)
+        self.assertEqual(summary.quantiles(), {0.5: 2.0, 0.95: 2.0, 0.99: 2.0})
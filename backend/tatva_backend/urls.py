@@ -1,19 +1,31 @@
 """
 URL configuration for tatva_backend project.
 """
+import re
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import path, re_path, include
 from django.conf import settings
-from django.conf.urls.static import static
+from products.media import serve_media
+from .views import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('api/_metrics/', metrics_view, name='metrics'),
     path('api/auth/', include('authentication.urls')),
     path('api/', include('products.urls')),
+    path('api/', include('cart.urls')),
+    path('api/', include('orders.urls')),
 ]
 
-# Serve media files in development
+# Serve media files in development (content-addressed images get
+# immutable Cache-Control headers)
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+    urlpatterns += [
+        re_path(
+            r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/')),
+            serve_media,
+            {'document_root': settings.MEDIA_ROOT},
+        ),
+    ]
 
 
@@ -7,7 +7,7 @@ import {
   type ProductDetailInfo
 } from './data/products'
 import { isAdminAuthenticated, setAdminAuthenticated, clearAdminAuth } from './utils/adminAuth'
-import { createProduct, updateProduct, deleteProduct, getProducts, getProductById, getAccessToken, login, uploadImage, refreshAccessToken } from './utils/api'
+import { createProduct, updateProduct, deleteProduct, syncProducts, getProductById, getAllProductReviews, getAccessToken, login, uploadImage, refreshAccessToken } from './utils/api'
 
 interface SubDescription {
   title: string
@@ -66,7 +66,8 @@ function AdminDashboard() {
     try {
       // Always try to fetch from API first (API endpoint is public, no auth required)
       try {
-        const apiProducts = await getProducts()
+        // Only the changes since the last sync are downloaded
+        const apiProducts = await syncProducts()
         console.log('Fetched products from API:', apiProducts)
         
         if (apiProducts && Array.isArray(apiProducts) && apiProducts.length > 0) {
@@ -368,9 +369,10 @@ function AdminDashboard() {
           }
         }
         
-        // Handle reviews - backend returns reviews
+        // Handle reviews - the detail payload only embeds the newest few, so
+        // load the full list; saving the form rewrites every review
         let reviews: Review[] = []
-        const rawReviews = (apiProduct as any).reviews
+        const rawReviews = await getAllProductReviews(apiProduct.id)
         console.log('Raw reviews from API:', rawReviews)
         
         if (rawReviews && Array.isArray(rawReviews) && rawReviews.length > 0) {
@@ -740,7 +742,9 @@ function AdminDashboard() {
     }
     
     // Always include reviews (even if empty array) to ensure they're saved/updated
+    // Send ids so the backend can update existing reviews in place
     productData.reviews = reviews.map(r => ({
+      id: r.id,
       userName: r.userName || 'Anonymous',
       rating: r.rating || 5,
       date: r.date || new Date().toLocaleDateString(),
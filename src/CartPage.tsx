@@ -3,6 +3,7 @@ import { useState, useEffect } from 'react'
 import { isLoggedIn } from './utils/auth'
 import CartIcon from './components/CartIcon'
 import { getCartItems, updateCartQuantity, removeFromCart, type CartItem } from './utils/cart'
+import { validateCartItems } from './utils/api'
 
 function CartPage() {
   const location = useLocation()
@@ -263,7 +264,20 @@ function CartPage() {
                     </div>
 
                     <button
-                      onClick={() => {
+                      onClick={async () => {
+                        // Re-check every line's price and stock in a single request
+                        try {
+                          const validation = await validateCartItems(cartItems)
+                          if (!validation.valid) {
+                            const problems = validation.items
+                              .filter((line) => line.issues.length > 0)
+                              .map((line) => `${line.name ?? 'A product'}: ${line.issues.join(', ').replace(/_/g, ' ')}`)
+                            alert(`Please review your cart:\n${problems.join('\n')}`)
+                            return
+                          }
+                        } catch (error) {
+                          console.warn('Could not validate cart:', error)
+                        }
                         alert('Checkout functionality would be implemented here')
                       }}
                       className="w-full flex cursor-pointer items-center justify-center overflow-hidden rounded-full h-12 px-6 bg-primary text-white dark:text-background-dark dark:bg-brushed-gold text-base font-bold leading-normal tracking-[0.015em] hover:opacity-90 transition-opacity mb-4"
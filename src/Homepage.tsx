@@ -4,7 +4,7 @@ import { isLoggedIn } from './utils/auth'
 import { addToCart } from './utils/cart'
 import CartIcon from './components/CartIcon'
 import { getAllProducts } from './data/products'
-import { getProducts as getProductsFromAPI } from './utils/api'
+import { getProductPage } from './utils/api'
 
 function Homepage() {
   const location = useLocation()
@@ -57,7 +57,8 @@ function Homepage() {
       try {
         // Try to fetch from API first
         try {
-          const apiProducts = await getProductsFromAPI()
+          // Best sellers come from the first page of the most reviewed
+          const { results: apiProducts } = await getProductPage({ sort: 'popularity' })
           if (apiProducts && apiProducts.length > 0) {
             // Normalize all products to ensure price and rating are numbers
             const normalizedProducts = apiProducts.map(normalizeProduct)
@@ -1,5 +1,7 @@
+import { useEffect, useState } from 'react'
 import { Link, useLocation, useNavigate } from 'react-router-dom'
 import { isLoggedIn } from './utils/auth'
+import { getOrders, type OrderResponse } from './utils/api'
 import CartIcon from './components/CartIcon'
 
 interface OrderItem {
@@ -19,10 +21,33 @@ interface Order {
   trackingNumber?: string
 }
 
+const toOrder = (order: OrderResponse): Order => ({
+  id: `#${order.number}`,
+  date: new Date(order.created_at).toLocaleDateString('en-US', { month: 'short', day: 'numeric', year: 'numeric' }),
+  status: order.status,
+  total: Number(order.total),
+  trackingNumber: order.trackingNumber || undefined,
+  items: order.items.map((item) => ({
+    id: item.id ?? 0,
+    name: item.name,
+    image: item.image,
+    quantity: item.quantity,
+    price: Number(item.price),
+  })),
+})
+
 function OrderHistory() {
   const location = useLocation()
   const navigate = useNavigate()
   const loggedIn = isLoggedIn()
+  const [orders, setOrders] = useState<Order[]>([])
+
+  useEffect(() => {
+    if (!loggedIn) return
+    getOrders()
+      .then((data) => setOrders(data.map(toOrder)))
+      .catch((error) => console.error('Failed to load orders:', error))
+  }, [loggedIn])
 
   const handleNewsletterSubmit = (e: React.FormEvent) => {
     e.preventDefault()
@@ -41,50 +66,6 @@ function OrderHistory() {
     return null
   }
 
-  const orders: Order[] = [
-    {
-      id: '#CF-10452',
-      date: 'Oct 12, 2023',
-      status: 'Delivered',
-      total: 189.00,
-      trackingNumber: 'TRK123456789',
-      items: [
-        { id: 1, name: 'Handcrafted Oak Frame', image: '/best_seller1.png', quantity: 1, price: 85.00 },
-        { id: 3, name: 'Artisan Ceramic Vase', image: '/best_seller2.png', quantity: 2, price: 65.00 }
-      ]
-    },
-    {
-      id: '#CF-10449',
-      date: 'Sep 28, 2023',
-      status: 'Delivered',
-      total: 75.50,
-      trackingNumber: 'TRK987654321',
-      items: [
-        { id: 4, name: 'Golden Abstract Print', image: '/best_seller3.png', quantity: 1, price: 75.50 }
-      ]
-    },
-    {
-      id: '#CF-10445',
-      date: 'Sep 15, 2023',
-      status: 'Shipped',
-      total: 220.00,
-      trackingNumber: 'TRK456789123',
-      items: [
-        { id: 6, name: 'Brass Floating Frame', image: '/best_seller4.png', quantity: 2, price: 110.00 }
-      ]
-    },
-    {
-      id: '#CF-10440',
-      date: 'Aug 30, 2023',
-      status: 'Processing',
-      total: 145.00,
-      items: [
-        { id: 2, name: 'Modern Walnut Frame', image: '/best_seller1.png', quantity: 1, price: 110.00 },
-        { id: 5, name: 'Smoked Glass Idols', image: '/best_seller2.png', quantity: 1, price: 35.00 }
-      ]
-    }
-  ]
-
   const getStatusColor = (status: Order['status']) => {
     switch (status) {
       case 'Delivered':
@@ -4,7 +4,7 @@ import { isLoggedIn } from './utils/auth'
 import { addToCart } from './utils/cart'
 import CartIcon from './components/CartIcon'
 import { getAllProducts, type ProductDetailInfo as Product, type Review } from './data/products'
-import { getProducts as getProductsFromAPI, getProductById as getProductByIdFromAPI } from './utils/api'
+import { getProductPage, getProductById as getProductByIdFromAPI, getRelatedProducts } from './utils/api'
 
 interface FinishVariant {
   name: string
@@ -41,7 +41,8 @@ function ProductDetail() {
       try {
         // Try to fetch from API first
         try {
-          const apiProducts = await getProductsFromAPI()
+          // One page is enough for the fallback lookups and related products
+          const { results: apiProducts } = await getProductPage()
           if (apiProducts && apiProducts.length > 0) {
             setAllProducts(apiProducts as Product[])
             return
@@ -221,8 +222,22 @@ function ProductDetail() {
     }
   }, [productId, allProducts])
 
-  // Get related products - prioritize same category, then fill with other products
-  const relatedProducts = product ? (() => {
+  // Related products precomputed on the server (empty until the index has this product)
+  const [serverRelated, setServerRelated] = useState<Product[]>([])
+
+  useEffect(() => {
+    setServerRelated([])
+    if (!productId) return
+    getRelatedProducts(productId)
+      .then((related) => setServerRelated(related.map((p) => ({
+        ...p,
+        price: typeof p.price === 'string' ? parseFloat(p.price) : (p.price || 0),
+      })) as Product[]))
+      .catch((error) => console.warn('Failed to fetch related products:', error))
+  }, [productId])
+
+  // Get related products - the server's ranking, or else same category first, then other products
+  const relatedProducts = serverRelated.length > 0 ? serverRelated.slice(0, 4) : product ? (() => {
     const sameCategory = allProducts.filter(p => p.category === product.category && p.id !== product.id)
     if (sameCategory.length >= 4) {
       return sameCategory.slice(0, 4)
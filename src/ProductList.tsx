@@ -4,7 +4,10 @@ import { isLoggedIn } from './utils/auth'
 import { addToCart } from './utils/cart'
 import CartIcon from './components/CartIcon'
 import { getAllProducts, type ProductDetailInfo as Product } from './data/products'
-import { getProducts as getProductsFromAPI } from './utils/api'
+import { getProductFacets, syncProducts, type ProductFacets } from './utils/api'
+
+// How long the price range must stay put before the facets are refetched
+const FACETS_DEBOUNCE_MS = 300
 
 function ProductList() {
   const location = useLocation()
@@ -29,7 +32,8 @@ function ProductList() {
       try {
         // Try to fetch from API first
         try {
-          const apiProducts = await getProductsFromAPI()
+          // Only the changes since the last sync are downloaded
+          const apiProducts = await syncProducts()
           console.log('Fetched products from API:', apiProducts)
           
           if (apiProducts && Array.isArray(apiProducts) && apiProducts.length > 0) {
@@ -118,8 +122,17 @@ function ProductList() {
     }
   }, [])
   
-  // Calculate price range from products (useMemo to recalculate when products change)
+  // Sidebar counts and price bounds come from the facets endpoint
+  const [facets, setFacets] = useState<ProductFacets | null>(null)
+
+  // Calculate price range from the facets, or from products when they are unavailable
   const { minPriceValue, maxPriceValue } = useMemo(() => {
+    if (facets?.price.min != null && facets.price.max != null) {
+      return {
+        minPriceValue: Math.floor(Number(facets.price.min)),
+        maxPriceValue: Math.ceil(Number(facets.price.max))
+      }
+    }
     if (allProducts.length === 0) {
       return { minPriceValue: 0, maxPriceValue: 100000 }
     }
@@ -128,7 +141,7 @@ function ProductList() {
       minPriceValue: Math.floor(Math.min(...prices)),
       maxPriceValue: Math.ceil(Math.max(...prices))
     }
-  }, [allProducts])
+  }, [facets, allProducts])
 
   // Get category from URL parameter
   const categoryFromUrl = searchParams.get('category')
@@ -168,6 +181,27 @@ function ProductList() {
       setPriceRange([minPriceValue, maxPriceValue])
     }
   }, [allProducts, minPriceValue, maxPriceValue])
+
+  // Category counts reflect the chosen price range (the bounds don't depend on it).
+  // Fetched once the slider settles, not on every step while it is dragged
+  useEffect(() => {
+    let cancelled = false
+    const timer = window.setTimeout(() => {
+      getProductFacets({ min_price: priceRange[0], max_price: priceRange[1] })
+        .then((result) => {
+          if (!cancelled) setFacets(result)
+        })
+        .catch((error) => console.warn('Failed to fetch product facets:', error))
+    }, FACETS_DEBOUNCE_MS)
+    return () => {
+      cancelled = true
+      window.clearTimeout(timer)
+    }
+  }, [priceRange, allProducts])
+
+  const categoryCount = (category: string) =>
+    facets?.categories.find((c) => c.category === category)?.count
+  const allCategoriesCount = facets?.categories.reduce((sum, c) => sum + c.count, 0)
   const [selectedColor, setSelectedColor] = useState<string | null>(null)
   const [sortBy, setSortBy] = useState<string>('Popularity')
   const [currentPage, setCurrentPage] = useState<number>(1)
@@ -423,7 +457,7 @@ function ProductList() {
                         className="h-5 w-5 rounded border-border-soft dark:border-white/30 border-2 bg-transparent text-primary checked:bg-primary checked:border-primary checked:bg-[image:--checkbox-tick-svg] focus:ring-0 focus:ring-offset-0 focus:border-border-soft" 
                         type="checkbox"
                       />
-                      <p className="text-body-text dark:text-white/80 text-sm font-medium">All Collections</p>
+                      <p className="text-body-text dark:text-white/80 text-sm font-medium">All Collections{allCategoriesCount !== undefined ? ` (${allCategoriesCount})` : ''}</p>
                     </label>
                     <label className="flex gap-x-3 py-2 flex-row">
                       <input 
@@ -432,7 +466,7 @@ function ProductList() {
                         className="h-5 w-5 rounded border-border-soft dark:border-white/30 border-2 bg-transparent text-primary checked:bg-primary checked:border-primary checked:bg-[image:--checkbox-tick-svg] focus:ring-0 focus:ring-offset-0 focus:border-border-soft" 
                         type="checkbox"
                       />
-                      <p className="text-body-text dark:text-white/80 text-sm">Photo Frames</p>
+                      <p className="text-body-text dark:text-white/80 text-sm">Photo Frames{categoryCount('Photo Frames') !== undefined ? ` (${categoryCount('Photo Frames')})` : ''}</p>
                     </label>
                     <label className="flex gap-x-3 py-2 flex-row">
                       <input 
@@ -441,7 +475,7 @@ function ProductList() {
                         className="h-5 w-5 rounded border-border-soft dark:border-white/30 border-2 bg-transparent text-primary checked:bg-primary checked:border-primary checked:bg-[image:--checkbox-tick-svg] focus:ring-0 focus:ring-offset-0 focus:border-border-soft" 
                         type="checkbox"
                       />
-                      <p className="text-body-text dark:text-white/80 text-sm">Idols</p>
+                      <p className="text-body-text dark:text-white/80 text-sm">Idols{categoryCount('Idols') !== undefined ? ` (${categoryCount('Idols')})` : ''}</p>
                     </label>
                     <label className="flex gap-x-3 py-2 flex-row">
                       <input 
@@ -450,7 +484,7 @@ function ProductList() {
                         className="h-5 w-5 rounded border-border-soft dark:border-white/30 border-2 bg-transparent text-primary checked:bg-primary checked:border-primary checked:bg-[image:--checkbox-tick-svg] focus:ring-0 focus:ring-offset-0 focus:border-border-soft" 
                         type="checkbox"
                       />
-                      <p className="text-body-text dark:text-white/80 text-sm">Home Interiors</p>
+                      <p className="text-body-text dark:text-white/80 text-sm">Home Interiors{categoryCount('Home Interiors') !== undefined ? ` (${categoryCount('Home Interiors')})` : ''}</p>
                     </label>
                     <label className="flex gap-x-3 py-2 flex-row">
                       <input 
@@ -459,7 +493,7 @@ function ProductList() {
                         className="h-5 w-5 rounded border-border-soft dark:border-white/30 border-2 bg-transparent text-primary checked:bg-primary checked:border-primary checked:bg-[image:--checkbox-tick-svg] focus:ring-0 focus:ring-offset-0 focus:border-border-soft" 
                         type="checkbox"
                       />
-                      <p className="text-body-text dark:text-white/80 text-sm">Corporate Gifts</p>
+                      <p className="text-body-text dark:text-white/80 text-sm">Corporate Gifts{categoryCount('Corporate Gifts') !== undefined ? ` (${categoryCount('Corporate Gifts')})` : ''}</p>
                     </label>
                   </div>
                 </div>
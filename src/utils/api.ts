@@ -1,12 +1,20 @@
 const API_BASE_URL = 'http://localhost:8000/api';
 
 // Upload image to backend
-export const uploadImage = async (image: File | string): Promise<{ url: string }> => {
-  let body: FormData | string;
+export const uploadImage = async (
+  image: File | string
+): Promise<{ url: string; variants?: Record<string, string> }> => {
+  let body: File | FormData | string;
+  let method = 'POST';
   const headers: HeadersInit = {};
   
-  // If it's a File object, use FormData
-  if (image instanceof File) {
+  // Image files are sent as the raw request body, which the backend
+  // streams straight to disk; anything else falls back to FormData
+  if (image instanceof File && image.type.startsWith('image/')) {
+    body = image;
+    method = 'PUT';
+    headers['Content-Type'] = image.type;
+  } else if (image instanceof File) {
     const formData = new FormData();
     formData.append('image', image);
     body = formData;
@@ -18,7 +26,7 @@ export const uploadImage = async (image: File | string): Promise<{ url: string }
   }
 
   const response = await fetch(`${API_BASE_URL}/upload-image/`, {
-    method: 'POST',
+    method,
     headers,
     body,
   });
@@ -258,6 +266,8 @@ export interface ProductData {
   material?: string;
   weight?: string;
   inStock?: boolean;
+  // Units on hand; null when stock isn't tracked
+  stock?: number | null;
   thumbnails?: string[];
   reviews?: Array<{
     id?: number;
@@ -274,9 +284,43 @@ export interface ProductResponse extends ProductData {
   rating: number;
 }
 
-// Get all products
-export const getProducts = async (): Promise<ProductResponse[]> => {
-  const response = await fetch(`${API_BASE_URL}/products/`, {
+export interface ProductListParams {
+  category?: string;
+  min_price?: number;
+  max_price?: number;
+  in_stock?: boolean;
+  sort?: 'popularity' | 'rating' | 'price_asc' | 'price_desc' | 'newest';
+  page_size?: number;
+  // Sparse fieldsets: output fields and nested relations to include
+  // (arrays are sent comma-separated)
+  fields?: string[];
+  expand?: Array<'sub_descriptions' | 'thumbnails' | 'reviews' | 'ratingDistribution'>;
+}
+
+export interface ProductPage {
+  next: string | null;
+  results: ProductResponse[];
+}
+
+// Get one page of products (server-side filtering, sorting and keyset
+// pagination); pass the page's next URL as cursorUrl for the following one
+export const getProductPage = async (
+  params: ProductListParams = {},
+  cursorUrl?: string | null
+): Promise<ProductPage> => {
+  let url = cursorUrl;
+  if (!url) {
+    const query = new URLSearchParams();
+    Object.entries(params).forEach(([key, value]) => {
+      if (value !== undefined && value !== null && value !== '') {
+        query.append(key, String(value));
+      }
+    });
+    const queryString = query.toString();
+    url = `${API_BASE_URL}/products/${queryString ? `?${queryString}` : ''}`;
+  }
+
+  const response = await fetch(url, {
     method: 'GET',
     headers: {
       'Content-Type': 'application/json',
@@ -285,8 +329,8 @@ export const getProducts = async (): Promise<ProductResponse[]> => {
 
   if (!response.ok) {
     if (response.status === 404) {
-      // If endpoint doesn't exist yet, return empty array
-      return [];
+      // If endpoint doesn't exist yet, return an empty page
+      return { next: null, results: [] };
     }
     throw new Error('Failed to fetch products');
   }
@@ -294,6 +338,121 @@ export const getProducts = async (): Promise<ProductResponse[]> => {
   return response.json();
 };
 
+export interface ProductChanges {
+  changed: ProductResponse[];
+  deleted: number[];
+  cursor: string;
+  has_more: boolean;
+}
+
+// Raised when the sync cursor is too old (HTTP 410): resync from scratch
+export class SyncCursorExpiredError extends Error {}
+
+// Get one page of products changed/deleted since a sync cursor (everything without one)
+export const getProductChanges = async (
+  since?: string | null,
+  pageSize = 500
+): Promise<ProductChanges> => {
+  const query = new URLSearchParams({ page_size: String(pageSize) });
+  if (since) {
+    query.append('since', since);
+  }
+  const response = await fetch(`${API_BASE_URL}/products/changes/?${query.toString()}`);
+  if (response.status === 410 || response.status === 404) {
+    throw new SyncCursorExpiredError('Product sync cursor expired');
+  }
+  if (!response.ok) {
+    throw new Error('Failed to fetch product changes');
+  }
+  return response.json();
+};
+
+const PRODUCT_REPLICA_KEY = 'productReplica';
+
+interface ProductReplica {
+  cursor: string | null;
+  products: Record<string, ProductResponse>;
+}
+
+const loadProductReplica = (): ProductReplica => {
+  try {
+    const stored = localStorage.getItem(PRODUCT_REPLICA_KEY);
+    if (stored) {
+      return JSON.parse(stored);
+    }
+  } catch {
+    // Corrupt or unavailable storage: start over
+  }
+  return { cursor: null, products: {} };
+};
+
+const applyProductChanges = async (replica: ProductReplica): Promise<ProductReplica> => {
+  const products = { ...replica.products };
+  let cursor = replica.cursor;
+  let page: ProductChanges;
+  do {
+    page = await getProductChanges(cursor);
+    page.deleted.forEach((id) => delete products[id]);
+    page.changed.forEach((product) => {
+      products[product.id] = product;
+    });
+    cursor = page.cursor;
+  } while (page.has_more);
+  return { cursor, products };
+};
+
+// Bring the local product replica up to date with only the changes since the
+// last sync, and return it newest first
+export const syncProducts = async (): Promise<ProductResponse[]> => {
+  let replica: ProductReplica;
+  try {
+    replica = await applyProductChanges(loadProductReplica());
+  } catch (error) {
+    if (!(error instanceof SyncCursorExpiredError)) {
+      throw error;
+    }
+    replica = await applyProductChanges({ cursor: null, products: {} });
+  }
+  try {
+    localStorage.setItem(PRODUCT_REPLICA_KEY, JSON.stringify(replica));
+  } catch {
+    // Storage full: the replica is rebuilt on the next load
+  }
+  return Object.values(replica.products).sort((a, b) => b.id - a.id);
+};
+
+export interface ProductFacets {
+  // Totals of the current selection
+  total: number;
+  inStock: number;
+  // Every category, counted as if it alone were selected
+  categories: Array<{ category: string; count: number; inStock: number }>;
+  // Histogram over the price range (ignores min_price/max_price)
+  price: {
+    min: string | null;
+    max: string | null;
+    buckets: Array<{ min: string; max: string; count: number }>;
+  };
+}
+
+// Sidebar facets for the given filters, computed on the server
+export const getProductFacets = async (
+  params: Pick<ProductListParams, 'category' | 'min_price' | 'max_price' | 'in_stock'> = {}
+): Promise<ProductFacets> => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== '') {
+      query.append(key, String(value));
+    }
+  });
+  const queryString = query.toString();
+  const response = await fetch(`${API_BASE_URL}/products/facets/${queryString ? `?${queryString}` : ''}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch product facets');
+  }
+  return response.json();
+};
+
 // Create a new product (JWT token optional - backend may allow unauthenticated requests)
 export const createProduct = async (product: ProductData): Promise<ProductResponse> => {
   const token = getAccessToken();
@@ -509,4 +668,162 @@ export const getProductById = async (id: number): Promise<ProductResponse> => {
   return response.json();
 };
 
+// A product's precomputed related products, best match first
+export const getRelatedProducts = async (
+  id: number,
+  fields: string[] = ['id', 'name', 'price', 'image', 'alt', 'category']
+): Promise<ProductResponse[]> => {
+  const query = new URLSearchParams({ fields: fields.join(',') });
+  const response = await fetch(`${API_BASE_URL}/products/${id}/related/?${query.toString()}`);
+  if (!response.ok) {
+    throw new Error('Failed to fetch related products');
+  }
+  return response.json();
+};
+
+export interface ProductReview {
+  id: number;
+  userName: string;
+  rating: number;
+  comment: string;
+  date: string;
+}
+
+export interface ProductReviewPage {
+  next: string | null;
+  results: ProductReview[];
+}
+
+// Get one page of a product's reviews, newest first
+export const getProductReviews = async (
+  id: number,
+  cursorUrl?: string | null
+): Promise<ProductReviewPage> => {
+  const response = await fetch(cursorUrl || `${API_BASE_URL}/products/${id}/reviews/`, {
+    method: 'GET',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+  });
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch reviews');
+  }
+
+  return response.json();
+};
+
+// Get every review of a product by following the page cursors
+export const getAllProductReviews = async (id: number): Promise<ProductReview[]> => {
+  const reviews: ProductReview[] = [];
+  let page = await getProductReviews(id);
+  reviews.push(...page.results);
+  while (page.next) {
+    page = await getProductReviews(id, page.next);
+    reviews.push(...page.results);
+  }
+  return reviews;
+};
+
+export interface CartLineValidation {
+  product: number;
+  name: string | null;
+  quantity: number;
+  price: string | null;
+  expectedPrice: string | null;
+  inStock: boolean;
+  // Units left when the product tracks stock, else null
+  stock: number | null;
+  issues: Array<'unavailable' | 'out_of_stock' | 'insufficient_stock' | 'price_changed'>;
+}
+
+export interface CartValidation {
+  valid: boolean;
+  items: CartLineValidation[];
+  subtotal: string;
+}
+
+// Check every cart line's current price and stock in one request
+export const validateCartItems = async (
+  items: Array<{ id: number; quantity: number; price: number }>
+): Promise<CartValidation> => {
+  const response = await fetch(`${API_BASE_URL}/cart/validate/`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({
+      items: items.map((item) => ({
+        product: item.id,
+        quantity: item.quantity,
+        price: item.price.toFixed(2),
+      })),
+    }),
+  });
+  if (!response.ok) {
+    throw new Error('Failed to validate cart');
+  }
+  return response.json();
+};
+
+export interface OrderResponse {
+  id: number;
+  number: string;
+  status: 'Pending' | 'Processing' | 'Shipped' | 'Delivered' | 'Cancelled';
+  total: string;
+  trackingNumber: string;
+  items: Array<{ id: number | null; name: string; image: string; quantity: number; price: string }>;
+  created_at: string;
+}
+
+export interface OrderShortage {
+  product: number;
+  requested: number;
+  available: number;
+}
+
+// Thrown when some lines can't be filled; nothing was ordered
+export class InsufficientStockError extends Error {
+  shortages: OrderShortage[];
+
+  constructor(shortages: OrderShortage[]) {
+    super('Not enough stock for some items');
+    this.shortages = shortages;
+  }
+}
+
+const authHeaders = (): Record<string, string> => {
+  const token = getAccessToken();
+  if (!token) {
+    throw new Error('No access token found');
+  }
+  return { 'Content-Type': 'application/json', 'Authorization': `Bearer ${token}` };
+};
 
+// The signed-in user's orders, newest first
+export const getOrders = async (): Promise<OrderResponse[]> => {
+  const response = await fetch(`${API_BASE_URL}/orders/`, { headers: authHeaders() });
+  if (!response.ok) {
+    throw new Error('Failed to fetch orders');
+  }
+  return response.json();
+};
+
+// Place an order; stock is reserved on the server
+export const placeOrder = async (
+  items: Array<{ id: number; quantity: number }>
+): Promise<OrderResponse> => {
+  const response = await fetch(`${API_BASE_URL}/orders/`, {
+    method: 'POST',
+    headers: authHeaders(),
+    body: JSON.stringify({
+      items: items.map((item) => ({ product: item.id, quantity: item.quantity })),
+    }),
+  });
+  if (response.status === 409) {
+    const data = await response.json();
+    throw new InsufficientStockError(data.items || []);
+  }
+  if (!response.ok) {
+    throw new Error('Failed to place order');
+  }
+  return response.json();
+};